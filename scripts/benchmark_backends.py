@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Compare embedding backend throughput against the sentence-transformers reference
+
+Encodes the same synthetic texts with the reference PyTorch backend and with
+ONNX Runtime (fp32 and int8-quantized), then reports texts/sec and speedup
+for each. Parity of the vectors is checked by tests/test_backend_parity.py.
+No database needed.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the package
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from src.config import ConfigLoader
+from src.utils import LoggingManager
+from src.db.backends import create_backend
+
+# (label, config overrides) for each backend variant
+VARIANTS = {
+    'torch': {'backend': 'sentence-transformers'},
+    'onnx': {'backend': 'onnx', 'quantize': False},
+    'onnx-int8': {'backend': 'onnx', 'quantize': True},
+}
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Compare embedding backend throughput')
+
+    parser.add_argument('--texts', '-n', type=int, default=2000,
+                      help='Number of synthetic texts to encode')
+
+    parser.add_argument('--variants', nargs='+', choices=[v for v in VARIANTS if v != 'torch'],
+                      default=['onnx', 'onnx-int8'],
+                      help='Backends to compare against the torch reference')
+
+    parser.add_argument('--batch-size', type=int, default=64,
+                      help='Texts per encode call')
+
+    parser.add_argument('--threads', type=int,
+                      help='Inference threads per backend')
+
+    parser.add_argument('--config-file', '-c',
+                      help='Path to configuration file. If not provided, looks in standard locations.')
+
+    return parser.parse_args()
+
+def make_texts(count):
+    """Synthetic product-like texts with a spread of lengths"""
+    rng = np.random.default_rng(7)
+    words = np.array(['steel', 'bolt', 'copper', 'wire', 'office', 'chair', 'laptop', 'service',
+                      'cable', 'pump', 'valve', 'industrial', 'replacement', 'assembly', 'kit'])
+    lengths = np.clip(rng.lognormal(mean=2.0, sigma=0.8, size=count).astype(int), 1, 120)
+    return [' '.join(words[rng.integers(0, len(words), size=n)]) for n in lengths]
+
+def run_variant(model_name, embedding_config, label, texts, batch_size, threads):
+    """Encode all texts with one backend, returning (embeddings, seconds)"""
+    config = dict(embedding_config, **VARIANTS[label])
+    backend = create_backend(model_name, config, threads)
+    if not backend.available():
+        print(f"Skipping {label}: {backend.name} backend not installed")
+        return None, 0.0
+
+    backend.load()
+    # Warm up so session/graph initialization isn't timed
+    backend.encode(texts[:batch_size])
+
+    start = time.time()
+    embeddings = np.vstack([backend.encode(texts[i:i+batch_size]) for i in range(0, len(texts), batch_size)])
+    elapsed = time.time() - start
+
+    return embeddings.astype(np.float32), elapsed
+
+def main():
+    """Main function"""
+    args = parse_args()
+
+    config_loader = ConfigLoader(args.config_file)
+    LoggingManager.setup_logging(config={'level': 'WARNING'}, add_timestamp=False)
+
+    embedding_config = config_loader.get_embedding_config()
+    model_name = embedding_config.get('model')
+
+    print(f"Generating {args.texts} synthetic texts for {model_name}...")
+    texts = make_texts(args.texts)
+
+    reference, reference_time = run_variant(model_name, embedding_config, 'torch', texts,
+                                            args.batch_size, args.threads)
+    if reference is None:
+        return 1
+
+    print("\n" + "-"*50)
+    print(f"{'backend'.ljust(12)} {'seconds'.rjust(10)} {'texts/sec'.rjust(12)} {'speedup'.rjust(9)}")
+    print("-"*50)
+    print(f"{'torch'.ljust(12)} {reference_time:10.2f} {len(texts) / reference_time:12.0f} {1.0:9.2f}")
+
+    for label in args.variants:
+        embeddings, elapsed = run_variant(model_name, embedding_config, label, texts,
+                                          args.batch_size, args.threads)
+        if embeddings is None:
+            continue
+
+        print(f"{label.ljust(12)} {elapsed:10.2f} {len(texts) / elapsed:12.0f} {reference_time / elapsed:9.2f}")
+    print("-"*50)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Benchmark the EmbeddingsGenerator batching modes
+
+Encodes a synthetic set of texts with a realistic spread of lengths using
+fixed table-order batches and length-sorted token-budget batches, and
+reports texts/sec for each. Also checks that both modes return the same
+embeddings in the same order. Needs sentence-transformers (no database).
+"""
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the package
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from src.config import ConfigLoader
+from src.utils import LoggingManager
+from src.db import EmbeddingsManager
+from src.pipeline import EmbeddingsGenerator
+from src.pipeline.embeddings_generator import BATCHING_MODES
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmark embedding batching modes')
+
+    parser.add_argument('--texts', '-n', type=int, default=5000,
+                      help='Number of synthetic texts to encode')
+
+    parser.add_argument('--modes', '-m', nargs='+', choices=BATCHING_MODES, default=list(BATCHING_MODES),
+                      help='Batching modes to benchmark')
+
+    parser.add_argument('--max-batch-tokens', type=int,
+                      help='Override embedding.max_batch_tokens for the sorted mode')
+
+    parser.add_argument('--config-file', '-c',
+                      help='Path to configuration file. If not provided, looks in standard locations.')
+
+    return parser.parse_args()
+
+def make_texts(count):
+    """Synthetic product-like texts: mostly short names, some long descriptions"""
+    rng = np.random.default_rng(42)
+    words = np.array(['steel', 'bolt', 'copper', 'wire', 'office', 'chair', 'laptop', 'service',
+                      'cable', 'pump', 'valve', 'industrial', 'replacement', 'assembly', 'kit'])
+
+    # Long-tailed word counts, like a name column joined with a description
+    lengths = np.clip(rng.lognormal(mean=2.0, sigma=1.0, size=count).astype(int), 1, 300)
+    return [' '.join(words[rng.integers(0, len(words), size=n)]) for n in lengths]
+
+def run_mode(embeddings_manager, embedding_config, texts, mode):
+    """Encode all texts with one batching mode, returning (embeddings, seconds)"""
+    config = dict(embedding_config, batching=mode)
+    generator = EmbeddingsGenerator(None, embeddings_manager, config)
+
+    start = time.time()
+    embeddings = generator._encode(texts)
+    elapsed = time.time() - start
+
+    return np.asarray(embeddings, dtype=np.float32), elapsed
+
+def main():
+    """Main function"""
+    args = parse_args()
+
+    config_loader = ConfigLoader(args.config_file)
+    LoggingManager.setup_logging(config={'level': 'WARNING'}, add_timestamp=False)
+
+    embedding_config = dict(config_loader.get_embedding_config())
+    # Measure the model, not the cache
+    embedding_config['cache_dir'] = None
+    if args.max_batch_tokens:
+        embedding_config['max_batch_tokens'] = args.max_batch_tokens
+
+    embeddings_manager = EmbeddingsManager(None, embedding_config.get('model'), embedding_config)
+    embeddings_manager.load_model()
+
+    print(f"Generating {args.texts} synthetic texts...")
+    texts = make_texts(args.texts)
+
+    # Warm up so model initialization isn't charged to the first mode
+    embeddings_manager.generate_embeddings(texts[:32])
+
+    results = []
+    for mode in args.modes:
+        embeddings, elapsed = run_mode(embeddings_manager, embedding_config, texts, mode)
+        results.append((mode, embeddings, elapsed))
+
+    print("\n" + "-"*50)
+    print(f"{'mode'.ljust(12)} {'seconds'.rjust(10)} {'texts/sec'.rjust(12)}")
+    print("-"*50)
+    for mode, _, elapsed in results:
+        rate = len(texts) / elapsed if elapsed > 0 else 0
+        print(f"{mode.ljust(12)} {elapsed:10.2f} {rate:12.0f}")
+    print("-"*50)
+
+    if len(results) == 2:
+        (base_mode, base, base_time), (mode, other, other_time) = results
+        max_diff = float(np.abs(base - other).max()) if len(texts) else 0.0
+        print(f"Max abs difference between modes: {max_diff:.2e}")
+        if other_time > 0:
+            print(f"Speedup of {mode} over {base_mode}: {base_time / other_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
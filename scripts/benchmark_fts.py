@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Benchmark the FTS layouts on an entity
+
+Builds full-text search for an already imported entity with the separate
+<entity>_fts table layout and with the stored generated column layout, then
+runs the same sample queries against each. Reports build time (load + index)
+and mean/p95 query latency per layout. Needs an imported entity table.
+"""
+
+import sys
+import os
+import argparse
+
+# Add the parent directory to the path so we can import the package
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from src.config import ConfigLoader
+from src.utils import LoggingManager, LatencyTracker
+from src.db import DBClient, FTSManager
+from src.db.fts import LAYOUTS
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmark FTS build time and query latency per layout')
+
+    parser.add_argument('--entity', '-e', required=True,
+                      help='Imported entity to build full-text search for')
+
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=list(LAYOUTS),
+                      help='FTS layouts to benchmark')
+
+    parser.add_argument('--queries', '-q', nargs='+',
+                      help='Search queries (default: words sampled from the entity text)')
+
+    parser.add_argument('--sample-queries', type=int, default=50,
+                      help='Number of queries to sample when --queries is not given')
+
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                      help='Times each query is run per layout')
+
+    parser.add_argument('--limit', type=int, default=10,
+                      help='Results per query')
+
+    parser.add_argument('--config-file', '-c',
+                      help='Path to configuration file. If not provided, looks in standard locations.')
+
+    return parser.parse_args()
+
+def sample_queries(db_client, entity_name, count):
+    """First words of the text of random rows"""
+    text_columns = db_client.get_text_columns(entity_name)
+    if not text_columns:
+        return []
+    rows = db_client.execute_query(
+        f"SELECT split_part(COALESCE({text_columns[0]}, ''), ' ', 1) FROM {entity_name} ORDER BY random() LIMIT %s;",
+        (count,)
+    )
+    return [row[0] for row in rows if row[0]]
+
+def main():
+    """Main function"""
+    args = parse_args()
+
+    config_loader = ConfigLoader(args.config_file)
+    LoggingManager.setup_logging(config={'level': 'WARNING'}, add_timestamp=False)
+
+    fts_config = config_loader.get_fts_config()
+    db_client = DBClient(config_loader.get_db_config())
+
+    try:
+        queries = args.queries or sample_queries(db_client, args.entity, args.sample_queries)
+        if not queries:
+            print(f"No queries to run for {args.entity}")
+            return 1
+        print(f"{args.entity}: {db_client.count_rows(args.entity)} rows, {len(queries)} queries")
+
+        latency = LatencyTracker()
+        results = []
+        for layout in args.layouts:
+            # No result cache: the queries repeat, and the point is to time them
+            fts_manager = FTSManager(db_client, dict(fts_config, layout=layout, cache_size=0))
+
+            stats = {}
+            fts_table_config = fts_manager.create_fts_table(args.entity)
+            if not fts_manager.generate_fts_vectors(args.entity, fts_table_config, stats=stats):
+                print(f"Could not build the {layout} layout, skipping")
+                continue
+
+            # One untimed pass to warm caches
+            for query in queries:
+                fts_manager.search_ids(args.entity, query, args.limit)
+            for _ in range(args.repeat):
+                for query in queries:
+                    with latency.time(layout):
+                        fts_manager.search(args.entity, query, args.limit)
+
+            results.append((layout, stats))
+
+        latency_stats = latency.get_stats()
+        print("\n" + "-"*64)
+        print(f"{'layout'.ljust(10)} {'load s'.rjust(9)} {'index s'.rjust(9)} {'total s'.rjust(9)} "
+              f"{'mean ms'.rjust(9)} {'p95 ms'.rjust(9)}")
+        print("-"*64)
+        for layout, stats in results:
+            query_stats = latency_stats.get(layout, {'mean': 0.0, 'p95': 0.0})
+            print(f"{layout.ljust(10)} {stats.get('load_time', '-').rstrip('s').rjust(9)} "
+                  f"{stats.get('index_time', '-').rstrip('s').rjust(9)} {stats.get('total_time', '-').rstrip('s').rjust(9)} "
+                  f"{query_stats['mean'] * 1000:9.2f} {query_stats['p95'] * 1000:9.2f}")
+        print("-"*64)
+        print("The generated column is left on the entity table; it is dropped when the entity is re-imported.")
+    finally:
+        db_client.close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Benchmark the ParquetImporter load methods
+
+Generates a synthetic Arrow table, loads it into a scratch table with each
+load method and reports rows/sec. Needs a reachable PostgreSQL instance.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pyarrow as pa
+
+# Add the parent directory to the path so we can import the package
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from src.config import ConfigLoader
+from src.utils import LoggingManager
+from src.db import DBClient
+from src.pipeline import ParquetImporter
+from src.pipeline.importer import LOAD_METHODS
+
+BENCH_TABLE = 'bench_import'
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmark ParquetImporter load methods')
+
+    parser.add_argument('--rows', '-n', type=int, default=200000,
+                      help='Number of synthetic rows to load')
+
+    parser.add_argument('--methods', '-m', nargs='+', choices=LOAD_METHODS, default=list(LOAD_METHODS),
+                      help='Load methods to benchmark')
+
+    parser.add_argument('--config-file', '-c',
+                      help='Path to configuration file. If not provided, looks in standard locations.')
+
+    return parser.parse_args()
+
+def make_table(rows):
+    """Build a synthetic Arrow table shaped like a typical entity"""
+    rng = np.random.default_rng(42)
+    words = np.array(['steel', 'bolt', 'copper', 'wire', 'office', 'chair', 'laptop', 'service', 'cable', 'pump'])
+
+    names = [' '.join(ws) for ws in words[rng.integers(0, len(words), size=(rows, 3))]]
+    descriptions = [' '.join(ws) for ws in words[rng.integers(0, len(words), size=(rows, 12))]]
+
+    return pa.table({
+        'id': pa.array(np.arange(1, rows + 1, dtype=np.int64)),
+        'name': pa.array(names),
+        'description': pa.array(descriptions),
+        'price': pa.array(rng.random(rows) * 1000),
+        'quantity': pa.array(rng.integers(0, 10000, size=rows)),
+        'active': pa.array(rng.random(rows) > 0.5),
+    })
+
+def run_method(importer, db_client, table, method):
+    """Load the table with one method, returning (rows loaded, seconds)"""
+    importer.load_method = method
+
+    db_client.execute_query(importer._generate_create_table_sql_from_schema(BENCH_TABLE, table.schema))
+
+    # Time conversion + load, which is what the importer pays per file
+    start = time.time()
+    if method == 'copy':
+        importer._copy_data(BENCH_TABLE, table)
+    else:
+        df = importer._preprocess_dataframe(importer._to_dataframe(table))
+        importer._insert_data(BENCH_TABLE, df)
+    elapsed = time.time() - start
+
+    loaded = db_client.count_rows(BENCH_TABLE)
+    return loaded, elapsed
+
+def main():
+    """Main function"""
+    args = parse_args()
+
+    config_loader = ConfigLoader(args.config_file)
+    LoggingManager.setup_logging(config={'level': 'WARNING'}, add_timestamp=False)
+
+    db_client = DBClient(config_loader.get_db_config())
+    importer = ParquetImporter(None, db_client, config_loader.get_import_config())
+
+    print(f"Generating {args.rows} synthetic rows...")
+    table = make_table(args.rows)
+
+    results = []
+    try:
+        for method in args.methods:
+            loaded, elapsed = run_method(importer, db_client, table, method)
+            results.append((method, loaded, elapsed))
+    finally:
+        db_client.execute_query(f"DROP TABLE IF EXISTS {BENCH_TABLE};")
+
+    print("\n" + "-"*60)
+    print(f"{'method'.ljust(16)} {'rows'.rjust(10)} {'seconds'.rjust(10)} {'rows/sec'.rjust(12)}")
+    print("-"*60)
+    for method, loaded, elapsed in results:
+        rate = loaded / elapsed if elapsed > 0 else 0
+        print(f"{method.ljust(16)} {str(loaded).rjust(10)} {elapsed:10.2f} {rate:12.0f}")
+    print("-"*60)
+
+    if len(results) == 2 and results[0][2] > 0 and results[1][2] > 0:
+        print(f"Speedup of {results[1][0]} over {results[0][0]}: {results[0][2] / results[1][2]:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+Benchmark pgvector index strategies on an embeddings table
+
+Builds each index type (ivfflat with lists sized to the table, HNSW with the
+configured m / ef_construction) on <entity>_embeddings, then runs sample
+queries (stored embeddings of random rows) through the index and through an
+exact sequential scan. Reports build time, mean/p95 query latency and
+recall@k against the exact results. Needs a pgvector embeddings table.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add the parent directory to the path so we can import the package
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from src.config import ConfigLoader
+from src.utils import LoggingManager, LatencyTracker
+from src.db import DBClient, EmbeddingsManager
+from src.db.embeddings import VECTOR_INDEX_TYPES, DEFAULT_SEARCH_PROBES, DEFAULT_HNSW_EF_SEARCH
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmark pgvector index build time and recall')
+
+    parser.add_argument('--entity', '-e', required=True,
+                      help='Entity whose <entity>_embeddings table to index')
+
+    parser.add_argument('--types', '-t', nargs='+', choices=VECTOR_INDEX_TYPES, default=list(VECTOR_INDEX_TYPES),
+                      help='Index types to benchmark')
+
+    parser.add_argument('--queries', '-q', type=int, default=100,
+                      help='Number of sample queries')
+
+    parser.add_argument('-k', type=int, default=10,
+                      help='Neighbours per query (recall@k)')
+
+    parser.add_argument('--probes', type=int,
+                      help='Override embedding.search_probes (ivfflat lists scanned per query)')
+
+    parser.add_argument('--ef-search', type=int,
+                      help='Override embedding.hnsw_ef_search')
+
+    parser.add_argument('--config-file', '-c',
+                      help='Path to configuration file. If not provided, looks in standard locations.')
+
+    return parser.parse_args()
+
+def sample_query_ids(db_client, embeddings_table, count):
+    """Ids of random rows whose embeddings serve as queries"""
+    rows = db_client.execute_query(
+        f"SELECT id FROM {embeddings_table} WHERE embedding IS NOT NULL ORDER BY random() LIMIT %s;",
+        (count,)
+    )
+    return [row[0] for row in rows]
+
+def nearest(cursor, embeddings_table, query_id, k):
+    """Ids of the k nearest neighbours of a stored embedding"""
+    cursor.execute(f"""
+    SELECT m.id
+    FROM {embeddings_table} m
+    ORDER BY m.embedding <=> (SELECT embedding FROM {embeddings_table} WHERE id = %s)
+    LIMIT %s;
+    """, (query_id, k))
+    return [row[0] for row in cursor.fetchall()]
+
+def exact_neighbours(db_client, embeddings_table, query_ids, k):
+    """Exact k nearest neighbours of each query, with index scans disabled"""
+    results = {}
+    with db_client.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_indexscan = off;")
+            cursor.execute("SET LOCAL enable_bitmapscan = off;")
+            for query_id in query_ids:
+                results[query_id] = nearest(cursor, embeddings_table, query_id, k)
+        conn.rollback()
+    return results
+
+def run_queries(db_client, embeddings_table, query_ids, k, probes, ef_search, latency, name):
+    """Approximate k nearest neighbours of each query through the index"""
+    results = {}
+    with db_client.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT set_config('ivfflat.probes', %s, true), set_config('hnsw.ef_search', %s, true);",
+                           (str(probes), str(max(k, ef_search))))
+            for query_id in query_ids:
+                with latency.time(name):
+                    results[query_id] = nearest(cursor, embeddings_table, query_id, k)
+        conn.rollback()
+    return results
+
+def recall(approximate, exact, k):
+    """Mean fraction of the exact neighbours found"""
+    hits = sum(len(set(approximate[query_id]) & set(neighbours)) for query_id, neighbours in exact.items())
+    return hits / (k * len(exact)) if exact else 0.0
+
+def main():
+    """Main function"""
+    args = parse_args()
+
+    config_loader = ConfigLoader(args.config_file)
+    LoggingManager.setup_logging(config={'level': 'WARNING'}, add_timestamp=False)
+
+    embedding_config = dict(config_loader.get_embedding_config())
+    probes = args.probes or int(embedding_config.get('search_probes', DEFAULT_SEARCH_PROBES))
+    ef_search = args.ef_search or int(embedding_config.get('hnsw_ef_search', DEFAULT_HNSW_EF_SEARCH))
+
+    db_client = DBClient(config_loader.get_db_config())
+    embeddings_table = f"{args.entity}_embeddings"
+    embeddings_config = {'table': embeddings_table, 'has_pgvector': True}
+
+    try:
+        rows = db_client.count_rows(embeddings_table)
+        print(f"{embeddings_table}: {rows} rows")
+
+        query_ids = sample_query_ids(db_client, embeddings_table, args.queries)
+        print(f"Computing exact neighbours for {len(query_ids)} queries...")
+        start = time.time()
+        exact = exact_neighbours(db_client, embeddings_table, query_ids, args.k)
+        exact_time = (time.time() - start) / max(1, len(query_ids))
+
+        latency = LatencyTracker()
+        results = []
+        for index_type in args.types:
+            manager = EmbeddingsManager(db_client, embedding_config.get('model'),
+                                        dict(embedding_config, index_type=index_type))
+            stats = {}
+            if not manager.create_vector_index(embeddings_config, stats=stats, rebuild=True):
+                print(f"Could not build a {index_type} index, skipping")
+                continue
+
+            approximate = run_queries(db_client, embeddings_table, query_ids, args.k, probes, ef_search,
+                                      latency, index_type)
+            results.append((index_type, stats, recall(approximate, exact, args.k)))
+
+        latency_stats = latency.get_stats()
+        print("\n" + "-"*78)
+        print(f"{'index'.ljust(8)} {'options'.ljust(28)} {'build s'.rjust(9)} {'mean ms'.rjust(9)} "
+              f"{'p95 ms'.rjust(9)} {f'recall@{args.k}'.rjust(10)}")
+        print("-"*78)
+        print(f"{'exact'.ljust(8)} {'seq scan'.ljust(28)} {'-'.rjust(9)} {exact_time * 1000:9.2f} {'-'.rjust(9)} {1.0:10.3f}")
+        for index_type, stats, index_recall in results:
+            options = ', '.join(f"{key}={value}" for key, value in stats['index_options'].items())
+            query_stats = latency_stats.get(index_type, {'mean': 0.0, 'p95': 0.0})
+            print(f"{index_type.ljust(8)} {options.ljust(28)} {stats['index_build_time']:9.2f} "
+                  f"{query_stats['mean'] * 1000:9.2f} {query_stats['p95'] * 1000:9.2f} {index_recall:10.3f}")
+        print("-"*78)
+        print(f"probes={probes}, ef_search={max(args.k, ef_search)}")
+        print("The last index built is left in place; rerun the pipeline to restore the configured one.")
+    finally:
+        db_client.close()
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,7 @@ from src.config import ConfigLoader
 from src.utils import LoggingManager
 from src.s3 import S3Client
 from src.db import DBClient, EmbeddingsManager, FTSManager
+from src.db.db_client import DEFAULT_POOL_MAX_SIZE
 from src.pipeline import (
     Pipeline, 
     ParquetImporter, 
@@ -68,6 +69,15 @@ def parse_args():
     parser.add_argument('--skip-embeddings', action='store_true',
                         help='Skip embeddings generation step')
     
+    parser.add_argument('--load-method', choices=['execute_values', 'copy'],
+                        help='How imported rows are loaded into PostgreSQL (overrides config)')
+    
+    parser.add_argument('--workers', '-w', type=int,
+                        help='Number of entities to process concurrently (overrides config)')
+    
+    parser.add_argument('--streaming', action='store_true',
+                        help='Stream parquet files from S3 row group by row group instead of downloading them whole')
+    
     parser.add_argument('--version', '-v', action='store_true',
                         help='Show version and exit')
     
@@ -79,12 +89,28 @@ def setup_pipeline(config_loader, logger, args):
     s3_config = config_loader.get_s3_config()
     db_config = config_loader.get_db_config()
     embedding_config = config_loader.get_embedding_config()
+    import_config = config_loader.get_import_config()
+    pipeline_config = config_loader.get_pipeline_config()
+    fts_config = config_loader.get_fts_config()
     
     # Override bucket if provided
     if args.bucket:
         s3_config['bucket'] = args.bucket
         logger.info(f"Using override bucket: {args.bucket}")
     
+    # Override load method if provided
+    if args.load_method:
+        import_config['load_method'] = args.load_method
+        logger.info(f"Using load method: {args.load_method}")
+    
+    if args.streaming:
+        import_config['streaming'] = True
+        logger.info("Streaming parquet import enabled")
+    
+    if args.workers:
+        pipeline_config['workers'] = args.workers
+        logger.info(f"Processing up to {args.workers} entities concurrently")
+    
     # Create clients
     logger.info("Initializing clients...")
     s3_client = S3Client(s3_config)
@@ -92,26 +118,35 @@ def setup_pipeline(config_loader, logger, args):
     
     # Create pipeline & components
     logger.info("Setting up pipeline components...")
-    pipeline = Pipeline(s3_client)
+    pipeline = Pipeline(
+        s3_client,
+        workers=pipeline_config.get('workers', 1),
+        executor=pipeline_config.get('executor', 'thread')
+    )
     
     # Always add the importer
-    pipeline.add_component(ParquetImporter(s3_client, db_client))
+    pipeline.add_component(ParquetImporter(s3_client, db_client, import_config))
     
     # Add embeddings generator unless skipped
+    embeddings_manager = None
     if not args.skip_embeddings:
         embeddings_manager = EmbeddingsManager(
             db_client, 
-            embedding_config.get('model')
+            embedding_config.get('model'),
+            embedding_config
         )
-        pipeline.add_component(EmbeddingsGenerator(db_client, embeddings_manager))
+        pipeline.add_component(EmbeddingsGenerator(db_client, embeddings_manager, embedding_config))
     else:
         logger.info("Skipping embeddings generation")
         
     # Always add FTS generator
-    fts_manager = FTSManager(db_client)
+    fts_manager = FTSManager(db_client, fts_config)
     pipeline.add_component(FTSGenerator(db_client, fts_manager))
     
-    return pipeline
+    # Better to refuse now than to stall on an exhausted pool mid-run
+    pipeline.check_pool_size(db_config.get('pool_max_size', DEFAULT_POOL_MAX_SIZE))
+    
+    return pipeline, db_client, embeddings_manager
 
 def main():
     """Main entry point"""
@@ -192,7 +227,7 @@ def main():
     
     # Setup pipeline
     try:
-        pipeline = setup_pipeline(config_loader, logger, args)
+        pipeline, db_client, embeddings_manager = setup_pipeline(config_loader, logger, args)
     except Exception as e:
         logger.error(f"Failed to setup pipeline: {e}")
         return 1
@@ -207,6 +242,17 @@ def main():
     except Exception as e:
         logger.error(f"Pipeline execution failed: {e}")
         return 1
+    finally:
+        pool_metrics = db_client.get_pool_metrics()
+        db_client.close()
+        if embeddings_manager is not None:
+            embeddings_manager.close()
+    
+    # Connection pool usage for the run
+    results['db_pool'] = pool_metrics
+    logger.info(f"DB pool: {pool_metrics.get('checkouts', 0)} checkouts, "
+                f"avg wait {pool_metrics.get('avg_wait_time', 0.0):.3f}s, "
+                f"max wait {pool_metrics.get('max_wait_time', 0.0):.3f}s")
     
     # Output results
     if args.output:
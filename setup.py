@@ -14,6 +14,12 @@ setup(
         "tqdm>=4.65.0",
         "numpy>=1.23.0",
     ],
+    extras_require={
+        "onnx": [
+            "onnxruntime>=1.15.0",
+            "transformers>=4.30.0",
+        ],
+    },
     entry_points={
         "console_scripts": [
             "run-pipeline=scripts.run_pipeline:main",
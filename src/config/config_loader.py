@@ -14,14 +14,146 @@ logger = logging.getLogger(__name__)
 # Default configuration values - used as fallbacks
 DEFAULT_S3_BUCKET = 'hg-dpi-prod-ch-dataload1'
 DEFAULT_AWS_REGION = 'eu-north-1'
+DEFAULT_S3_LISTING_WORKERS = 8
 DEFAULT_DB_HOST = 'localhost'
 DEFAULT_DB_NAME = 'postgres'
 DEFAULT_DB_USER = 'postgres'
 DEFAULT_DB_PASSWORD = 'Acies@123'  # TODO: Don't hardcode this in production
 DEFAULT_DB_PORT = '5432'
+DEFAULT_DB_POOL_MIN_SIZE = 1
+DEFAULT_DB_POOL_MAX_SIZE = 10
 DEFAULT_LOG_LEVEL = 'INFO'
 DEFAULT_LOG_FILE = 'pipeline.log'
 DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+DEFAULT_EMBEDDING_WRITE_METHOD = 'copy'  # or 'execute_values'
+DEFAULT_EMBEDDING_WRITE_BATCH_SIZE = 5000
+DEFAULT_EMBEDDING_FETCH_SIZE = 5000
+DEFAULT_EMBEDDING_QUEUE_SIZE = 2
+DEFAULT_EMBEDDING_CACHE_MAX_MB = 1024
+DEFAULT_EMBEDDING_BATCHING = 'sorted'
+DEFAULT_EMBEDDING_BATCH_SIZE = 32
+DEFAULT_EMBEDDING_MAX_BATCH_TOKENS = 16384
+DEFAULT_EMBEDDING_MAX_BATCH_SIZE = 256
+DEFAULT_EMBEDDING_ENCODE_WORKERS = 0  # 0 = encode in the pipeline process
+DEFAULT_EMBEDDING_THREADS_PER_WORKER = 0  # 0 = split the cores evenly
+DEFAULT_EMBEDDING_BACKEND = 'sentence-transformers'
+DEFAULT_EMBEDDING_HASHING_DIMENSION = 384
+DEFAULT_EMBEDDING_SEARCH_PROBES = 10
+DEFAULT_EMBEDDING_SEARCH_FETCH_SIZE = 10000
+DEFAULT_EMBEDDING_ANN_LISTS = 0  # 0 = sqrt(rows)
+DEFAULT_EMBEDDING_INDEX_TYPE = 'ivfflat'  # or 'hnsw'
+DEFAULT_EMBEDDING_IVFFLAT_LISTS = 0  # 0 = derived from the row count
+DEFAULT_EMBEDDING_HNSW_M = 16
+DEFAULT_EMBEDDING_HNSW_EF_CONSTRUCTION = 64
+DEFAULT_EMBEDDING_HNSW_EF_SEARCH = 40
+DEFAULT_EMBEDDING_INDEX_MAINTENANCE_WORK_MEM = '1GB'
+DEFAULT_EMBEDDING_INDEX_PARALLEL_WORKERS = 0  # 0 = server default
+DEFAULT_EMBEDDING_ANN_REBUILD_FRACTION = 0.2
+DEFAULT_IMPORT_LOAD_METHOD = 'execute_values'  # or 'copy'
+DEFAULT_IMPORT_COPY_BATCH_ROWS = 50000
+DEFAULT_IMPORT_STREAM_BATCH_ROWS = 65536
+DEFAULT_IMPORT_WORKERS = 1
+DEFAULT_PIPELINE_WORKERS = 1
+DEFAULT_PIPELINE_EXECUTOR = 'thread'  # or 'process'
+DEFAULT_FTS_LAYOUT = 'table'  # or 'generated'
+DEFAULT_FTS_BUILD_MODE = 'deferred'  # or 'indexed'
+DEFAULT_FTS_MAINTENANCE_WORK_MEM = '1GB'
+DEFAULT_FTS_CHUNK_ROWS = 0  # 0 = one INSERT per entity
+DEFAULT_FTS_WORKERS = 4
+DEFAULT_FTS_LANGUAGE = 'english'
+DEFAULT_FTS_CACHE_SIZE = 1024  # 0 = no search result cache
+DEFAULT_FTS_CACHE_TTL = 300
+DEFAULT_FTS_CACHE_CHECK_INTERVAL = 5
+DEFAULT_SEARCH_FUSION = 'rrf'  # or 'weighted'
+DEFAULT_SEARCH_RRF_K = 60
+DEFAULT_SEARCH_CANDIDATES = 100
+DEFAULT_SEARCH_FTS_WEIGHT = 0.5
+DEFAULT_SEARCH_VECTOR_WEIGHT = 0.5
+
+def _env_bool(value):
+    """Parse a true/false environment value"""
+    return value.lower() in ('true', '1', 'yes')
+
+# Environment variables (and .env keys) that override a config value: (name, section, key, type)
+ENV_SETTINGS = [
+    ('S3_BUCKET', 's3', 'bucket', str),
+    ('AWS_REGION', 's3', 'region', str),
+    ('AWS_ACCESS_KEY_ID', 's3', 'aws_access_key_id', str),
+    ('AWS_SECRET_ACCESS_KEY', 's3', 'aws_secret_access_key', str),
+    ('S3_LISTING_WORKERS', 's3', 'listing_workers', int),
+    ('S3_LISTING_CACHE', 's3', 'listing_cache', _env_bool),
+    
+    ('DB_HOST', 'database', 'host', str),
+    ('DB_NAME', 'database', 'database', str),
+    ('DB_USER', 'database', 'user', str),
+    ('DB_PASSWORD', 'database', 'password', str),
+    ('DB_PORT', 'database', 'port', str),
+    ('DB_POOL_MIN_SIZE', 'database', 'pool_min_size', int),
+    ('DB_POOL_MAX_SIZE', 'database', 'pool_max_size', int),
+    
+    ('LOG_LEVEL', 'logging', 'level', str),
+    ('LOG_FILE', 'logging', 'file', str),
+    ('LOG_FORMAT', 'logging', 'format', str),
+    
+    ('EMBEDDING_MODEL', 'embedding', 'model', str),
+    ('EMBEDDING_WRITE_METHOD', 'embedding', 'write_method', str),
+    ('EMBEDDING_WRITE_BATCH_SIZE', 'embedding', 'write_batch_size', int),
+    ('EMBEDDING_STREAMING', 'embedding', 'streaming', _env_bool),
+    ('EMBEDDING_FETCH_SIZE', 'embedding', 'fetch_size', int),
+    ('EMBEDDING_OVERLAP', 'embedding', 'overlap', _env_bool),
+    ('EMBEDDING_QUEUE_SIZE', 'embedding', 'queue_size', int),
+    ('EMBEDDING_INCREMENTAL', 'embedding', 'incremental', _env_bool),
+    ('EMBEDDING_CACHE_DIR', 'embedding', 'cache_dir', str),
+    ('EMBEDDING_CACHE_MAX_MB', 'embedding', 'cache_max_mb', int),
+    ('EMBEDDING_BATCHING', 'embedding', 'batching', str),
+    ('EMBEDDING_BATCH_SIZE', 'embedding', 'batch_size', int),
+    ('EMBEDDING_MAX_BATCH_TOKENS', 'embedding', 'max_batch_tokens', int),
+    ('EMBEDDING_MAX_BATCH_SIZE', 'embedding', 'max_batch_size', int),
+    ('EMBEDDING_ENCODE_WORKERS', 'embedding', 'encode_workers', int),
+    ('EMBEDDING_THREADS_PER_WORKER', 'embedding', 'threads_per_worker', int),
+    ('EMBEDDING_BACKEND', 'embedding', 'backend', str),
+    ('EMBEDDING_QUANTIZE', 'embedding', 'quantize', _env_bool),
+    ('EMBEDDING_ONNX_DIR', 'embedding', 'onnx_dir', str),
+    ('EMBEDDING_HASHING_DIMENSION', 'embedding', 'hashing_dimension', int),
+    ('EMBEDDING_SEARCH_PROBES', 'embedding', 'search_probes', int),
+    ('EMBEDDING_SEARCH_FETCH_SIZE', 'embedding', 'search_fetch_size', int),
+    ('EMBEDDING_ANN_INDEX_DIR', 'embedding', 'ann_index_dir', str),
+    ('EMBEDDING_ANN_LISTS', 'embedding', 'ann_lists', int),
+    ('EMBEDDING_ANN_REBUILD_FRACTION', 'embedding', 'ann_rebuild_fraction', float),
+    ('EMBEDDING_INDEX_TYPE', 'embedding', 'index_type', str),
+    ('EMBEDDING_IVFFLAT_LISTS', 'embedding', 'ivfflat_lists', int),
+    ('EMBEDDING_HNSW_M', 'embedding', 'hnsw_m', int),
+    ('EMBEDDING_HNSW_EF_CONSTRUCTION', 'embedding', 'hnsw_ef_construction', int),
+    ('EMBEDDING_HNSW_EF_SEARCH', 'embedding', 'hnsw_ef_search', int),
+    ('EMBEDDING_INDEX_MAINTENANCE_WORK_MEM', 'embedding', 'index_maintenance_work_mem', str),
+    ('EMBEDDING_INDEX_PARALLEL_WORKERS', 'embedding', 'index_parallel_workers', int),
+    
+    ('IMPORT_LOAD_METHOD', 'import', 'load_method', str),
+    ('IMPORT_COPY_BATCH_ROWS', 'import', 'copy_batch_rows', int),
+    ('IMPORT_STREAMING', 'import', 'streaming', _env_bool),
+    ('IMPORT_STREAM_BATCH_ROWS', 'import', 'stream_batch_rows', int),
+    ('IMPORT_WORKERS', 'import', 'workers', int),
+    
+    ('PIPELINE_WORKERS', 'pipeline', 'workers', int),
+    ('PIPELINE_EXECUTOR', 'pipeline', 'executor', str),
+    
+    ('FTS_LAYOUT', 'fts', 'layout', str),
+    ('FTS_BUILD_MODE', 'fts', 'build_mode', str),
+    ('FTS_UNLOGGED', 'fts', 'unlogged', _env_bool),
+    ('FTS_MAINTENANCE_WORK_MEM', 'fts', 'maintenance_work_mem', str),
+    ('FTS_CHUNK_ROWS', 'fts', 'chunk_rows', int),
+    ('FTS_WORKERS', 'fts', 'workers', int),
+    ('FTS_LANGUAGE', 'fts', 'language', str),
+    ('FTS_CACHE_SIZE', 'fts', 'cache_size', int),
+    ('FTS_CACHE_TTL', 'fts', 'cache_ttl', float),
+    ('FTS_CACHE_CHECK_INTERVAL', 'fts', 'cache_check_interval', float),
+    
+    ('SEARCH_FUSION', 'search', 'fusion', str),
+    ('SEARCH_RRF_K', 'search', 'rrf_k', int),
+    ('SEARCH_CANDIDATES', 'search', 'candidates', int),
+    ('SEARCH_FTS_WEIGHT', 'search', 'fts_weight', float),
+    ('SEARCH_VECTOR_WEIGHT', 'search', 'vector_weight', float),
+]
 
 class ConfigLoader:
     """
@@ -108,28 +240,98 @@ class ConfigLoader:
         # Start with default config
         config = {
             's3': {
-                'bucket': os.environ.get('S3_BUCKET', DEFAULT_S3_BUCKET),
-                'region': os.environ.get('AWS_REGION', DEFAULT_AWS_REGION),
-                'aws_access_key_id': os.environ.get('AWS_ACCESS_KEY_ID'),
-                'aws_secret_access_key': os.environ.get('AWS_SECRET_ACCESS_KEY')
+                'bucket': DEFAULT_S3_BUCKET,
+                'region': DEFAULT_AWS_REGION,
+                'aws_access_key_id': None,
+                'aws_secret_access_key': None,
+                'listing_workers': DEFAULT_S3_LISTING_WORKERS,
+                'listing_cache': True
             },
             'database': {
-                'host': os.environ.get('DB_HOST', DEFAULT_DB_HOST),
-                'database': os.environ.get('DB_NAME', DEFAULT_DB_NAME),
-                'user': os.environ.get('DB_USER', DEFAULT_DB_USER),
-                'password': os.environ.get('DB_PASSWORD', DEFAULT_DB_PASSWORD),
-                'port': os.environ.get('DB_PORT', DEFAULT_DB_PORT)
+                'host': DEFAULT_DB_HOST,
+                'database': DEFAULT_DB_NAME,
+                'user': DEFAULT_DB_USER,
+                'password': DEFAULT_DB_PASSWORD,
+                'port': DEFAULT_DB_PORT,
+                'pool_min_size': DEFAULT_DB_POOL_MIN_SIZE,
+                'pool_max_size': DEFAULT_DB_POOL_MAX_SIZE
             },
             'logging': {
-                'level': os.environ.get('LOG_LEVEL', DEFAULT_LOG_LEVEL),
-                'file': os.environ.get('LOG_FILE', DEFAULT_LOG_FILE),
-                'format': os.environ.get('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+                'level': DEFAULT_LOG_LEVEL,
+                'file': DEFAULT_LOG_FILE,
+                'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             },
             'embedding': {
-                'model': os.environ.get('EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL)
+                'model': DEFAULT_EMBEDDING_MODEL,
+                'write_method': DEFAULT_EMBEDDING_WRITE_METHOD,
+                'write_batch_size': DEFAULT_EMBEDDING_WRITE_BATCH_SIZE,
+                'streaming': False,
+                'fetch_size': DEFAULT_EMBEDDING_FETCH_SIZE,
+                'overlap': True,
+                'queue_size': DEFAULT_EMBEDDING_QUEUE_SIZE,
+                'incremental': False,
+                'cache_dir': None,
+                'cache_max_mb': DEFAULT_EMBEDDING_CACHE_MAX_MB,
+                'batching': DEFAULT_EMBEDDING_BATCHING,
+                'batch_size': DEFAULT_EMBEDDING_BATCH_SIZE,
+                'max_batch_tokens': DEFAULT_EMBEDDING_MAX_BATCH_TOKENS,
+                'max_batch_size': DEFAULT_EMBEDDING_MAX_BATCH_SIZE,
+                'encode_workers': DEFAULT_EMBEDDING_ENCODE_WORKERS,
+                'threads_per_worker': DEFAULT_EMBEDDING_THREADS_PER_WORKER,
+                'backend': DEFAULT_EMBEDDING_BACKEND,
+                'quantize': False,
+                'onnx_dir': None,
+                'hashing_dimension': DEFAULT_EMBEDDING_HASHING_DIMENSION,
+                'search_probes': DEFAULT_EMBEDDING_SEARCH_PROBES,
+                'search_fetch_size': DEFAULT_EMBEDDING_SEARCH_FETCH_SIZE,
+                'ann_index_dir': None,
+                'ann_lists': DEFAULT_EMBEDDING_ANN_LISTS,
+                'ann_rebuild_fraction': DEFAULT_EMBEDDING_ANN_REBUILD_FRACTION,
+                'index_type': DEFAULT_EMBEDDING_INDEX_TYPE,
+                'ivfflat_lists': DEFAULT_EMBEDDING_IVFFLAT_LISTS,
+                'hnsw_m': DEFAULT_EMBEDDING_HNSW_M,
+                'hnsw_ef_construction': DEFAULT_EMBEDDING_HNSW_EF_CONSTRUCTION,
+                'hnsw_ef_search': DEFAULT_EMBEDDING_HNSW_EF_SEARCH,
+                'index_maintenance_work_mem': DEFAULT_EMBEDDING_INDEX_MAINTENANCE_WORK_MEM,
+                'index_parallel_workers': DEFAULT_EMBEDDING_INDEX_PARALLEL_WORKERS
+            },
+            'import': {
+                'load_method': DEFAULT_IMPORT_LOAD_METHOD,
+                'copy_batch_rows': DEFAULT_IMPORT_COPY_BATCH_ROWS,
+                'streaming': False,
+                'stream_batch_rows': DEFAULT_IMPORT_STREAM_BATCH_ROWS,
+                'workers': DEFAULT_IMPORT_WORKERS
+            },
+            'pipeline': {
+                'workers': DEFAULT_PIPELINE_WORKERS,
+                'executor': DEFAULT_PIPELINE_EXECUTOR
+            },
+            'fts': {
+                'layout': DEFAULT_FTS_LAYOUT,
+                'build_mode': DEFAULT_FTS_BUILD_MODE,
+                'unlogged': False,
+                'maintenance_work_mem': DEFAULT_FTS_MAINTENANCE_WORK_MEM,
+                'chunk_rows': DEFAULT_FTS_CHUNK_ROWS,
+                'workers': DEFAULT_FTS_WORKERS,
+                'language': DEFAULT_FTS_LANGUAGE,
+                'weights': {},  # column -> 'A'..'D'; unlisted text columns are 'D'
+                'entities': {},  # entity -> {'language': ..., 'weights': {...}} overrides
+                'cache_size': DEFAULT_FTS_CACHE_SIZE,
+                'cache_ttl': DEFAULT_FTS_CACHE_TTL,
+                'cache_check_interval': DEFAULT_FTS_CACHE_CHECK_INTERVAL
+            },
+            'search': {
+                'fusion': DEFAULT_SEARCH_FUSION,
+                'rrf_k': DEFAULT_SEARCH_RRF_K,
+                'candidates': DEFAULT_SEARCH_CANDIDATES,
+                'fts_weight': DEFAULT_SEARCH_FTS_WEIGHT,
+                'vector_weight': DEFAULT_SEARCH_VECTOR_WEIGHT
             }
         }
         
+        # Environment variables override the defaults
+        self._apply_env(config, os.environ)
+        
         # Override with file settings if available
         if self.config_file and os.path.exists(self.config_file):
             try:
@@ -138,35 +340,7 @@ class ConfigLoader:
                     env_values = self._parse_env_file(self.config_file)
                     
                     # Map known values to config structure
-                    if 'S3_BUCKET' in env_values:
-                        config['s3']['bucket'] = env_values['S3_BUCKET']
-                    if 'AWS_REGION' in env_values:
-                        config['s3']['region'] = env_values['AWS_REGION']
-                    if 'AWS_ACCESS_KEY_ID' in env_values:
-                        config['s3']['aws_access_key_id'] = env_values['AWS_ACCESS_KEY_ID']
-                    if 'AWS_SECRET_ACCESS_KEY' in env_values:
-                        config['s3']['aws_secret_access_key'] = env_values['AWS_SECRET_ACCESS_KEY']
-                    
-                    if 'DB_HOST' in env_values:
-                        config['database']['host'] = env_values['DB_HOST']
-                    if 'DB_NAME' in env_values:
-                        config['database']['database'] = env_values['DB_NAME']
-                    if 'DB_USER' in env_values:
-                        config['database']['user'] = env_values['DB_USER']
-                    if 'DB_PASSWORD' in env_values:
-                        config['database']['password'] = env_values['DB_PASSWORD']
-                    if 'DB_PORT' in env_values:
-                        config['database']['port'] = env_values['DB_PORT']
-                    
-                    if 'LOG_LEVEL' in env_values:
-                        config['logging']['level'] = env_values['LOG_LEVEL']
-                    if 'LOG_FILE' in env_values:
-                        config['logging']['file'] = env_values['LOG_FILE']
-                    if 'LOG_FORMAT' in env_values:
-                        config['logging']['format'] = env_values['LOG_FORMAT']
-                    
-                    if 'EMBEDDING_MODEL' in env_values:
-                        config['embedding']['model'] = env_values['EMBEDDING_MODEL']
+                    self._apply_env(config, env_values)
                     
                 # Handle JSON config        
                 else:
@@ -182,6 +356,12 @@ class ConfigLoader:
         
         return config
     
+    def _apply_env(self, config, values):
+        """Set every ENV_SETTINGS value present in values (os.environ or a parsed .env file)"""
+        for env_name, section, key, cast in ENV_SETTINGS:
+            if env_name in values:
+                config[section][key] = cast(values[env_name])
+    
     def _deep_merge(self, target, source):
         """Deep merge two dictionaries"""
         for key, value in source.items():
@@ -197,7 +377,8 @@ class ConfigLoader:
             's3': ['bucket', 'region'],
             'database': ['host', 'database', 'user', 'password', 'port'],
             'logging': ['level', 'file'],
-            'embedding': ['model']
+            'embedding': ['model'],
+            'import': ['load_method']
         }
         
         # Just log warnings for missing values - we have defaults for everything
@@ -226,6 +407,22 @@ class ConfigLoader:
         """Get embedding configuration"""
         return self.config.get('embedding', {})
     
+    def get_import_config(self):
+        """Get Parquet import configuration"""
+        return self.config.get('import', {})
+    
+    def get_pipeline_config(self):
+        """Get pipeline orchestration configuration"""
+        return self.config.get('pipeline', {})
+    
+    def get_fts_config(self):
+        """Get full-text search configuration"""
+        return self.config.get('fts', {})
+    
+    def get_search_config(self):
+        """Get hybrid search configuration"""
+        return self.config.get('search', {})
+    
     def get_config(self, section=None):
         """
         Get configuration
@@ -268,4 +465,8 @@ if __name__ == "__main__":
     print("S3 Config:", loader.get_s3_config())
     print("DB Config:", loader.get_db_config())
     print("Logging Config:", loader.get_logging_config())
-    print("Embedding Config:", loader.get_embedding_config())
\ No newline at end of file
+    print("Embedding Config:", loader.get_embedding_config())
+    print("Import Config:", loader.get_import_config())
+    print("Pipeline Config:", loader.get_pipeline_config())
+    print("FTS Config:", loader.get_fts_config())
+    print("Search Config:", loader.get_search_config())
\ No newline at end of file
@@ -5,5 +5,11 @@ Provides functionality for interacting with PostgreSQL.
 """
 
 from .db_client import DBClient
+from .pool import ConnectionPool, PoolTimeout
 from .embeddings import EmbeddingsManager
-from .fts import FTSManager
\ No newline at end of file
+from .embedding_cache import EmbeddingCache
+from .ann_index import IVFIndex
+from .encode_pool import EncodePool
+from .model_registry import get_model, get_model_metadata, prewarm_model
+from .fts import FTSManager
+from .hybrid_search import HybridSearch
\ No newline at end of file
@@ -0,0 +1,404 @@
+"""
+ANN Index Module
+
+In-process approximate nearest neighbour search for embeddings stored as BYTEA.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from decimal import Decimal
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Training sample per list for k-means; more adds build time, not much quality
+TRAIN_POINTS_PER_LIST = 64
+
+KMEANS_ITERATIONS = 10
+
+# Rows scored against the centroids at a time (bounds the score matrix)
+ASSIGN_CHUNK = 8192
+
+# Delta entries plus tombstones, as a fraction of the clustered rows, that call for a rebuild
+DEFAULT_REBUILD_FRACTION = 0.2
+
+# Pointer to the directory holding the current version of an index
+CURRENT_FILE = 'CURRENT'
+DELTA_FILE = 'delta.npz'
+META_FILE = 'meta.json'
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first"""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def _normalize(vectors):
+    """Rows scaled to unit length (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+def _assign(vectors, centroids):
+    """Nearest (highest cosine) centroid of each row"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        chunk = vectors[start:start + ASSIGN_CHUNK]
+        assignment[start:start + ASSIGN_CHUNK] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+def _kmeans(vectors, nlist, iterations=KMEANS_ITERATIONS, seed=0):
+    """
+    Spherical k-means centroids, trained on a sample of the rows
+    
+    Returns:
+        numpy.ndarray: (nlist, dim) unit-length centroids
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * TRAIN_POINTS_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    
+    for _ in range(iterations):
+        assignment = _assign(sample, centroids)
+        
+        # Sum each list's members with one sort + reduceat instead of a Python loop
+        order = np.argsort(assignment, kind='stable')
+        counts = np.bincount(assignment, minlength=nlist)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        filled = counts > 0
+        
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+        
+        # Empty lists get a random sample row, so every list stays in use
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            sums[empty] = sample[rng.choice(len(sample), len(empty))]
+        
+        centroids = _normalize(sums)
+    
+    return centroids
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) index over unit-length embedding vectors.
+    
+    Rows are clustered with k-means into nlist lists and stored grouped by
+    list, so a search scores the centroids, then only the rows of the
+    nprobe closest lists. Rows added after the build go to a delta that is
+    searched exhaustively, and removed or replaced rows are tombstoned;
+    rebuild once needs_rebuild() says the delta has grown too large.
+    
+    Saved indexes are directories of .npy files. The clustered arrays are
+    memory-mapped on load and never rewritten in place: a rebuild writes a
+    new version directory and switches the CURRENT pointer, and an
+    incremental update only replaces the small delta file.
+    """
+    
+    def __init__(self, centroids, offsets, ids, vectors, hashes, metadata=None):
+        """
+        Initialize the index from its arrays (use build() or load())
+        
+        Args:
+            centroids (numpy.ndarray): (nlist, dim) list centroids
+            offsets (numpy.ndarray): nlist + 1 row offsets of the lists
+            ids (numpy.ndarray): Row ids as strings
+            vectors (numpy.ndarray): (rows, dim) unit-length vectors, grouped by list
+            hashes (numpy.ndarray): Text hash per row ('' if unknown)
+            metadata (dict, optional): Stored with the index (e.g. the model)
+        """
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+        self.vectors = vectors
+        self.hashes = hashes
+        self.metadata = dict(metadata or {})
+        
+        self.deleted = np.zeros(len(ids), dtype=bool)
+        self.delta = {}  # id -> (vector, hash)
+        
+        self._positions = None
+        self._delta_arrays = None
+        self._path = None
+        self._version = None
+    
+    @property
+    def dim(self):
+        return self.centroids.shape[1]
+    
+    @property
+    def nlist(self):
+        return len(self.centroids)
+    
+    def __len__(self):
+        """Number of live rows"""
+        return len(self.ids) - int(self.deleted.sum()) + len(self.delta)
+    
+    @classmethod
+    def build(cls, ids, vectors, hashes=None, nlist=None, metadata=None, seed=0):
+        """
+        Cluster rows into a new index
+        
+        Args:
+            ids (list): Row ids
+            vectors: (rows, dim) embedding vectors
+            hashes (list, optional): Text hash per row
+            nlist (int, optional): Number of lists, defaults to sqrt(rows)
+            metadata (dict, optional): Stored with the index
+            seed (int): Random seed for k-means
+        
+        Returns:
+            IVFIndex: The new index
+        """
+        vectors = _normalize(vectors)
+        if len(vectors) == 0:
+            raise ValueError("Cannot build an ANN index without vectors")
+        
+        nlist = int(nlist or max(1, int(np.sqrt(len(vectors)))))
+        nlist = max(1, min(nlist, len(vectors)))
+        
+        start = time.time()
+        centroids = _kmeans(vectors, nlist, seed=seed)
+        assignment = _assign(vectors, centroids)
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))]).astype(np.int64)
+        
+        ids = np.array([str(id_val) for id_val in ids])[order]
+        hashes = np.array([h or '' for h in hashes] if hashes is not None else [''] * len(order))[order]
+        
+        logger.info(f"Built ANN index: {len(order)} vectors in {nlist} lists in {time.time() - start:.1f}s")
+        return cls(centroids, offsets, ids, vectors[order], hashes, metadata)
+    
+    def search(self, query, k=10, nprobe=10):
+        """
+        Approximate nearest neighbours of a query
+        
+        Args:
+            query: Query vector
+            k (int): Number of results
+            nprobe (int): Lists to scan; nlist makes the search exact
+        
+        Returns:
+            list: (id, cosine similarity) tuples, best first, ids as Decimal
+        """
+        if k < 1:
+            return []
+        
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        
+        probe = top_k(self.centroids @ query, max(1, min(nprobe, self.nlist)))
+        rows = np.concatenate([np.arange(self.offsets[lst], self.offsets[lst + 1]) for lst in probe])
+        rows = rows[~self.deleted[rows]]
+        
+        ids = []
+        scores = np.empty(0, dtype=np.float32)
+        if len(rows):
+            main_scores = np.asarray(self.vectors[rows]) @ query
+            top = top_k(main_scores, k)
+            ids = [self.ids[i] for i in rows[top]]
+            scores = main_scores[top]
+        
+        if self.delta:
+            delta_ids, delta_vectors = self._delta_matrix()
+            delta_scores = delta_vectors @ query
+            top = top_k(delta_scores, k)
+            ids = ids + [delta_ids[i] for i in top]
+            scores = np.concatenate([scores, delta_scores[top]])
+        
+        keep = top_k(scores, k)
+        return [(Decimal(str(ids[i])), float(scores[i])) for i in keep]
+    
+    def _delta_matrix(self):
+        """Delta ids and vectors as one matrix, rebuilt after changes"""
+        if self._delta_arrays is None:
+            delta_ids = list(self.delta)
+            delta_vectors = np.vstack([self.delta[id_val][0] for id_val in delta_ids])
+            self._delta_arrays = (delta_ids, delta_vectors)
+        return self._delta_arrays
+    
+    def _position(self, id_val):
+        """Row of an id in the clustered arrays, None if it isn't there"""
+        if self._positions is None:
+            self._positions = {id_val: i for i, id_val in enumerate(self.ids.tolist())}
+        return self._positions.get(id_val)
+    
+    def add(self, ids, vectors, hashes=None):
+        """
+        Add or replace rows (they go to the delta until the next rebuild)
+        
+        Args:
+            ids (list): Row ids
+            vectors: (rows, dim) embedding vectors
+            hashes (list, optional): Text hash per row
+        """
+        vectors = _normalize(vectors)
+        if len(vectors) and vectors.shape[1] != self.dim:
+            raise ValueError(f"ANN index holds vectors of size {self.dim}, got {vectors.shape[1]}")
+        
+        hashes = hashes if hashes is not None else [None] * len(vectors)
+        for id_val, vector, text_hash in zip(ids, vectors, hashes):
+            id_val = str(id_val)
+            position = self._position(id_val)
+            if position is not None:
+                self.deleted[position] = True
+            self.delta[id_val] = (vector, text_hash or '')
+        self._delta_arrays = None
+    
+    def remove(self, ids):
+        """
+        Remove rows
+        
+        Args:
+            ids (list): Row ids
+        """
+        for id_val in ids:
+            id_val = str(id_val)
+            position = self._position(id_val)
+            if position is not None:
+                self.deleted[position] = True
+            self.delta.pop(id_val, None)
+        self._delta_arrays = None
+    
+    def id_hashes(self):
+        """
+        Text hash of every live row
+        
+        Returns:
+            dict: id (str) -> text hash ('' if unknown)
+        """
+        live = ~self.deleted
+        result = dict(zip(self.ids[live].tolist(), self.hashes[live].tolist()))
+        result.update((id_val, text_hash) for id_val, (_, text_hash) in self.delta.items())
+        return result
+    
+    def needs_rebuild(self, fraction=DEFAULT_REBUILD_FRACTION):
+        """Whether the delta and tombstones have outgrown the clustered rows"""
+        return len(self.delta) + int(self.deleted.sum()) > fraction * max(1, len(self.ids))
+    
+    def save(self, path):
+        """
+        Save the index
+        
+        A freshly built index is written to a new version directory, which
+        then becomes current; an index that was loaded from path only has
+        its delta file replaced.
+        
+        Args:
+            path (str): Index directory
+        """
+        os.makedirs(path, exist_ok=True)
+        
+        if self._path != os.path.abspath(path) or self._version is None:
+            version = f"v{time.time_ns()}"
+            version_dir = os.path.join(path, version)
+            os.makedirs(version_dir)
+            for name in ('centroids', 'offsets', 'ids', 'vectors', 'hashes'):
+                np.save(os.path.join(version_dir, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(version_dir, META_FILE), 'w') as f:
+                json.dump(self.metadata, f)
+            self._write_delta(version_dir)
+            
+            # Readers see the old version or the new one, never a mix
+            tmp_pointer = os.path.join(path, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+            with open(tmp_pointer, 'w') as f:
+                f.write(version)
+            os.replace(tmp_pointer, os.path.join(path, CURRENT_FILE))
+            
+            # Old versions can go; open memmaps of them stay valid until closed
+            for entry in os.listdir(path):
+                if entry.startswith('v') and entry != version:
+                    shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+            
+            self._path = os.path.abspath(path)
+            self._version = version
+        else:
+            self._write_delta(os.path.join(path, self._version))
+    
+    def _write_delta(self, version_dir):
+        """Write the delta rows and tombstones next to the clustered arrays"""
+        if self.delta:
+            delta_ids, delta_vectors = self._delta_matrix()
+        else:
+            delta_ids, delta_vectors = [], np.empty((0, self.dim), dtype=np.float32)
+        
+        tmp_path = os.path.join(version_dir, f"delta.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp_path,
+            ids=np.array(delta_ids, dtype=str),
+            vectors=delta_vectors,
+            hashes=np.array([self.delta[id_val][1] for id_val in delta_ids], dtype=str),
+            deleted=np.flatnonzero(self.deleted)
+        )
+        os.replace(tmp_path, os.path.join(version_dir, DELTA_FILE))
+    
+    @staticmethod
+    def current_version(path):
+        """Version directory name a saved index currently points to, None if there is none"""
+        try:
+            with open(os.path.join(path, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    
+    @classmethod
+    def saved_state(cls, path):
+        """
+        Token that changes whenever the saved index at path does
+        
+        Returns:
+            tuple: Current version and delta file mtime, None if there is no saved index
+        """
+        version = cls.current_version(path)
+        if version is None:
+            return None
+        try:
+            delta_mtime = os.stat(os.path.join(path, version, DELTA_FILE)).st_mtime_ns
+        except OSError:
+            delta_mtime = None
+        return (version, delta_mtime)
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a saved index
+        
+        Args:
+            path (str): Index directory
+            mmap (bool): Memory-map the clustered arrays instead of reading them
+        
+        Returns:
+            IVFIndex: The index, None if there is no saved index at path
+        """
+        version = cls.current_version(path)
+        if version is None:
+            return None
+        
+        version_dir = os.path.join(path, version)
+        mmap_mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ('centroids', 'offsets', 'ids', 'vectors', 'hashes')}
+        with open(os.path.join(version_dir, META_FILE)) as f:
+            metadata = json.load(f)
+        
+        index = cls(metadata=metadata, **arrays)
+        # Small and used on every search - keep these in memory
+        index.centroids = np.array(index.centroids)
+        index.offsets = np.array(index.offsets)
+        
+        delta_path = os.path.join(version_dir, DELTA_FILE)
+        if os.path.exists(delta_path):
+            with np.load(delta_path) as delta:
+                index.deleted[delta['deleted']] = True
+                for id_val, vector, text_hash in zip(delta['ids'].tolist(), delta['vectors'], delta['hashes'].tolist()):
+                    index.delta[id_val] = (vector, text_hash)
+        
+        index._path = os.path.abspath(path)
+        index._version = version
+        return index
@@ -0,0 +1,384 @@
+"""
+Embedding backends module
+
+Inference backends that turn texts into embedding vectors. The reference
+backend runs a sentence-transformers model in PyTorch; the ONNX backend runs
+the same transformer through ONNX Runtime on CPU, optionally int8-quantized.
+The hashing backend needs no model at all and is the fallback when the
+selected backend's libraries are missing.
+"""
+
+import functools
+import importlib.util
+import logging
+import os
+import re
+import zlib
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Only check that the libraries are installed - importing torch and friends
+# takes seconds, so that is left to load(), which may run in the background
+HAVE_SENTENCE_TRANSFORMERS = importlib.util.find_spec('sentence_transformers') is not None
+HAVE_ONNXRUNTIME = (importlib.util.find_spec('onnxruntime') is not None
+                    and importlib.util.find_spec('transformers') is not None)
+
+logger = logging.getLogger(__name__)
+
+# Where exported (and quantized) ONNX models are kept
+DEFAULT_ONNX_DIR = os.path.join(os.path.expanduser('~'), '.s3-postgres-pipeline', 'onnx')
+
+# sentence-transformers default for MiniLM/MPNet style models
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+ONNX_OPSET = 14
+
+# Vector size of the hashing backend (matches the default model)
+DEFAULT_HASHING_DIMENSION = 384
+
+# Character n-grams per word used by the hashing backend, in addition to the words
+HASHING_NGRAM = 3
+
+# Word features count more than the n-grams that overlap between similar words
+HASHING_WORD_WEIGHT = 1.0
+HASHING_NGRAM_WEIGHT = 0.5
+
+_TOKEN_RE = re.compile(r'\w+')
+
+class EmbeddingBackend(ABC):
+    """Base class for embedding inference backends"""
+    
+    # Config value that selects the backend
+    name = None
+    
+    def __init__(self, model_name, config=None, threads=None):
+        """
+        Initialize the backend (the model is loaded by load())
+        
+        Args:
+            model_name (str): Model name or path
+            config (dict, optional): Embedding configuration
+            threads (int, optional): CPU threads to use for inference
+        """
+        self.model_name = model_name
+        self.config = config or {}
+        self.threads = threads
+        self.dimension = None
+        self.max_seq_length = None
+        self.loaded = False
+    
+    def __getstate__(self):
+        """Pickle without the loaded model - it is reloaded on first use"""
+        state = self.__dict__.copy()
+        for key in self._model_attributes():
+            state[key] = None
+        state['loaded'] = False
+        return state
+    
+    def _model_attributes(self):
+        """Attributes holding loaded model objects"""
+        return ()
+    
+    @classmethod
+    def available(cls):
+        """Whether the libraries this backend needs are installed"""
+        return True
+    
+    @property
+    def cache_key(self):
+        """Identifies the vectors this backend produces (for the embedding cache)"""
+        return self.model_name
+    
+    @abstractmethod
+    def load(self):
+        """Load the model; sets dimension and max_seq_length"""
+        pass
+    
+    @abstractmethod
+    def encode(self, texts):
+        """
+        Encode a batch of texts
+        
+        Args:
+            texts (list): Texts to encode (one batch)
+        
+        Returns:
+            numpy.ndarray: (len(texts), dimension) float32 array
+        """
+        pass
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Full-precision PyTorch sentence-transformers model (the reference backend)"""
+    
+    name = 'sentence-transformers'
+    
+    def __init__(self, model_name, config=None, threads=None):
+        super().__init__(model_name, config, threads)
+        self.model = None
+    
+    def _model_attributes(self):
+        return ('model',)
+    
+    @classmethod
+    def available(cls):
+        return HAVE_SENTENCE_TRANSFORMERS
+    
+    def load(self):
+        if self.loaded:
+            return
+        from sentence_transformers import SentenceTransformer
+        
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+        
+        self.model = SentenceTransformer(self.model_name, device=self.config.get('device'))
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.max_seq_length = self.model.max_seq_length
+        self.loaded = True
+    
+    def encode(self, texts):
+        # Callers already batch (and length-sort) texts - don't let encode re-split them
+        return self.model.encode(texts, batch_size=max(1, len(texts)), convert_to_numpy=True)
+
+class ONNXBackend(EmbeddingBackend):
+    """
+    The model's transformer exported to ONNX and run with ONNX Runtime on CPU.
+    
+    Token embeddings are mean-pooled over the attention mask and (by default)
+    L2-normalized, which matches sentence-transformers models such as
+    all-MiniLM-L6-v2. The export happens once and is kept in onnx_dir; with
+    quantize enabled the weights are additionally converted to int8 with
+    dynamic quantization.
+    """
+    
+    name = 'onnx'
+    
+    def __init__(self, model_name, config=None, threads=None):
+        super().__init__(model_name, config, threads)
+        self.quantize = bool(self.config.get('quantize', False))
+        self.normalize = bool(self.config.get('normalize', True))
+        self.onnx_dir = self.config.get('onnx_dir') or DEFAULT_ONNX_DIR
+        self.session = None
+        self.tokenizer = None
+        self.input_names = None
+    
+    def _model_attributes(self):
+        return ('session', 'tokenizer', 'input_names')
+    
+    @classmethod
+    def available(cls):
+        return HAVE_ONNXRUNTIME
+    
+    @property
+    def cache_key(self):
+        return f"{self.model_name}:onnx-int8" if self.quantize else f"{self.model_name}:onnx"
+    
+    def _repo_id(self):
+        """Hugging Face id for a sentence-transformers short name"""
+        if '/' in self.model_name or os.path.exists(self.model_name):
+            return self.model_name
+        return f"sentence-transformers/{self.model_name}"
+    
+    def _model_dir(self):
+        return os.path.join(self.onnx_dir, self._repo_id().strip('/').replace('/', '--'))
+    
+    def load(self):
+        if self.loaded:
+            return
+        
+        import onnxruntime
+        from transformers import AutoTokenizer
+        
+        model_dir = self._model_dir()
+        model_path = os.path.join(model_dir, 'model.onnx')
+        if not os.path.exists(model_path):
+            self._export(model_dir, model_path)
+        
+        if self.quantize:
+            quantized_path = os.path.join(model_dir, 'model_int8.onnx')
+            if not os.path.exists(quantized_path):
+                self._quantize(model_path, quantized_path)
+            model_path = quantized_path
+        
+        options = onnxruntime.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+        
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+        self.max_seq_length = int(self.config.get('max_seq_length') or DEFAULT_MAX_SEQ_LENGTH)
+        self.loaded = True
+        
+        logger.info(f"Loaded ONNX model {model_path} ({'int8' if self.quantize else 'fp32'}, "
+                    f"dimension {self.dimension})")
+    
+    def _export(self, model_dir, model_path):
+        """Export the Hugging Face transformer to ONNX (needs torch and transformers)"""
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        
+        repo_id = self._repo_id()
+        logger.info(f"Exporting {repo_id} to ONNX in {model_dir}")
+        os.makedirs(model_dir, exist_ok=True)
+        
+        tokenizer = AutoTokenizer.from_pretrained(repo_id)
+        model = AutoModel.from_pretrained(repo_id)
+        model.eval()
+        
+        sample = tokenizer(["export sample"], return_tensors='pt')
+        input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+        
+        class _LastHiddenState(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+            
+            def forward(self, *inputs):
+                return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+        
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+        
+        # Write under a temporary name so concurrent workers never load a partial file
+        tmp_path = f"{model_path}.{os.getpid()}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                _LastHiddenState(model),
+                tuple(sample[name] for name in input_names),
+                tmp_path,
+                input_names=input_names,
+                output_names=['last_hidden_state'],
+                dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET
+            )
+        tokenizer.save_pretrained(model_dir)
+        os.replace(tmp_path, model_path)
+    
+    def _quantize(self, model_path, quantized_path):
+        """Dynamic int8 quantization of the exported model's weights"""
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        
+        logger.info(f"Quantizing {model_path} to int8")
+        tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+        quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, quantized_path)
+    
+    def encode(self, texts):
+        features = self.tokenizer(
+            list(texts),
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors='np'
+        )
+        inputs = {name: features[name].astype(np.int64) for name in self.input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+        
+        # Mean pooling over real (non-padding) tokens
+        mask = inputs['attention_mask'][..., None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        
+        if self.normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+        
+        return embeddings.astype(np.float32)
+
+@functools.lru_cache(maxsize=1 << 16)
+def _feature_hash(feature):
+    """Stable 32-bit hash of a feature (unlike hash(), the same in every process)"""
+    return zlib.crc32(feature.encode('utf-8'))
+
+def _text_features(text, ngram=HASHING_NGRAM):
+    """Hashes of the words of a text and of their character n-grams"""
+    words = _TOKEN_RE.findall(text.lower())
+    word_hashes = [_feature_hash(f"w:{word}") for word in words]
+    
+    ngram_hashes = []
+    for word in words:
+        padded = f"<{word}>"
+        for i in range(max(1, len(padded) - ngram + 1)):
+            ngram_hashes.append(_feature_hash(f"g:{padded[i:i+ngram]}"))
+    
+    return word_hashes, ngram_hashes
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Deterministic embeddings from feature hashing, without a model.
+    
+    Words and their character n-grams are hashed into the vector (the low
+    bits pick the component, the top bit the sign) and the result is
+    L2-normalized, so texts sharing words or word fragments get similar
+    vectors. The hash is stable, so a text gets the same vector in every
+    process and run. Meant for tests and environments without a model.
+    """
+    
+    name = 'hashing'
+    
+    def __init__(self, model_name, config=None, threads=None):
+        super().__init__(model_name, config, threads)
+        self.dimension = int(self.config.get('hashing_dimension') or DEFAULT_HASHING_DIMENSION)
+        self.max_seq_length = DEFAULT_MAX_SEQ_LENGTH
+    
+    @property
+    def cache_key(self):
+        return f"hashing-{self.dimension}"
+    
+    def load(self):
+        self.loaded = True
+    
+    def encode(self, texts):
+        counts = []
+        hashes = []
+        weights = []
+        for text in texts:
+            word_hashes, ngram_hashes = _text_features(text)
+            counts.append(len(word_hashes) + len(ngram_hashes))
+            hashes.extend(word_hashes)
+            hashes.extend(ngram_hashes)
+            weights.extend([HASHING_WORD_WEIGHT] * len(word_hashes))
+            weights.extend([HASHING_NGRAM_WEIGHT] * len(ngram_hashes))
+        
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        rows = np.repeat(np.arange(len(counts)), counts)
+        columns = (hashes % self.dimension).astype(np.intp)
+        values = np.where(hashes >> 31, -1.0, 1.0) * np.asarray(weights, dtype=np.float64)
+        
+        # Accumulate every feature of the batch at once (add.at sums repeated indices)
+        embeddings = np.zeros((len(counts), self.dimension), dtype=np.float64)
+        np.add.at(embeddings, (rows, columns), values)
+        
+        # Texts without any word characters keep a zero vector
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.clip(norms, 1e-12, None)
+        
+        return embeddings.astype(np.float32)
+
+BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    ONNXBackend.name: ONNXBackend,
+    HashingBackend.name: HashingBackend,
+}
+
+def create_backend(model_name, config=None, threads=None):
+    """
+    Build the backend selected by the embedding config's 'backend' key
+    
+    Args:
+        model_name (str): Model name or path
+        config (dict, optional): Embedding configuration
+        threads (int, optional): CPU threads to use for inference
+    
+    Returns:
+        EmbeddingBackend: Unloaded backend
+    """
+    config = config or {}
+    name = config.get('backend') or SentenceTransformerBackend.name
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of {tuple(BACKENDS)}")
+    return BACKENDS[name](model_name, config, threads)
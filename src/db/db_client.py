@@ -3,13 +3,30 @@ Database client module for PostgreSQL operations.
 """
 import psycopg2
 import psycopg2.extras
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import logging
+import os
+import threading
 import urllib.parse
+import uuid
+from contextlib import contextmanager
 from sqlalchemy import create_engine
 import traceback
 
+from .pool import ConnectionPool
+
 logger = logging.getLogger(__name__)
 
+# Connection pool defaults (overridable in the database config)
+DEFAULT_POOL_MIN_SIZE = 1
+DEFAULT_POOL_MAX_SIZE = 10
+DEFAULT_POOL_TIMEOUT = 120  # seconds to wait for a free connection
+DEFAULT_POOL_HEALTH_CHECK_INTERVAL = 30  # ping connections idle for longer than this
+
+# Rows fetched per round trip by server-side cursors
+DEFAULT_FETCH_SIZE = 5000
+
 class DBClient:
     """Handles database connections and operations"""
     
@@ -18,18 +35,86 @@ class DBClient:
         Initialize with database config
         """
         self.config = config
-        # Try connecting once to validate config
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        
+        # Open the pool's minimum connections now, which also validates the config
         try:
-            conn = self.get_connection()
-            conn.close()
-            logger.debug("Initial DB connection successful")
+            self._get_pool()
+            logger.debug("Initial DB connection pool opened")
         except Exception as e:
             # Just log the error, don't raise - let later operations handle connection issues
             logger.warning(f"Initial DB connection failed: {e}")
     
+    def __getstate__(self):
+        """Pickle without the pool - connections can't cross process boundaries"""
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_pool_pid'] = None
+        state['_pool_lock'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool_lock = threading.Lock()
+    
+    def _get_pool(self):
+        """Get the connection pool, creating it on first use (and again after a fork)"""
+        if self._pool is not None and self._pool_pid == os.getpid():
+            return self._pool
+        
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                timeout = self.config.get('pool_timeout', DEFAULT_POOL_TIMEOUT)
+                pool = ConnectionPool(
+                    self.get_connection,
+                    min_size=int(self.config.get('pool_min_size', DEFAULT_POOL_MIN_SIZE)),
+                    max_size=int(self.config.get('pool_max_size', DEFAULT_POOL_MAX_SIZE)),
+                    timeout=float(timeout) if timeout is not None else None,
+                    health_check_interval=float(self.config.get('pool_health_check_interval',
+                                                                DEFAULT_POOL_HEALTH_CHECK_INTERVAL))
+                )
+                pool.open()
+                self._pool = pool
+                self._pool_pid = os.getpid()
+        
+        return self._pool
+    
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection
+        
+        Usage:
+            with db_client.connection() as conn:
+                ...
+        
+        The transaction is rolled back if the block raises, and the
+        connection goes back to the pool afterwards either way.
+        """
+        with self._get_pool().connection() as conn:
+            yield conn
+    
+    def get_pool_metrics(self):
+        """Checkout counts, wait times and connection counts for the pool"""
+        if self._pool is None:
+            return {}
+        return self._pool.get_metrics()
+    
+    def close(self):
+        """Close the pool's connections"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+    
     def get_connection(self):
-        """Gets a new database connection"""
-        # TODO: Add connection pooling in the future
+        """
+        Gets a new, unpooled database connection
+        
+        The caller owns it and has to close it. Prefer connection(), which
+        borrows from the pool.
+        """
         try:
             conn = psycopg2.connect(
                 host=self.config.get('host', 'localhost'),
@@ -64,41 +149,67 @@ class DBClient:
     
     def execute_query(self, query, params=None, fetchall=True):
         """Run a query and get results"""
-        conn = None
-        cursor = None
-        
         # Simple check if query is SELECT or not
         is_select = query.strip().upper().startswith(('SELECT', 'SHOW', 'WITH'))
         
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(query, params)
-            
-            if is_select:
-                if fetchall:
-                    return cursor.fetchall()
-                else:
-                    return cursor.fetchone()
-            else:
-                conn.commit()
-                return True
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    
+                    if is_select:
+                        if fetchall:
+                            return cursor.fetchall()
+                        else:
+                            return cursor.fetchone()
+                    else:
+                        conn.commit()
+                        return True
         except Exception as e:
-            if conn:
-                conn.rollback()
             # Added query text for easier debugging
             logger.error(f"Query failed: {e}")
             logger.error(f"Query was: {query}")
             if params:
                 logger.error(f"Params: {params}")
             raise
-        finally:
-            # Always clean up resources
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
+    
+    def stream_query(self, query, params=None, fetch_size=DEFAULT_FETCH_SIZE):
+        """
+        Run a SELECT through a named (server-side) cursor and yield rows in chunks
+        
+        Only fetch_size rows are held in client memory at a time, so this
+        works for tables of any size. The pooled connection stays checked
+        out until the generator is exhausted or closed.
+        
+        Args:
+            query (str): SELECT query
+            params (tuple, optional): Query parameters
+            fetch_size (int): Rows per chunk (and per network round trip)
+            
+        Yields:
+            list: Up to fetch_size rows
+        """
+        cursor_name = f"stream_{uuid.uuid4().hex[:12]}"
+        
+        try:
+            with self.connection() as conn:
+                with conn.cursor(name=cursor_name) as cursor:
+                    cursor.itersize = fetch_size
+                    # The query ends up inside DECLARE ... CURSOR FOR, so no trailing semicolon
+                    cursor.execute(query.strip().rstrip(';'), params)
+                    
+                    while True:
+                        rows = cursor.fetchmany(fetch_size)
+                        if not rows:
+                            break
+                        yield rows
+                
+                # Read-only, just end the transaction
+                conn.rollback()
+        except Exception as e:
+            logger.error(f"Streaming query failed: {e}")
+            logger.error(f"Query was: {query}")
+            raise
     
     def table_exists(self, table_name):
         """Check if table exists"""
@@ -166,43 +277,117 @@ class DBClient:
         Batch insert using psycopg2.extras.execute_values
         Much faster than individual INSERTs
         """
-        conn = None
-        cursor = None
-        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Build the INSERT query
-            cols_str = ', '.join(columns)
-            insert_sql = f"INSERT INTO {table} ({cols_str}) VALUES %s"
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    # Build the INSERT query
+                    cols_str = ', '.join(columns)
+                    insert_sql = f"INSERT INTO {table} ({cols_str}) VALUES %s"
+                    
+                    # Do the insert with batching for better performance
+                    psycopg2.extras.execute_values(
+                        cursor, 
+                        insert_sql, 
+                        values, 
+                        page_size=page_size
+                    )
+                    conn.commit()
+                    
+                    # Check if we actually inserted anything
+                    if cursor.rowcount == 0:
+                        logger.warning(f"No rows inserted into {table}")
+                        return False
+                        
+                    logger.info(f"Inserted {cursor.rowcount} rows into {table}")
+                    return True
+        except Exception as e:
+            logger.error(f"Insert failed: {e}")
+            raise
+    
+    def copy_record_batches(self, table, columns, batches):
+        """
+        Bulk load Arrow record batches using COPY ... FROM STDIN
+        
+        Each batch is rendered to CSV by pyarrow and streamed straight to
+        the server, so rows never get materialized as Python tuples.
+        All batches are loaded in a single transaction.
+        
+        Args:
+            table (str): Target table
+            columns (list): Column names, in batch column order
+            batches (iterable): pyarrow.RecordBatch objects
             
-            # Do the insert with batching for better performance
-            psycopg2.extras.execute_values(
-                cursor, 
-                insert_sql, 
-                values, 
-                page_size=page_size
-            )
-            conn.commit()
+        Returns:
+            int: Number of rows loaded
+        """
+        cols_str = ', '.join(columns)
+        copy_sql = f"COPY {table} ({cols_str}) FROM STDIN WITH (FORMAT csv)"
+        write_options = pa_csv.WriteOptions(include_header=False)
+        total_rows = 0
+        
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    for batch in batches:
+                        if batch.num_rows == 0:
+                            continue
+                        
+                        # Render in Arrow's native CSV writer, then hand the buffer to COPY
+                        sink = pa.BufferOutputStream()
+                        pa_csv.write_csv(batch, sink, write_options)
+                        cursor.copy_expert(copy_sql, pa.BufferReader(sink.getvalue()))
+                        total_rows += batch.num_rows
+                    
+                    conn.commit()
             
-            # Check if we actually inserted anything
-            if cursor.rowcount == 0:
-                logger.warning(f"No rows inserted into {table}")
-                return False
-                
-            logger.info(f"Inserted {cursor.rowcount} rows into {table}")
-            return True
+            if total_rows == 0:
+                logger.warning(f"No rows copied into {table}")
+            else:
+                logger.info(f"Copied {total_rows} rows into {table}")
+            return total_rows
         except Exception as e:
-            if conn:
-                conn.rollback()
-            logger.error(f"Insert failed: {e}")
+            logger.error(f"COPY failed: {e}")
             raise
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
+    
+    def get_result_columns(self, table_name):
+        """
+        Columns of a table that belong in result rows, in table order
+        
+        tsvector columns (such as the generated fts_tsv) are search
+        internals and left out, so rows look the same whatever the FTS layout.
+        """
+        query = """
+        SELECT attname
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+          AND atttypid <> 'tsvector'::regtype
+        ORDER BY attnum;
+        """
+        return [row[0] for row in self.execute_query(query, (table_name,))]
+    
+    def fetch_scored_rows(self, table, matches):
+        """
+        Rows of a table for scored ids, e.g. search matches
+        
+        Args:
+            table (str): Table with an id column
+            matches (list): (id, score) tuples, best first
+            
+        Returns:
+            list: Table rows with the score appended, in the order of matches
+        """
+        if not matches:
+            return []
+        
+        ids, scores = zip(*matches)
+        columns = ', '.join(f"t.{col}" for col in self.get_result_columns(table))
+        query = f"""
+        SELECT {columns}, s.score
+        FROM unnest(%s::numeric[], %s::float8[]) WITH ORDINALITY AS s(id, score, position)
+        JOIN {table} t ON t.id = s.id
+        ORDER BY s.position;
+        """
+        return self.execute_query(query, (list(ids), list(scores)))
     
     # Shortcut for count query
     def count_rows(self, table):
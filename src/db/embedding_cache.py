@@ -0,0 +1,267 @@
+"""
+Embedding cache module
+
+Persistent on-disk cache of embedding vectors keyed by model and text hash.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Disk budget for each model's vector file
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+INDEX_FILE = 'index.sqlite'
+
+# Stay well under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+class EmbeddingCache:
+    """
+    Embeddings of previously seen texts, kept on local disk across runs.
+    
+    Vectors live in one memory-mapped float32 file per model with room for
+    max_bytes worth of rows. A SQLite index maps (model, sha256 of text) to
+    a row of that file and records when it was last used; once a model's
+    file is full, the least recently used entries are evicted and their rows
+    reused. The file size is fixed when a model is first cached.
+    """
+    
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache
+        
+        Args:
+            path (str): Cache directory (created if missing)
+            max_bytes (int): Disk budget per model
+        """
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        
+        self._conn = None
+        self._conn_pid = None
+        self._stores = {}  # model -> memmap
+        self._lock = threading.RLock()
+    
+    def __getstate__(self):
+        """Pickle without the SQLite connection, memmaps or lock"""
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_conn_pid'] = None
+        state['_stores'] = {}
+        state['_lock'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def text_key(text):
+        """Cache key for a text"""
+        return hashlib.sha256(text.encode('utf-8')).digest()
+    
+    def _connect(self):
+        """SQLite index connection, opened lazily and again after a fork"""
+        if self._conn is not None and self._conn_pid == os.getpid():
+            return self._conn
+        
+        os.makedirs(self.path, exist_ok=True)
+        
+        # Autocommit mode; writes use explicit transactions below
+        conn = sqlite3.connect(os.path.join(self.path, INDEX_FILE), timeout=30,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS models (
+            model TEXT PRIMARY KEY,
+            dim INTEGER NOT NULL,
+            capacity INTEGER NOT NULL,
+            file TEXT NOT NULL
+        );
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+            model TEXT NOT NULL,
+            sha BLOB NOT NULL,
+            slot INTEGER NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (model, sha)
+        );
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries (model, last_used);")
+        
+        self._conn = conn
+        self._conn_pid = os.getpid()
+        self._stores = {}
+        return conn
+    
+    def _store(self, model, dim=None):
+        """
+        Memory-mapped vector file of a model
+        
+        Args:
+            model (str): Model key
+            dim (int, optional): Vector size; needed to create the file on first use
+        
+        Returns:
+            numpy.memmap: (capacity, dim) float32 array, or None if the model
+                has nothing cached and no dim was given
+        """
+        store = self._stores.get(model)
+        if store is not None:
+            if dim is not None and dim != store.shape[1]:
+                raise ValueError(f"Cached vectors for {model} have size {store.shape[1]}, got {dim}")
+            return store
+        
+        conn = self._connect()
+        row = conn.execute("SELECT dim, capacity, file FROM models WHERE model = ?;", (model,)).fetchone()
+        if row is None:
+            if dim is None:
+                return None
+            capacity = max(1, self.max_bytes // (4 * dim))
+            file_name = hashlib.sha1(model.encode('utf-8')).hexdigest()[:16] + '.f32'
+            conn.execute("INSERT OR IGNORE INTO models (model, dim, capacity, file) VALUES (?, ?, ?, ?);",
+                         (model, dim, capacity, file_name))
+            row = conn.execute("SELECT dim, capacity, file FROM models WHERE model = ?;", (model,)).fetchone()
+            logger.info(f"Created embedding cache for {model}: {capacity} vectors of size {dim}")
+        
+        store_dim, capacity, file_name = row
+        if dim is not None and dim != store_dim:
+            raise ValueError(f"Cached vectors for {model} have size {store_dim}, got {dim}")
+        
+        file_path = os.path.join(self.path, file_name)
+        size = capacity * store_dim * 4
+        if not os.path.exists(file_path) or os.path.getsize(file_path) < size:
+            # Sparse file - disk is only used as rows get written
+            with open(file_path, 'ab') as f:
+                f.truncate(size)
+        
+        store = np.memmap(file_path, dtype=np.float32, mode='r+', shape=(capacity, store_dim))
+        self._stores[model] = store
+        return store
+    
+    def get_many(self, model, keys):
+        """
+        Look up cached vectors
+        
+        Args:
+            model (str): Model key
+            keys (list): Keys from text_key()
+        
+        Returns:
+            list: A vector per key, None where it isn't cached
+        """
+        results = [None] * len(keys)
+        if not keys:
+            return results
+        
+        with self._lock:
+            store = self._store(model)
+            found = {}
+            
+            if store is not None:
+                conn = self._connect()
+                unique = list(set(keys))
+                for i in range(0, len(unique), LOOKUP_CHUNK):
+                    chunk = unique[i:i+LOOKUP_CHUNK]
+                    placeholders = ', '.join(['?'] * len(chunk))
+                    found.update(conn.execute(
+                        f"SELECT sha, slot FROM entries WHERE model = ? AND sha IN ({placeholders});",
+                        [model] + chunk
+                    ).fetchall())
+                
+                if found:
+                    now = time.time()
+                    conn.execute("BEGIN;")
+                    try:
+                        conn.executemany("UPDATE entries SET last_used = ? WHERE model = ? AND sha = ?;",
+                                         [(now, model, sha) for sha in found])
+                        conn.execute("COMMIT;")
+                    except Exception:
+                        conn.execute("ROLLBACK;")
+                        raise
+                
+                for i, key in enumerate(keys):
+                    slot = found.get(key)
+                    if slot is not None:
+                        results[i] = np.array(store[slot])
+        
+        return results
+    
+    def put_many(self, model, keys, vectors):
+        """
+        Add vectors to the cache, evicting least recently used ones if full
+        
+        Args:
+            model (str): Model key
+            keys (list): Keys from text_key()
+            vectors: Vectors in the same order as keys
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return
+        
+        with self._lock:
+            store = self._store(model, vectors.shape[1])
+            capacity = store.shape[0]
+            conn = self._connect()
+            
+            # IMMEDIATE takes the write lock up front, so slot allocation is
+            # serialized with other processes sharing the cache
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                pending = dict(zip(keys, vectors))
+                unique = list(pending)
+                for i in range(0, len(unique), LOOKUP_CHUNK):
+                    chunk = unique[i:i+LOOKUP_CHUNK]
+                    placeholders = ', '.join(['?'] * len(chunk))
+                    for (sha,) in conn.execute(
+                        f"SELECT sha FROM entries WHERE model = ? AND sha IN ({placeholders});",
+                        [model] + chunk
+                    ):
+                        pending.pop(sha, None)
+                
+                # More new vectors than the file holds: keep the last ones
+                new_keys = list(pending)[-capacity:]
+                
+                count = conn.execute("SELECT COUNT(*) FROM entries WHERE model = ?;", (model,)).fetchone()[0]
+                slots = list(range(count, min(capacity, count + len(new_keys))))
+                
+                evict = len(new_keys) - len(slots)
+                if evict > 0:
+                    victims = conn.execute(
+                        "SELECT sha, slot FROM entries WHERE model = ? ORDER BY last_used LIMIT ?;",
+                        (model, evict)
+                    ).fetchall()
+                    conn.executemany("DELETE FROM entries WHERE model = ? AND sha = ?;",
+                                     [(model, sha) for sha, _ in victims])
+                    slots.extend(slot for _, slot in victims)
+                
+                now = time.time()
+                for key, slot in zip(new_keys, slots):
+                    store[slot] = pending[key]
+                conn.executemany("INSERT INTO entries (model, sha, slot, last_used) VALUES (?, ?, ?, ?);",
+                                 [(model, key, slot, now) for key, slot in zip(new_keys, slots)])
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+    
+    def close(self):
+        """Flush vector files and close the index"""
+        with self._lock:
+            for store in self._stores.values():
+                store.flush()
+            self._stores = {}
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._conn_pid = None
@@ -4,245 +4,1037 @@ Embeddings Manager Module
 This module provides functionality for managing embeddings in PostgreSQL.
 """
 
+import io
 import logging
+import os
+import struct
+import threading
+import time
 import numpy as np
 import psycopg2
+import psycopg2.extras
 
-# Import sentence-transformers for embeddings
-try:
-    from sentence_transformers import SentenceTransformer
-    HAVE_SENTENCE_TRANSFORMERS = True
-except ImportError:
-    HAVE_SENTENCE_TRANSFORMERS = False
-    logging.warning("Warning: sentence-transformers not installed. Embeddings will be simulated.")
+from .ann_index import DEFAULT_REBUILD_FRACTION, IVFIndex, top_k
+from .backends import HAVE_SENTENCE_TRANSFORMERS, HashingBackend, create_backend
+from .embedding_cache import EmbeddingCache
+from .encode_pool import EncodePool
+from .model_registry import get_model, get_model_metadata, prewarm_model
+
+if not HAVE_SENTENCE_TRANSFORMERS:
+    logging.warning("Warning: sentence-transformers not installed. Embeddings will be simulated with feature hashing.")
 
 logger = logging.getLogger(__name__)
 
+# How embeddings are written: binary COPY through a staging table, or multi-row INSERTs
+WRITE_METHODS = ('copy', 'execute_values')
+
+# Rows per COPY buffer / INSERT page
+DEFAULT_WRITE_BATCH_SIZE = 5000
+
+# Disk budget per model for the embedding cache
+DEFAULT_CACHE_MAX_MB = 1024
+
+# pgvector index access methods; lists / m / ef_construction are tuned per method
+VECTOR_INDEX_TYPES = ('ivfflat', 'hnsw')
+DEFAULT_HNSW_M = 16
+DEFAULT_HNSW_EF_CONSTRUCTION = 64
+DEFAULT_HNSW_EF_SEARCH = 40
+
+# Memory for the index build; ivfflat's k-means and HNSW graphs spill to disk below this
+DEFAULT_INDEX_MAINTENANCE_WORK_MEM = '1GB'
+
+# ivfflat lists scanned per similarity search (pgvector's default of 1 trades away recall)
+DEFAULT_SEARCH_PROBES = 10
+
+# Rows per round trip when scanning a BYTEA embeddings table for a search
+DEFAULT_SEARCH_FETCH_SIZE = 10000
+
+# PostgreSQL binary COPY framing
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+NULL_FIELD = struct.pack('>i', -1)
+
+def ivfflat_lists(rows):
+    """
+    ivfflat lists for a table size, per the pgvector guidance: rows / 1000
+    up to a million rows, sqrt(rows) beyond
+    """
+    if rows <= 1000000:
+        return max(1, rows // 1000)
+    return int(rows ** 0.5)
+
 class EmbeddingsManager:
     """Manages embedding operations in PostgreSQL"""
     
-    def __init__(self, db_client, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, db_client, model_name='all-MiniLM-L6-v2', config=None):
         """
         Initialize the embeddings manager
         
         Args:
             db_client (DBClient): Database client
             model_name (str): Embedding model name
+            config (dict, optional): Embedding configuration
         """
         self.db_client = db_client
         self.model_name = model_name
+        self.config = config or {}
         self.model = None
         self.embedding_size = 768  # Default size
         
+        # Inference backend (config 'backend'), loaded on first use
+        self.backend = create_backend(model_name, self.config)
+        
+        self.write_method = self.config.get('write_method', 'copy')
+        if self.write_method not in WRITE_METHODS:
+            raise ValueError(f"Unknown write method '{self.write_method}', expected one of {WRITE_METHODS}")
+        self.write_batch_size = int(self.config.get('write_batch_size', DEFAULT_WRITE_BATCH_SIZE))
+        
+        # Entities can be processed concurrently - only load the model once
+        self._model_lock = threading.Lock()
+        
+        # Optional on-disk cache of embeddings for texts seen in earlier batches or runs
+        self.cache = None
+        cache_dir = self.config.get('cache_dir')
+        if cache_dir:
+            max_mb = int(self.config.get('cache_max_mb', DEFAULT_CACHE_MAX_MB))
+            self.cache = EmbeddingCache(cache_dir, max_bytes=max_mb * 1024 * 1024)
+            logger.info(f"Using embedding cache in {cache_dir} ({max_mb} MB per model)")
+        
+        # Optional pool of worker processes, each encoding with its own model copy
+        self.encode_pool = None
+        encode_workers = int(self.config.get('encode_workers', 0) or 0)
+        if encode_workers > 0:
+            if self.backend.available():
+                threads = int(self.config.get('threads_per_worker', 0) or 0) or None
+                self.encode_pool = EncodePool(self.model_name, encode_workers, threads, self.config)
+            else:
+                logger.warning(f"encode_workers ignored: {self.backend.name} backend not installed")
+        
+        # Optional in-process ANN index for tables that store embeddings as BYTEA
+        self.ann_index_dir = self.config.get('ann_index_dir')
+        self._ann_indexes = {}  # table -> (saved state, IVFIndex)
+        self._ann_lock = threading.Lock()
+    
+    def __getstate__(self):
+        """Pickle without the model or lock (process workers load their own)"""
+        state = self.__dict__.copy()
+        state['model'] = None
+        state['_model_lock'] = None
+        state['_ann_indexes'] = {}
+        state['_ann_lock'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._model_lock = threading.Lock()
+        self._ann_lock = threading.Lock()
+    
+    def close(self):
+        """Stop the encode pool and flush the embedding cache, if any"""
+        if self.encode_pool is not None:
+            self.encode_pool.close()
+        if self.cache is not None:
+            self.cache.close()
+        
     def load_model(self):
-        """Load the embedding model"""
-        if not HAVE_SENTENCE_TRANSFORMERS:
-            logger.warning("sentence-transformers not installed, using random embeddings")
+        """
+        Load the embedding model
+        
+        Returns:
+            EmbeddingBackend: The loaded backend, None if its libraries are missing
+        """
+        if not self.backend.available():
+            logger.warning(f"{self.backend.name} backend not installed, using hashed embeddings")
             return None
-            
-        if self.model is None:
-            logger.info(f"Loading embedding model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            self.embedding_size = self.model.get_sentence_embedding_dimension()
-            logger.info(f"Model loaded with embedding size: {self.embedding_size}")
+        
+        with self._model_lock:
+            if self.model is None:
+                # Shared with every other manager in this process (and with a background prewarm)
+                self.model = get_model(self.model_name, self.config)
+                self.embedding_size = self.model.dimension
         
         return self.model
     
+    def prewarm(self):
+        """
+        Start loading the model in the background so the first encode doesn't wait for it
+        
+        With an encode pool, the worker processes are started (and load their
+        models) instead.
+        """
+        if not self.backend.available():
+            return
+        
+        if self.encode_pool is not None:
+            self.encode_pool.warm_up()
+        else:
+            prewarm_model(self.model_name, self.config)
+    
     def get_embedding_size(self):
-        """Get the embedding size"""
-        if HAVE_SENTENCE_TRANSFORMERS and self.model is None:
-            self.load_model()
+        """Get the embedding size, from model metadata when possible so no weights are loaded"""
+        if self.backend.available() and self.model is None:
+            dimension = self.backend.dimension or get_model_metadata(self.model_name)['dimension']
+            if dimension:
+                self.embedding_size = dimension
+            else:
+                self.load_model()
         return self.embedding_size
     
-    def generate_embeddings(self, texts):
+    def get_max_seq_length(self):
+        """Longest input (in tokens) the model reads, None if unknown"""
+        if not self.backend.available():
+            return None
+        if self.model is not None:
+            return self.model.max_seq_length
+        
+        # Don't load the model just for this - with an encode pool it may never be needed here
+        max_seq_length = get_model_metadata(self.model_name)['max_seq_length']
+        if max_seq_length:
+            return max_seq_length
+        return self.load_model().max_seq_length
+    
+    def generate_embeddings(self, texts, stats=None):
         """
         Generate embeddings for a list of texts
         
+        When a cache is configured, texts already in it are not re-encoded.
+        
         Args:
             texts (list): List of text strings
+            stats (dict, optional): cache_hits / cache_misses are added to it
             
         Returns:
             list: List of embeddings
         """
         if not texts:
             return []
+        
+        return self.generate_embeddings_batches([texts], stats)[0]
+    
+    def generate_embeddings_batches(self, batches, stats=None):
+        """
+        Generate embeddings for several batches of texts
+        
+        With an encode pool the batches are encoded in parallel by the
+        worker processes; otherwise one after the other in this process.
+        
+        Args:
+            batches (list): Lists of texts
+            stats (dict, optional): cache_hits / cache_misses are added to it
             
-        if HAVE_SENTENCE_TRANSFORMERS:
+        Returns:
+            list: Embeddings for each batch, in the same order
+        """
+        if self.cache is not None:
+            return self._generate_cached(batches, stats)
+        
+        return self._encode_many(batches)
+    
+    def _generate_cached(self, batches, stats=None):
+        """Look texts up in the cache, encode only the misses and cache those"""
+        model_key = self.vector_key()
+        
+        lookups = []
+        for texts in batches:
+            keys = [EmbeddingCache.text_key(text) for text in texts]
+            try:
+                vectors = self.cache.get_many(model_key, keys)
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed, encoding without it: {str(e)}")
+                vectors = [None] * len(texts)
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            lookups.append((keys, vectors, missing))
+        
+        # Encode every batch's misses in one go so a pool can work on them in parallel
+        encoded_batches = iter(self._encode_many(
+            [[texts[i] for i in missing] for texts, (_, _, missing) in zip(batches, lookups) if missing]
+        ))
+        
+        results = []
+        for texts, (keys, vectors, missing) in zip(batches, lookups):
+            if missing:
+                encoded = np.asarray(next(encoded_batches), dtype=np.float32)
+                try:
+                    self.cache.put_many(model_key, [keys[i] for i in missing], encoded)
+                except Exception as e:
+                    logger.warning(f"Could not add embeddings to the cache: {str(e)}")
+                for i, vector in zip(missing, encoded):
+                    vectors[i] = vector
+            
+            if stats is not None:
+                stats['cache_hits'] = stats.get('cache_hits', 0) + len(texts) - len(missing)
+                stats['cache_misses'] = stats.get('cache_misses', 0) + len(missing)
+            
+            results.append(np.vstack(vectors) if vectors else [])
+        
+        return results
+    
+    def _encode_many(self, batches):
+        """Encode batches on the encode pool if there is one, else in this process"""
+        if self.encode_pool is not None:
+            return self.encode_pool.map(batches)
+        return [self._encode(texts) for texts in batches]
+    
+    def _encode(self, texts):
+        """Encode texts with the model (or the simulated fallback)"""
+        if self.backend.available():
             model = self.load_model()
             embeddings = model.encode(texts)
             return embeddings
         else:
-            # Generate random embeddings as fallback
-            return [self.generate_random_embedding(text) for text in texts]
+            # Hashed embeddings as fallback, the whole batch at once
+            return self._fallback_backend().encode(texts)
+    
+    def _fallback_backend(self):
+        """Hashing backend producing vectors of the current embedding size"""
+        return HashingBackend(self.model_name, {'hashing_dimension': self.embedding_size})
+    
+    def vector_key(self):
+        """
+        Identifies the vectors this manager produces
+        
+        The backend's cache key (model, backend, quantization), or the
+        fallback's when the backend isn't installed, so simulated vectors
+        are never taken for real model output.
+        """
+        return self.backend.cache_key if self.backend.available() else self._fallback_backend().cache_key
     
     def generate_random_embedding(self, text):
         """
-        Generate a random embedding for a text (for testing)
+        Generate a simulated embedding for a text (for testing)
+        
+        The vector is derived from a stable hash of the text's words, so it
+        is the same in every process and similar texts get similar vectors.
         
         Args:
             text (str): Input text
             
         Returns:
-            numpy.ndarray: Random embedding vector
+            numpy.ndarray: Unit-length embedding vector
         """
-        # Use text hash as seed for reproducibility
-        np.random.seed(hash(text) % 2**32)
-        # Generate random vector
-        embedding = np.random.normal(0, 1, self.embedding_size)
-        # Normalize to unit length
-        embedding = embedding / np.linalg.norm(embedding)
-        return embedding
+        return self._fallback_backend().encode([text])[0]
     
-    def create_embeddings_table(self, entity_name):
+    def create_embeddings_table(self, entity_name, incremental=False):
         """
         Create the embeddings table for an entity
         
         Args:
             entity_name (str): Entity name
+            incremental (bool): Keep an existing table (and its text hashes)
+                instead of recreating it, as long as its embedding column
+                still matches the model
             
         Returns:
             dict: Table configuration
         """
-        conn = self.db_client.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            logger.info(f"Creating embeddings table for {entity_name}")
+        with self.db_client.connection() as conn:
+            with conn.cursor() as cursor:
+                logger.info(f"Creating embeddings table for {entity_name}")
             
-            embeddings_table = f"{entity_name}_embeddings"
+                embeddings_table = f"{entity_name}_embeddings"
             
-            # First, attempt to create pgvector extension if it's not already installed
-            try:
-                cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-                conn.commit()
-                logger.info("pgvector extension installed/verified")
+                # First, attempt to create pgvector extension if it's not already installed
+                try:
+                    cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+                    conn.commit()
+                    logger.info("pgvector extension installed/verified")
                 
-                # Get embedding dimension
-                embedding_size = self.get_embedding_size()
+                    # Get embedding dimension
+                    embedding_size = self.get_embedding_size()
                 
-                # Create the embeddings table with vector type
-                drop_table_sql = f"DROP TABLE IF EXISTS {embeddings_table};"
-                create_table_sql = f"""
-                CREATE TABLE {embeddings_table} (
-                    id NUMERIC(38,0) PRIMARY KEY REFERENCES {entity_name}(id),
-                    embedding vector({embedding_size})
-                );
-                """
+                    # Create the embeddings table with vector type
+                    self._create_table(cursor, entity_name, embeddings_table, f"vector({embedding_size})", incremental)
+                    conn.commit()
                 
-                cursor.execute(drop_table_sql)
-                cursor.execute(create_table_sql)
-                conn.commit()
+                    logger.info(f"Created {embeddings_table} table with vector type")
                 
-                logger.info(f"Created {embeddings_table} table with vector type")
+                    # Return configuration showing we're using pgvector
+                    return {
+                        'table': embeddings_table,
+                        'has_pgvector': True,
+                        'embedding_size': embedding_size
+                    }
                 
-                # Return configuration showing we're using pgvector
-                return {
-                    'table': embeddings_table,
-                    'has_pgvector': True,
-                    'embedding_size': embedding_size
-                }
+                except Exception as e:
+                    # The failed statement aborted the transaction
+                    conn.rollback()
+                    logger.warning(f"Could not create pgvector table: {str(e)}")
+                    logger.warning("Falling back to BYTEA storage for embeddings")
                 
-            except Exception as e:
-                logger.warning(f"Could not create pgvector table: {str(e)}")
-                logger.warning("Falling back to BYTEA storage for embeddings")
+                    # Create a table using BYTEA for storing embeddings
+                    self._create_table(cursor, entity_name, embeddings_table, 'bytea', incremental)
+                    conn.commit()
                 
-                # Create a table using BYTEA for storing embeddings
-                drop_table_sql = f"DROP TABLE IF EXISTS {embeddings_table};"
-                create_table_sql = f"""
-                CREATE TABLE {embeddings_table} (
-                    id NUMERIC(38,0) PRIMARY KEY REFERENCES {entity_name}(id),
-                    embedding BYTEA
+                    logger.info(f"Created {embeddings_table} table with BYTEA type")
+                
+                    # Return configuration showing we're using BYTEA
+                    return {
+                        'table': embeddings_table,
+                        'has_pgvector': False,
+                        'embedding_size': self.embedding_size
+                    }
+    
+    def _create_table(self, cursor, entity_name, embeddings_table, column_type, incremental):
+        """
+        (Re)create the embeddings table
+        
+        In incremental mode an existing table whose embedding column already
+        has column_type is kept; only the text_hash column is added if an
+        older run created the table without it.
+        
+        Returns:
+            bool: Whether the table was (re)created
+        """
+        if incremental:
+            cursor.execute(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = to_regclass(%s) AND attname = 'embedding' AND NOT attisdropped;",
+                (embeddings_table,)
+            )
+            row = cursor.fetchone()
+            if row and row[0] == column_type:
+                cursor.execute(f"ALTER TABLE {embeddings_table} ADD COLUMN IF NOT EXISTS text_hash TEXT;")
+                logger.info(f"Keeping existing {embeddings_table} table for incremental update")
+                return False
+            if row:
+                logger.info(f"Embedding column of {embeddings_table} is {row[0]}, expected {column_type}; recreating it")
+        
+        cursor.execute(f"DROP TABLE IF EXISTS {embeddings_table};")
+        cursor.execute(f"""
+        CREATE TABLE {embeddings_table} (
+            id NUMERIC(38,0) PRIMARY KEY REFERENCES {entity_name}(id),
+            embedding {column_type},
+            text_hash TEXT
+        );
+        """)
+        return True
+    
+    def text_hash_sql(self, text_columns, alias):
+        """
+        SQL expression hashing the combined text columns of a row
+        
+        vector_key() is part of the hash, so switching the model, backend
+        or quantization re-encodes everything. The expression takes a %(model)s parameter - pass
+        text_hash_params() along with the query.
+        
+        Args:
+            text_columns (list): Text columns that make up the embedded text
+            alias (str): Alias of the entity table in the query
+            
+        Returns:
+            str: SQL expression
+        """
+        columns = ', '.join(f"{alias}.{col}" for col in text_columns)
+        return f"md5(%(model)s || ':' || concat_ws(' ', {columns}))"
+    
+    def text_hash_params(self):
+        """Query parameters for text_hash_sql()"""
+        return {'model': self.vector_key()}
+    
+    def delete_stale_embeddings(self, entity_name, embeddings_config, text_columns):
+        """
+        Delete embeddings whose entity row is gone or no longer has any text
+        
+        The importer recreates entity tables with DROP ... CASCADE, which
+        also drops the foreign key on a kept embeddings table; it is put
+        back here once the stale rows are gone.
+        
+        Args:
+            entity_name (str): Entity name
+            embeddings_config (dict): Embeddings table configuration
+            text_columns (list): Text columns that make up the embedded text
+            
+        Returns:
+            int: Number of embeddings deleted
+        """
+        embeddings_table = embeddings_config['table']
+        columns = ', '.join(f"e.{col}" for col in text_columns)
+        
+        with self.db_client.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                DELETE FROM {embeddings_table} m
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {entity_name} e
+                    WHERE e.id = m.id AND concat_ws(' ', {columns}) !~ '^\\s*$'
                 );
-                """
+                """)
+                deleted = cursor.rowcount
                 
-                cursor.execute(drop_table_sql)
-                cursor.execute(create_table_sql)
+                cursor.execute(
+                    "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f';",
+                    (embeddings_table,)
+                )
+                if cursor.fetchone() is None:
+                    cursor.execute(
+                        f"ALTER TABLE {embeddings_table} ADD FOREIGN KEY (id) REFERENCES {entity_name}(id);"
+                    )
                 conn.commit()
-                
-                logger.info(f"Created {embeddings_table} table with BYTEA type")
-                
-                # Return configuration showing we're using BYTEA
-                return {
-                    'table': embeddings_table,
-                    'has_pgvector': False,
-                    'embedding_size': self.embedding_size
-                }
-        finally:
-            cursor.close()
-            conn.close()
-    
-    def store_embeddings(self, entity_name, embeddings_config, ids, embeddings, batch_size=32):
+        
+        logger.info(f"Deleted {deleted} stale embeddings from {embeddings_table}")
+        return deleted
+    
+    def count_unchanged_embeddings(self, entity_name, embeddings_config, text_columns):
+        """
+        Count embeddings whose stored text hash still matches the entity row
+        
+        Args:
+            entity_name (str): Entity name
+            embeddings_config (dict): Embeddings table configuration
+            text_columns (list): Text columns that make up the embedded text
+            
+        Returns:
+            int: Rows that don't need re-encoding
+        """
+        query = f"""
+        SELECT COUNT(*)
+        FROM {entity_name} e
+        JOIN {embeddings_config['table']} m ON m.id = e.id
+        WHERE m.text_hash = {self.text_hash_sql(text_columns, 'e')};
+        """
+        result = self.db_client.execute_query(query, self.text_hash_params(), fetchall=False)
+        return result[0] if result else 0
+    
+    def store_embeddings(self, entity_name, embeddings_config, ids, embeddings, batch_size=None,
+                         create_index=True, stats=None, text_hashes=None):
         """
         Store embeddings in the database
         
+        Rows are upserted in bulk: either with binary COPY into a temporary
+        staging table followed by one INSERT ... SELECT, or with multi-row
+        INSERTs through execute_values (see the write_method config).
+        
         Args:
             entity_name (str): Entity name
             embeddings_config (dict): Embeddings table configuration
             ids (list): List of entity IDs
             embeddings (list): List of embedding vectors
-            batch_size (int): Batch size for inserts
+            batch_size (int, optional): Rows per COPY buffer / INSERT page
+            create_index (bool): Build the vector index afterwards. Callers
+                storing in several chunks pass False and call
+                create_vector_index once at the end.
+            stats (dict, optional): Filled with rows, write time and rows/sec
+            text_hashes (list, optional): Text hash per id (see text_hash_sql),
+                used by incremental runs to skip unchanged rows
             
         Returns:
             bool: Success status
         """
-        if not ids or not embeddings or len(ids) != len(embeddings):
+        if ids is None or embeddings is None or len(ids) == 0 or len(ids) != len(embeddings):
             logger.error("Invalid IDs or embeddings data")
             return False
         
-        conn = self.db_client.get_connection()
-        cursor = conn.cursor()
+        if text_hashes is not None and len(text_hashes) != len(ids):
+            logger.error("Text hashes don't line up with IDs")
+            return False
+        
+        batch_size = batch_size or self.write_batch_size
+        embeddings_table = embeddings_config['table']
+        has_pgvector = embeddings_config['has_pgvector']
+        
+        # One float32 matrix for the whole call - avoids per-row conversions
+        matrix = np.asarray(embeddings, dtype=np.float32)
         
+        start_time = time.time()
         try:
-            embeddings_table = embeddings_config['table']
-            has_pgvector = embeddings_config['has_pgvector']
-            
-            for i in range(0, len(ids), batch_size):
-                batch_ids = ids[i:i+batch_size]
-                batch_embeddings = embeddings[i:i+batch_size]
-                
-                logger.info(f"Storing embeddings batch {i//batch_size + 1}/{len(ids)//batch_size + 1}")
-                
-                if has_pgvector:
-                    # Using pgvector extension
-                    for j, embedding in enumerate(batch_embeddings):
-                        cursor.execute(
-                            f"INSERT INTO {embeddings_table} (id, embedding) VALUES (%s, %s) "
-                            f"ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding",
-                            (batch_ids[j], embedding.tolist() if hasattr(embedding, 'tolist') else embedding)
-                        )
-                else:
-                    # Using BYTEA storage
-                    for j, embedding in enumerate(batch_embeddings):
-                        # Convert to binary
-                        embedding_array = np.array(embedding, dtype=np.float32)
-                        embedding_binary = embedding_array.tobytes()
+            with self.db_client.connection() as conn:
+                with conn.cursor() as cursor:
+                    for i in range(0, len(ids), batch_size):
+                        batch_ids = ids[i:i+batch_size]
+                        batch_matrix = matrix[i:i+batch_size]
+                        batch_hashes = text_hashes[i:i+batch_size] if text_hashes is not None else [None] * len(batch_ids)
                         
-                        cursor.execute(
-                            f"INSERT INTO {embeddings_table} (id, embedding) VALUES (%s, %s) "
-                            f"ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding",
-                            (batch_ids[j], psycopg2.Binary(embedding_binary))
-                        )
-            
-            conn.commit()
+                        logger.debug(f"Storing embeddings batch {i//batch_size + 1}/{(len(ids) - 1)//batch_size + 1}")
+                        
+                        if self.write_method == 'copy':
+                            self._copy_embeddings(cursor, embeddings_table, has_pgvector, batch_ids, batch_matrix, batch_hashes)
+                        else:
+                            self._insert_embeddings(cursor, embeddings_table, has_pgvector, batch_ids, batch_matrix, batch_hashes)
+                    
+                    conn.commit()
+        except Exception as e:
+            logger.error(f"Error storing embeddings: {str(e)}")
+            return False
+        
+        write_time = time.time() - start_time
+        rows_per_sec = len(ids) / write_time if write_time > 0 else 0.0
+        logger.info(f"Stored {len(ids)} embeddings in {embeddings_table} in {write_time:.2f}s ({rows_per_sec:.0f} rows/s)")
+        
+        if stats is not None:
+            stats['rows'] = stats.get('rows', 0) + len(ids)
+            stats['write_time'] = stats.get('write_time', 0.0) + write_time
+            stats['rows_per_sec'] = stats['rows'] / stats['write_time'] if stats['write_time'] > 0 else 0.0
+            stats['write_method'] = self.write_method
+        
+        if create_index:
+            self.create_vector_index(embeddings_config)
+        
+        return True
+    
+    def create_vector_index(self, embeddings_config, stats=None, rebuild=False):
+        """
+        Create the vector similarity index
+        
+        pgvector tables get an ivfflat or HNSW index (config index_type),
+        with ivfflat lists sized to the row count and HNSW built with
+        hnsw_m / hnsw_ef_construction, using index_maintenance_work_mem.
+        An existing index built with matching settings is kept. BYTEA
+        tables get (or update) the in-process ANN index when ann_index_dir
+        is configured.
+        
+        Args:
+            embeddings_config (dict): Embeddings table configuration
+            stats (dict, optional): Filled with the index type, options and build time
+            rebuild (bool): Rebuild even if the existing index matches
             
-            # Create vector similarity index if using pgvector
-            if has_pgvector:
-                try:
+        Returns:
+            bool: Whether an index is in place
+        """
+        if not embeddings_config.get('has_pgvector'):
+            if self.ann_index_dir:
+                return self.update_ann_index(embeddings_config)
+            return False
+        
+        index_type = self.config.get('index_type', 'ivfflat')
+        if index_type not in VECTOR_INDEX_TYPES:
+            logger.warning(f"Unknown vector index type '{index_type}', expected one of {VECTOR_INDEX_TYPES}")
+            return False
+        
+        embeddings_table = embeddings_config['table']
+        index_name = f"idx_{embeddings_table}_vector"
+        try:
+            with self.db_client.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"SELECT COUNT(*) FROM {embeddings_table} WHERE embedding IS NOT NULL;")
+                    rows = cursor.fetchone()[0]
+                    if rows == 0:
+                        conn.rollback()
+                        logger.info(f"No embeddings in {embeddings_table}, not creating a vector index")
+                        return False
+                    
+                    options = self._vector_index_options(index_type, rows)
+                    if not rebuild and self._vector_index_matches(cursor, index_name, index_type, options):
+                        conn.rollback()
+                        logger.info(f"Keeping existing {index_type} index on {embeddings_table}")
+                        return True
+                    
+                    start = time.time()
+                    cursor.execute("SELECT set_config('maintenance_work_mem', %s, true);",
+                                   (self.config.get('index_maintenance_work_mem', DEFAULT_INDEX_MAINTENANCE_WORK_MEM),))
+                    parallel_workers = int(self.config.get('index_parallel_workers', 0) or 0)
+                    if parallel_workers > 0:
+                        cursor.execute("SELECT set_config('max_parallel_maintenance_workers', %s, true);",
+                                       (str(parallel_workers),))
+                    
+                    # Build under a temporary name so searches keep the old index until the swap
+                    with_clause = ', '.join(f"{key} = {value}" for key, value in options.items())
+                    cursor.execute(f"DROP INDEX IF EXISTS {index_name}_new;")
                     cursor.execute(
-                        f"CREATE INDEX IF NOT EXISTS idx_{embeddings_table}_vector "
-                        f"ON {embeddings_table} USING ivfflat (embedding vector_cosine_ops);"
+                        f"CREATE INDEX {index_name}_new ON {embeddings_table} "
+                        f"USING {index_type} (embedding vector_cosine_ops) WITH ({with_clause});"
                     )
+                    cursor.execute(f"DROP INDEX IF EXISTS {index_name};")
+                    cursor.execute(f"ALTER INDEX {index_name}_new RENAME TO {index_name};")
                     conn.commit()
-                    logger.info(f"Created vector similarity index for {embeddings_table}")
-                except Exception as e:
-                    logger.warning(f"Could not create vector index: {str(e)}")
+                    build_time = time.time() - start
+            
+            logger.info(f"Created {index_type} index ({with_clause}) on {embeddings_table} "
+                        f"for {rows} rows in {build_time:.2f}s")
+            if stats is not None:
+                stats['index_type'] = index_type
+                stats['index_options'] = options
+                stats['index_build_time'] = build_time
+            return True
+        except Exception as e:
+            logger.warning(f"Could not create vector index: {str(e)}")
+            return False
+    
+    def _vector_index_options(self, index_type, rows):
+        """WITH (...) storage parameters of a vector index for a table size"""
+        if index_type == 'hnsw':
+            return {
+                'm': int(self.config.get('hnsw_m', DEFAULT_HNSW_M)),
+                'ef_construction': int(self.config.get('hnsw_ef_construction', DEFAULT_HNSW_EF_CONSTRUCTION))
+            }
+        return {'lists': int(self.config.get('ivfflat_lists', 0) or 0) or ivfflat_lists(rows)}
+    
+    def _vector_index_matches(self, cursor, index_name, index_type, options):
+        """
+        Whether the existing index already has the wanted type and options
+        
+        ivfflat lists only need to be within a factor of two, so a growing
+        table isn't re-clustered on every incremental run.
+        """
+        cursor.execute(
+            "SELECT am.amname, c.reloptions FROM pg_class c JOIN pg_am am ON am.oid = c.relam "
+            "WHERE c.oid = to_regclass(%s);",
+            (index_name,)
+        )
+        row = cursor.fetchone()
+        if row is None or row[0] != index_type:
+            return False
+        
+        existing = dict(option.split('=', 1) for option in row[1] or [])
+        if index_type == 'ivfflat':
+            lists = int(existing.get('lists', 100))
+            return options['lists'] / 2 <= lists <= options['lists'] * 2
+        return all(int(existing.get(key, -1)) == value for key, value in options.items())
+    
+    def _ann_index_path(self, embeddings_table):
+        return os.path.join(self.ann_index_dir, embeddings_table)
+    
+    def build_ann_index(self, embeddings_config):
+        """
+        Build the in-process ANN index of a BYTEA embeddings table from scratch
+        
+        Args:
+            embeddings_config (dict): Embeddings table configuration
+            
+        Returns:
+            bool: Whether an index was built
+        """
+        embeddings_table = embeddings_config['table']
+        try:
+            ids, vectors, hashes = [], [], []
+            for rows in self.db_client.stream_query(
+                f"SELECT id::text, embedding, text_hash FROM {embeddings_table} WHERE embedding IS NOT NULL",
+                fetch_size=int(self.config.get('search_fetch_size', DEFAULT_SEARCH_FETCH_SIZE))
+            ):
+                ids.extend(row[0] for row in rows)
+                vectors.append(np.frombuffer(b''.join(bytes(row[1]) for row in rows), dtype=np.float32)
+                               .reshape(len(rows), -1))
+                hashes.extend(row[2] for row in rows)
+            
+            if not ids:
+                logger.warning(f"No embeddings in {embeddings_table}, not building an ANN index")
+                return False
             
+            index = IVFIndex.build(
+                ids, np.vstack(vectors), hashes,
+                nlist=int(self.config.get('ann_lists', 0) or 0) or None,
+                metadata={'table': embeddings_table, 'model': self.vector_key()}
+            )
+            path = self._ann_index_path(embeddings_table)
+            with self._ann_lock:
+                index.save(path)
+                self._ann_indexes[embeddings_table] = (IVFIndex.saved_state(path), index)
             return True
+        except Exception as e:
+            logger.warning(f"Could not build ANN index for {embeddings_table}: {str(e)}")
+            return False
+    
+    def update_ann_index(self, embeddings_config):
+        """
+        Bring the ANN index of a BYTEA embeddings table up to date
+        
+        Rows whose text hash differs from the one in the index are re-read
+        and added, rows that are gone are removed. The index is rebuilt
+        instead when there isn't one yet, it was built from other vectors, or
+        the changes exceed ann_rebuild_fraction of it.
+        
+        Args:
+            embeddings_config (dict): Embeddings table configuration
             
+        Returns:
+            bool: Whether the index is up to date
+        """
+        embeddings_table = embeddings_config['table']
+        path = self._ann_index_path(embeddings_table)
+        
+        try:
+            # A private copy - searches keep using the cached index until the update is saved
+            index = IVFIndex.load(path)
+            if index is None or index.metadata.get('model') != self.vector_key():
+                return self.build_ann_index(embeddings_config)
+            
+            fetch_size = int(self.config.get('search_fetch_size', DEFAULT_SEARCH_FETCH_SIZE))
+            known = index.id_hashes()
+            changed = []
+            seen = set()
+            for rows in self.db_client.stream_query(
+                f"SELECT id::text, text_hash FROM {embeddings_table} WHERE embedding IS NOT NULL",
+                fetch_size=fetch_size
+            ):
+                for id_val, text_hash in rows:
+                    seen.add(id_val)
+                    if not text_hash or known.get(id_val) != text_hash:
+                        changed.append(id_val)
+            removed = [id_val for id_val in known if id_val not in seen]
+            
+            fraction = float(self.config.get('ann_rebuild_fraction', DEFAULT_REBUILD_FRACTION))
+            pending = len(index.delta) + int(index.deleted.sum()) + len(changed) + len(removed)
+            if pending > fraction * max(1, len(index.ids)):
+                logger.info(f"{len(changed)} changed and {len(removed)} removed embeddings in "
+                            f"{embeddings_table}; rebuilding its ANN index")
+                return self.build_ann_index(embeddings_config)
+            
+            for i in range(0, len(changed), fetch_size):
+                rows = self.db_client.execute_query(
+                    f"SELECT id::text, embedding, text_hash FROM {embeddings_table} WHERE id = ANY(%s::numeric[]);",
+                    (changed[i:i+fetch_size],)
+                )
+                if rows:
+                    vectors = np.frombuffer(b''.join(bytes(row[1]) for row in rows), dtype=np.float32)
+                    index.add([row[0] for row in rows], vectors.reshape(len(rows), -1), [row[2] for row in rows])
+            index.remove(removed)
+            
+            with self._ann_lock:
+                index.save(path)
+                self._ann_indexes[embeddings_table] = (IVFIndex.saved_state(path), index)
+            
+            logger.info(f"Updated ANN index of {embeddings_table}: {len(changed)} added or changed, "
+                        f"{len(removed)} removed")
+            return True
         except Exception as e:
-            logger.error(f"Error storing embeddings: {str(e)}")
-            conn.rollback()
+            logger.warning(f"Could not update ANN index for {embeddings_table}: {str(e)}")
             return False
-        finally:
-            cursor.close()
-            conn.close()
\ No newline at end of file
+    
+    def _get_ann_index(self, embeddings_table):
+        """Saved ANN index of a table (memory-mapped, reloaded when it is saved again), None if there is none"""
+        if not self.ann_index_dir:
+            return None
+        
+        path = self._ann_index_path(embeddings_table)
+        state = IVFIndex.saved_state(path)
+        with self._ann_lock:
+            cached = self._ann_indexes.get(embeddings_table)
+            if cached is not None and cached[0] == state:
+                return cached[1]
+            if state is None:
+                return None
+            index = IVFIndex.load(path)
+            self._ann_indexes[embeddings_table] = (state, index)
+            return index
+    
+    def search(self, entity_name, text, k=10):
+        """
+        Find the entities whose embeddings are most similar to a text
+        
+        The text is encoded with the same model as the table. On pgvector
+        tables the nearest neighbours come from the <=> (cosine distance)
+        operator, which uses the ivfflat index; BYTEA tables are scanned and
+        scored in NumPy.
+        
+        Args:
+            entity_name (str): Entity name
+            text (str): Search text
+            k (int): Maximum number of results
+            
+        Returns:
+            list: Entity rows with a trailing cosine similarity score, best first
+        """
+        embeddings_table = f"{entity_name}_embeddings"
+        
+        if not self.db_client.table_exists(embeddings_table):
+            logger.error(f"Embeddings table {embeddings_table} does not exist")
+            return []
+        
+        try:
+            query_vector = self._query_vector(text)
+            if self._has_vector_column(embeddings_table):
+                results = self._search_pgvector(entity_name, embeddings_table, query_vector, k)
+            else:
+                matches = self._search_bytea(embeddings_table, query_vector, k)
+                results = self.db_client.fetch_scored_rows(entity_name, matches)
+            logger.info(f"Found {len(results)} similar {entity_name} rows for query '{text}'")
+            return results
+        except Exception as e:
+            logger.error(f"Error in vector search: {str(e)}")
+            return []
+    
+    def search_ids(self, entity_name, text, k=10):
+        """
+        Like search(), but only the ids and scores of the matches
+        
+        Args:
+            entity_name (str): Entity name
+            text (str): Search text
+            k (int): Maximum number of results
+            
+        Returns:
+            list: (id, score) tuples, best first
+        """
+        embeddings_table = f"{entity_name}_embeddings"
+        
+        if not self.db_client.table_exists(embeddings_table):
+            logger.error(f"Embeddings table {embeddings_table} does not exist")
+            return []
+        
+        try:
+            query_vector = self._query_vector(text)
+            if self._has_vector_column(embeddings_table):
+                return self._search_pgvector(None, embeddings_table, query_vector, k)
+            return self._search_bytea(embeddings_table, query_vector, k)
+        except Exception as e:
+            logger.error(f"Error in vector search: {str(e)}")
+            return []
+    
+    def _query_vector(self, text):
+        """Unit-length float32 embedding of a search text"""
+        vector = np.asarray(self.generate_embeddings([text]), dtype=np.float32)[0]
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+    
+    def _has_vector_column(self, embeddings_table):
+        """Whether the table stores pgvector vectors (as opposed to BYTEA)"""
+        result = self.db_client.execute_query(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = to_regclass(%s) AND attname = 'embedding' AND NOT attisdropped;",
+            (embeddings_table,),
+            fetchall=False
+        )
+        return bool(result) and result[0].startswith('vector')
+    
+    def _search_pgvector(self, entity_name, embeddings_table, query_vector, k):
+        """
+        Nearest neighbours with pgvector's cosine distance operator
+        
+        With an entity_name the entity rows are joined in; without one only
+        (id, score) tuples are returned.
+        """
+        if entity_name:
+            columns = ', '.join(f"e.{col}" for col in self.db_client.get_result_columns(entity_name))
+            select = (f"SELECT {columns}, 1 - (m.embedding <=> %(query)s::vector) AS score "
+                      f"FROM {entity_name} e JOIN {embeddings_table} m ON m.id = e.id")
+        else:
+            select = (f"SELECT m.id, 1 - (m.embedding <=> %(query)s::vector) AS score "
+                      f"FROM {embeddings_table} m")
+        
+        params = {
+            'query': '[' + ','.join('%.8g' % value for value in query_vector.tolist()) + ']',
+            'k': k,
+            'probes': int(self.config.get('search_probes', DEFAULT_SEARCH_PROBES)),
+            # HNSW returns at most ef_search rows
+            'ef_search': max(k, int(self.config.get('hnsw_ef_search', DEFAULT_HNSW_EF_SEARCH)))
+        }
+        
+        with self.db_client.connection() as conn:
+            with conn.cursor() as cursor:
+                # Only lasts for this transaction
+                cursor.execute("SELECT set_config('ivfflat.probes', %(probes)s::text, true), "
+                               "set_config('hnsw.ef_search', %(ef_search)s::text, true);", params)
+                cursor.execute(f"""
+                {select}
+                ORDER BY m.embedding <=> %(query)s::vector
+                LIMIT %(k)s;
+                """, params)
+                results = cursor.fetchall()
+            conn.rollback()
+        
+        return results
+    
+    def _search_bytea(self, embeddings_table, query_vector, k):
+        """
+        Top-k over a BYTEA table
+        
+        Uses the in-process ANN index when there is one; otherwise the table
+        is scanned and scored exactly, a chunk at a time in NumPy.
+        
+        Returns:
+            list: (id, score) tuples, best first
+        """
+        if k < 1:
+            return []
+        
+        index = self._get_ann_index(embeddings_table)
+        if index is not None:
+            return index.search(query_vector, k, int(self.config.get('search_probes', DEFAULT_SEARCH_PROBES)))
+        
+        best_ids = []
+        best_scores = np.empty(0, dtype=np.float32)
+        fetch_size = int(self.config.get('search_fetch_size', DEFAULT_SEARCH_FETCH_SIZE))
+        for rows in self.db_client.stream_query(
+            f"SELECT id, embedding FROM {embeddings_table} WHERE embedding IS NOT NULL",
+            fetch_size=fetch_size
+        ):
+            matrix = np.frombuffer(b''.join(bytes(row[1]) for row in rows), dtype=np.float32)
+            matrix = matrix.reshape(len(rows), len(query_vector))
+            
+            norms = np.clip(np.linalg.norm(matrix, axis=1), 1e-12, None)
+            scores = (matrix @ query_vector) / norms
+            
+            # Keep the running top-k: this chunk's best merged with the best so far
+            top = top_k(scores, k)
+            best_ids.extend(rows[i][0] for i in top)
+            best_scores = np.concatenate([best_scores, scores[top]])
+            keep = top_k(best_scores, k)
+            best_ids = [best_ids[i] for i in keep]
+            best_scores = best_scores[keep]
+        
+        return list(zip(best_ids, best_scores.tolist()))
+    
+    def _copy_embeddings(self, cursor, embeddings_table, has_pgvector, ids, matrix, hashes):
+        """
+        Upsert a batch with binary COPY into a staging table
+        
+        The staging table keeps ids as text so the binary rows are trivial to
+        build; the INSERT ... SELECT casts them back to NUMERIC and handles
+        conflicts in one statement.
+        """
+        stage_table = f"_stage_{embeddings_table}"
+        column_type = 'vector' if has_pgvector else 'BYTEA'
+        
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {stage_table} "
+            f"(id TEXT, embedding {column_type}, text_hash TEXT) ON COMMIT DROP;"
+        )
+        
+        buffer = io.BytesIO()
+        buffer.write(PGCOPY_HEADER)
+        
+        if has_pgvector:
+            # pgvector binary format: int16 dim, int16 unused, big-endian float4 values
+            vector_header = struct.pack('>hh', matrix.shape[1], 0)
+            payload_len = struct.pack('>i', len(vector_header) + 4 * matrix.shape[1])
+            rows = matrix.astype('>f4')
+        else:
+            # BYTEA keeps the native float32 layout used by the rest of the code
+            vector_header = b''
+            payload_len = struct.pack('>i', 4 * matrix.shape[1])
+            rows = matrix
+        
+        for id_val, row, text_hash in zip(ids, rows, hashes):
+            id_bytes = str(id_val).encode()
+            buffer.write(struct.pack('>hi', 3, len(id_bytes)))
+            buffer.write(id_bytes)
+            buffer.write(payload_len)
+            buffer.write(vector_header)
+            buffer.write(row.tobytes())
+            if text_hash is None:
+                buffer.write(NULL_FIELD)
+            else:
+                hash_bytes = text_hash.encode()
+                buffer.write(struct.pack('>i', len(hash_bytes)))
+                buffer.write(hash_bytes)
+        
+        buffer.write(PGCOPY_TRAILER)
+        buffer.seek(0)
+        
+        cursor.copy_expert(f"COPY {stage_table} (id, embedding, text_hash) FROM STDIN WITH (FORMAT binary)", buffer)
+        cursor.execute(
+            f"INSERT INTO {embeddings_table} (id, embedding, text_hash) "
+            f"SELECT id::numeric, embedding, text_hash FROM {stage_table} "
+            f"ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding, text_hash = EXCLUDED.text_hash;"
+        )
+        cursor.execute(f"TRUNCATE {stage_table};")
+    
+    def _insert_embeddings(self, cursor, embeddings_table, has_pgvector, ids, matrix, hashes):
+        """Upsert a batch with multi-row INSERTs via execute_values"""
+        if has_pgvector:
+            # pgvector text literal, e.g. [0.1,0.2,...] - one format string for every row
+            row_format = '[' + ','.join(['%.8g'] * matrix.shape[1]) + ']'
+            values = [(id_val, row_format % tuple(row), text_hash)
+                      for id_val, row, text_hash in zip(ids, matrix.tolist(), hashes)]
+            template = '(%s, %s::vector, %s)'
+        else:
+            values = [(id_val, psycopg2.Binary(row.tobytes()), text_hash)
+                      for id_val, row, text_hash in zip(ids, matrix, hashes)]
+            template = None
+        
+        psycopg2.extras.execute_values(
+            cursor,
+            f"INSERT INTO {embeddings_table} (id, embedding, text_hash) VALUES %s "
+            f"ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding, text_hash = EXCLUDED.text_hash",
+            values,
+            template=template,
+            page_size=len(values)
+        )
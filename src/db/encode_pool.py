@@ -0,0 +1,125 @@
+"""
+Encode pool module
+
+Spreads sentence-transformer encoding over a pool of worker processes.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Backend loaded once per worker process by _init_worker
+_worker_model = None
+
+def _init_worker(model_name, config, threads):
+    """Load the model in a freshly started worker process"""
+    global _worker_model
+    
+    from .model_registry import get_model
+    
+    # Workers share the machine - keep each one to its slice of the cores
+    _worker_model = get_model(model_name, config, threads)
+
+def _encode_batch(texts):
+    """Encode one batch in a worker process"""
+    return _worker_model.encode(texts)
+
+def _ping():
+    """No-op task; running it means the worker has loaded its model"""
+    return os.getpid()
+
+class EncodePool:
+    """
+    Pool of worker processes, each with its own loaded embedding backend.
+    
+    Batches are dispatched to whichever worker is free and the results come
+    back in submission order. Workers are started lazily on first use (and
+    again in a forked process) with the spawn method, so they never inherit
+    torch state from the parent.
+    """
+    
+    def __init__(self, model_name, workers, threads_per_worker=None, config=None):
+        """
+        Initialize the encode pool
+        
+        Args:
+            model_name (str): Model to load in each worker
+            workers (int): Number of worker processes
+            threads_per_worker (int, optional): Inference threads per worker,
+                defaults to an even share of the CPU cores
+            config (dict, optional): Embedding configuration (selects the backend)
+        """
+        if workers < 1:
+            raise ValueError(f"Invalid encode pool size: {workers}")
+        
+        self.model_name = model_name
+        self.config = dict(config or {})
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        """Pickle without the executor or lock"""
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        state['_executor_pid'] = None
+        state['_lock'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def _get_executor(self):
+        """Start the worker processes on first use"""
+        if self._executor is not None and self._executor_pid == os.getpid():
+            return self._executor
+        
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                logger.info(f"Starting {self.workers} encode workers for {self.model_name} "
+                            f"({self.threads_per_worker} threads each)")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.config, self.threads_per_worker)
+                )
+                self._executor_pid = os.getpid()
+        
+        return self._executor
+    
+    def warm_up(self):
+        """Start the workers (and their model loads) without waiting for them"""
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_ping)
+    
+    def map(self, batches):
+        """
+        Encode batches across the workers
+        
+        Args:
+            batches (list): Lists of texts
+        
+        Returns:
+            list: An embeddings array per batch, in the same order
+        """
+        if not batches:
+            return []
+        return list(self._get_executor().map(_encode_batch, batches))
+    
+    def close(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
+            self._executor_pid = None
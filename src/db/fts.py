@@ -5,75 +5,271 @@ This module provides functionality for managing full-text search in PostgreSQL.
 """
 
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ..utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# How the FTS table is built: GIN index maintained during the load, or built afterwards and swapped in
+BUILD_MODES = ('indexed', 'deferred')
+
+# Where tsvectors live: a separate <entity>_fts table, or a stored generated column on the entity table
+LAYOUTS = ('table', 'generated')
+
+# Name of the generated tsvector column in the 'generated' layout
+GENERATED_COLUMN = 'fts_tsv'
+
+# Memory for the GIN and primary key builds of a deferred build
+DEFAULT_MAINTENANCE_WORK_MEM = '1GB'
+
+# Chunked loads: rows per id range (0 = one INSERT for the whole entity) and concurrent chunks
+DEFAULT_CHUNK_ROWS = 0
+DEFAULT_WORKERS = 4
+
+# Text search configuration used when neither the entity nor the FTS config names one
+DEFAULT_LANGUAGE = 'english'
+
+# setweight() labels, most to least important; text columns without a configured weight get the last
+WEIGHTS = ('A', 'B', 'C', 'D')
+DEFAULT_WEIGHT = 'D'
+
+# Search result cache: entries (0 = no cache), seconds an entry lives, and how
+# often (seconds) to check whether another process has rebuilt an entity's FTS
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 300
+DEFAULT_CACHE_CHECK_INTERVAL = 5
+
 class FTSManager:
     """Manages full-text search operations in PostgreSQL"""
     
-    def __init__(self, db_client):
+    def __init__(self, db_client, config=None):
         """
         Initialize the FTS manager
         
         Args:
             db_client (DBClient): Database client
+            config (dict, optional): FTS configuration
         """
         self.db_client = db_client
+        self.config = config or {}
+        
+        self.build_mode = self.config.get('build_mode', 'deferred')
+        if self.build_mode not in BUILD_MODES:
+            raise ValueError(f"Unknown FTS build mode '{self.build_mode}', expected one of {BUILD_MODES}")
+        self.unlogged = bool(self.config.get('unlogged', False))
+        self.maintenance_work_mem = self.config.get('maintenance_work_mem', DEFAULT_MAINTENANCE_WORK_MEM)
+        self.chunk_rows = int(self.config.get('chunk_rows', DEFAULT_CHUNK_ROWS) or 0)
+        self.workers = max(1, int(self.config.get('workers', DEFAULT_WORKERS) or 1))
+        
+        self.layout = self.config.get('layout', 'table')
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"Unknown FTS layout '{self.layout}', expected one of {LAYOUTS}")
+        
+        # Fail on a bad language or weight at startup rather than halfway through a pipeline run
+        for entity_name in [None] + list(self.config.get('entities') or {}):
+            self._text_search_settings(entity_name)
+        
+        cache_size = int(self.config.get('cache_size', DEFAULT_CACHE_SIZE) or 0)
+        self.cache = LRUCache(cache_size, self.config.get('cache_ttl', DEFAULT_CACHE_TTL)) if cache_size > 0 else None
+        self.cache_check_interval = float(self.config.get('cache_check_interval', DEFAULT_CACHE_CHECK_INTERVAL))
+        # entity -> (OID of the relation a rebuild replaces, when it was looked up)
+        self._source_versions = {}
+    
+    def _text_search_settings(self, entity_name):
+        """
+        Text search configuration and column weights of an entity
+        
+        fts.entities.<entity>.language / weights override fts.language /
+        weights; weights map column names to A, B, C or D.
+        
+        Returns:
+            tuple: (language, {column: weight})
+        """
+        entity_config = (self.config.get('entities') or {}).get(entity_name) or {}
+        
+        language = entity_config.get('language') or self.config.get('language') or DEFAULT_LANGUAGE
+        # Embedded in SQL (a generated column can't take a bind parameter), so only allow a plain name
+        if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_.]*', language):
+            raise ValueError(f"Invalid text search configuration name '{language}'")
+        
+        weights = dict(self.config.get('weights') or {})
+        weights.update(entity_config.get('weights') or {})
+        weights = {column: str(weight).upper() for column, weight in weights.items()}
+        for column, weight in weights.items():
+            if weight not in WEIGHTS:
+                raise ValueError(f"Invalid FTS weight '{weight}' for column {column}, expected one of {WEIGHTS}")
+        
+        return language, weights
+    
+    def _tsvector_expr(self, entity_name, text_columns):
+        """
+        SQL expression building an entity row's weighted tsvector
+        
+        Each text column is parsed on its own and labelled with its weight,
+        so ts_rank_cd() ranks a match in e.g. a name above one in a description.
+        """
+        language, weights = self._text_search_settings(entity_name)
+        return " || ".join([
+            f"setweight(to_tsvector('{language}'::regconfig, COALESCE({col}, '')), '{weights.get(col, DEFAULT_WEIGHT)}')"
+            for col in text_columns
+        ])
     
     def create_fts_table(self, entity_name):
         """
         Create the full-text search table for an entity
         
+        In deferred mode this is a bare build table next to the live one;
+        generate_fts_vectors() fills it, indexes it and swaps it in. In the
+        generated layout there is no separate table - the column is added to
+        the entity table by generate_fts_vectors().
+        
         Args:
             entity_name (str): Entity name
             
         Returns:
             dict: FTS table configuration
         """
-        conn = self.db_client.get_connection()
-        cursor = conn.cursor()
+        if self.layout == 'generated':
+            return {
+                'table': entity_name,
+                'layout': 'generated',
+                'column': GENERATED_COLUMN
+            }
         
-        try:
-            logger.info(f"Creating FTS table for {entity_name}")
+        if self.build_mode == 'deferred':
+            return self._create_build_table(entity_name)
+        
+        with self.db_client.connection() as conn:
+            with conn.cursor() as cursor:
+                logger.info(f"Creating FTS table for {entity_name}")
             
-            fts_table = f"{entity_name}_fts"
+                fts_table = f"{entity_name}_fts"
             
-            # Create the FTS table
-            drop_table_sql = f"DROP TABLE IF EXISTS {fts_table};"
-            create_table_sql = f"""
-            CREATE TABLE {fts_table} (
-                id NUMERIC(38,0) PRIMARY KEY REFERENCES {entity_name}(id),
-                tsv tsvector
-            );
-            """
+                # Create the FTS table
+                drop_table_sql = f"DROP TABLE IF EXISTS {fts_table};"
+                create_table_sql = f"""
+                CREATE TABLE {fts_table} (
+                    id NUMERIC(38,0) PRIMARY KEY REFERENCES {entity_name}(id),
+                    tsv tsvector
+                );
+                """
             
-            cursor.execute(drop_table_sql)
-            cursor.execute(create_table_sql)
+                cursor.execute(drop_table_sql)
+                cursor.execute(create_table_sql)
             
-            # Create GIN index for fast text search
-            create_index_sql = f"""
-            CREATE INDEX idx_{fts_table}_tsv ON {fts_table} USING GIN(tsv);
-            """
+                # Create GIN index for fast text search
+                create_index_sql = f"""
+                CREATE INDEX idx_{fts_table}_tsv ON {fts_table} USING GIN(tsv);
+                """
             
-            cursor.execute(create_index_sql)
-            conn.commit()
+                cursor.execute(create_index_sql)
+                conn.commit()
             
-            logger.info(f"Created {fts_table} table and GIN index")
+                logger.info(f"Created {fts_table} table and GIN index")
+                self.invalidate_cache(entity_name)
             
-            return {
-                'table': fts_table
-            }
-        finally:
-            cursor.close()
-            conn.close()
+                return {
+                    'table': fts_table,
+                    'build_mode': 'indexed'
+                }
+    
+    def _create_build_table(self, entity_name):
+        """Create an unindexed (optionally UNLOGGED) table to bulk load into"""
+        fts_table = f"{entity_name}_fts"
+        build_table = f"{fts_table}_build"
+        
+        with self.db_client.connection() as conn:
+            with conn.cursor() as cursor:
+                logger.info(f"Creating FTS build table for {entity_name}")
+                
+                cursor.execute(f"DROP TABLE IF EXISTS {build_table};")
+                cursor.execute(f"""
+                CREATE {'UNLOGGED ' if self.unlogged else ''}TABLE {build_table} (
+                    id NUMERIC(38,0),
+                    tsv tsvector
+                );
+                """)
+                conn.commit()
+        
+        logger.info(f"Created {build_table}; indexes are built after the load")
+        return {
+            'table': fts_table,
+            'build_table': build_table,
+            'build_mode': 'deferred'
+        }
+    
+    def _finish_build_table(self, entity_name, fts_config):
+        """
+        Index the loaded build table and swap it in for the live table
+        
+        The primary key, foreign key and GIN index are built in one pass
+        each over the loaded rows. The swap (drop old table, rename) is a
+        single transaction, so searches see either the old or the new table.
+        
+        Returns:
+            dict: Seconds spent indexing and swapping
+        """
+        fts_table = fts_config['table']
+        build_table = fts_config['build_table']
+        timings = {}
+        
+        with self.db_client.connection() as conn:
+            with conn.cursor() as cursor:
+                start = time.time()
+                cursor.execute("SELECT set_config('maintenance_work_mem', %s, true);", (self.maintenance_work_mem,))
+                cursor.execute(f"ALTER TABLE {build_table} ADD CONSTRAINT {build_table}_pkey PRIMARY KEY (id);")
+                cursor.execute(f"CREATE INDEX idx_{build_table}_tsv ON {build_table} USING GIN(tsv);")
+                cursor.execute(f"ALTER TABLE {build_table} ADD CONSTRAINT {build_table}_id_fkey "
+                               f"FOREIGN KEY (id) REFERENCES {entity_name}(id);")
+                conn.commit()
+                timings['index'] = time.time() - start
+                
+                start = time.time()
+                cursor.execute(f"DROP TABLE IF EXISTS {fts_table};")
+                cursor.execute(f"ALTER TABLE {build_table} RENAME TO {fts_table};")
+                cursor.execute(f"ALTER TABLE {fts_table} RENAME CONSTRAINT {build_table}_pkey TO {fts_table}_pkey;")
+                cursor.execute(f"ALTER TABLE {fts_table} RENAME CONSTRAINT {build_table}_id_fkey TO {fts_table}_id_fkey;")
+                cursor.execute(f"ALTER INDEX idx_{build_table}_tsv RENAME TO idx_{fts_table}_tsv;")
+                conn.commit()
+                timings['swap'] = time.time() - start
+        
+        logger.info(f"Built indexes of {build_table} in {timings['index']:.2f}s and swapped it in as {fts_table}")
+        return timings
+    
+    def _drop_build_table(self, fts_config):
+        """Drop a build table left behind by a failed deferred build"""
+        try:
+            self.db_client.execute_query(f"DROP TABLE IF EXISTS {fts_config['build_table']};")
+        except Exception as e:
+            logger.warning(f"Could not drop {fts_config['build_table']}: {str(e)}")
+    
+    def _empty_live_table(self, entity_name, fts_table):
+        """
+        Empty a live FTS table after a failed chunked load
+        
+        Chunks commit one by one, so some would stay behind. An empty table
+        is what a failed single INSERT leaves, and doesn't pass for a
+        complete one.
+        """
+        try:
+            self.db_client.execute_query(f"TRUNCATE {fts_table};")
+            logger.error(f"Emptied {fts_table} after the failed chunked load; rerun the FTS stage to rebuild it")
+        except Exception as e:
+            logger.warning(f"Could not empty {fts_table}, it is incomplete: {str(e)}")
+        self.invalidate_cache(entity_name)
     
-    def generate_fts_vectors(self, entity_name, fts_config):
+    def generate_fts_vectors(self, entity_name, fts_config, stats=None):
         """
         Generate full-text search vectors for an entity
         
         Args:
             entity_name (str): Entity name
             fts_config (dict): FTS table configuration
+            stats (dict, optional): Filled with the build mode and seconds
+                spent loading, indexing and swapping
             
         Returns:
             bool: Success status
@@ -85,32 +281,264 @@ class FTSManager:
             logger.warning(f"No text columns found for {entity_name}")
             return False
         
-        # Generate tsvectors
-        fts_table = fts_config['table']
+        if fts_config.get('layout') == 'generated':
+            return self._build_generated_column(entity_name, text_columns, stats)
         
-        # Construct concatenation of text columns
-        concat_expr = " || ' ' || ".join([f"COALESCE({col}, '')" for col in text_columns])
+        # Generate tsvectors (into the build table when indexes are deferred)
+        fts_table = fts_config.get('build_table', fts_config['table'])
+        deferred = fts_config.get('build_mode') == 'deferred'
         
-        # Insert tsvectors
+        # Insert weighted tsvectors
         insert_query = f"""
         INSERT INTO {fts_table} (id, tsv)
-        SELECT id, to_tsvector('english', {concat_expr})
-        FROM {entity_name};
+        SELECT id, {self._tsvector_expr(entity_name, text_columns)}
+        FROM {entity_name}
         """
         
         try:
-            self.db_client.execute_query(insert_query)
+            start = time.time()
+            chunks = 1
+            if self.chunk_rows > 0:
+                chunks = self._load_chunked(entity_name, insert_query)
+            else:
+                self.db_client.execute_query(insert_query)
+            load_time = time.time() - start
             
             # Verify
             count_query = f"SELECT COUNT(*) FROM {fts_table}"
             result = self.db_client.execute_query(count_query, fetchall=False)
             count = result[0] if result else 0
             
-            logger.info(f"Generated FTS vectors for {count} rows in {entity_name}")
+            timings = {'load': load_time}
+            if deferred:
+                timings.update(self._finish_build_table(entity_name, fts_config))
+            
+            self.invalidate_cache(entity_name)
+            logger.info(f"Generated FTS vectors for {count} rows in {entity_name} in {load_time:.2f}s")
+            if stats is not None:
+                stats['rows'] = count
+                stats['layout'] = 'table'
+                stats['build_mode'] = fts_config.get('build_mode', 'indexed')
+                stats['chunks'] = chunks
+                for phase, seconds in timings.items():
+                    stats[f"{phase}_time"] = f"{seconds:.2f}s"
+                stats['total_time'] = f"{sum(timings.values()):.2f}s"
             return True
         except Exception as e:
             logger.error(f"Error generating FTS vectors: {str(e)}")
+            if deferred:
+                self._drop_build_table(fts_config)
+            elif self.chunk_rows > 0:
+                self._empty_live_table(entity_name, fts_table)
+            return False
+    
+    def _build_generated_column(self, entity_name, text_columns, stats=None):
+        """
+        Add the stored generated tsvector column and its GIN index to the entity table
+        
+        The column is dropped and added again, so it always reflects the
+        current text columns; adding it computes it for every row in one
+        table rewrite. PostgreSQL keeps it up to date from then on.
+        """
+        tsvector_expr = self._tsvector_expr(entity_name, text_columns)
+        timings = {}
+        
+        try:
+            with self.db_client.connection() as conn:
+                with conn.cursor() as cursor:
+                    start = time.time()
+                    cursor.execute(f"ALTER TABLE {entity_name} DROP COLUMN IF EXISTS {GENERATED_COLUMN};")
+                    cursor.execute(f"""
+                    ALTER TABLE {entity_name} ADD COLUMN {GENERATED_COLUMN} tsvector
+                    GENERATED ALWAYS AS ({tsvector_expr}) STORED;
+                    """)
+                    timings['load'] = time.time() - start
+                    
+                    start = time.time()
+                    cursor.execute("SELECT set_config('maintenance_work_mem', %s, true);", (self.maintenance_work_mem,))
+                    cursor.execute(
+                        f"CREATE INDEX idx_{entity_name}_generated_tsv ON {entity_name} USING GIN({GENERATED_COLUMN});"
+                    )
+                    timings['index'] = time.time() - start
+                    
+                    cursor.execute(f"SELECT COUNT(*) FROM {entity_name};")
+                    count = cursor.fetchone()[0]
+                    conn.commit()
+        except Exception as e:
+            logger.error(f"Error generating FTS column: {str(e)}")
             return False
+        
+        self.invalidate_cache(entity_name)
+        logger.info(f"Added generated {GENERATED_COLUMN} column for {count} rows in {entity_name} "
+                    f"in {timings['load']:.2f}s (index {timings['index']:.2f}s)")
+        if stats is not None:
+            stats['rows'] = count
+            stats['layout'] = 'generated'
+            for phase, seconds in timings.items():
+                stats[f"{phase}_time"] = f"{seconds:.2f}s"
+            stats['total_time'] = f"{sum(timings.values()):.2f}s"
+        return True
+    
+    def _chunk_starts(self, entity_name):
+        """
+        First id of each of count / chunk_rows equal-width id ranges
+        
+        Strides between min(id) and max(id), which the primary key index
+        answers without sorting the entity. Gaps in the ids make some
+        ranges hold fewer rows than others.
+        """
+        result = self.db_client.execute_query(
+            f"SELECT MIN(id), MAX(id), COUNT(*) FROM {entity_name};", fetchall=False
+        )
+        if not result or not result[2]:
+            return []
+        low, high, count = int(result[0]), int(result[1]), result[2]
+        
+        chunks = -(-count // self.chunk_rows)
+        step = max(1, -(-(high - low + 1) // chunks))
+        return list(range(low, high + 1, step))
+    
+    def _load_chunked(self, entity_name, insert_query):
+        """
+        Run the tsvector INSERT over id ranges on several pooled connections
+        
+        Each chunk commits on its own, so one long transaction doesn't hold
+        a backend for the whole entity. Deferred builds load into the build
+        table, which is only swapped in once every chunk has succeeded; in
+        the indexed mode a failure empties the live table.
+        
+        Args:
+            entity_name (str): Entity name
+            insert_query (str): INSERT ... SELECT ... FROM entity, without a WHERE clause
+            
+        Returns:
+            int: Number of chunks loaded
+        """
+        starts = self._chunk_starts(entity_name)
+        ranges = list(zip(starts, starts[1:] + [None]))
+        if not ranges:
+            return 0
+        
+        def load(lower, upper):
+            if upper is None:
+                query, params = f"{insert_query} WHERE id >= %s;", (lower,)
+            else:
+                query, params = f"{insert_query} WHERE id >= %s AND id < %s;", (lower, upper)
+            with self.db_client.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    rowcount = cursor.rowcount
+                conn.commit()
+            return rowcount
+        
+        workers = min(self.workers, len(ranges))
+        logger.info(f"Generating FTS vectors for {entity_name} in {len(ranges)} chunks "
+                    f"of {self.chunk_rows} rows on {workers} connections")
+        
+        done = rows = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"fts-{entity_name}") as executor:
+            futures = [executor.submit(load, lower, upper) for lower, upper in ranges]
+            try:
+                for future in as_completed(futures):
+                    rows += future.result()
+                    done += 1
+                    logger.info(f"FTS {entity_name}: {done}/{len(ranges)} chunks, {rows} rows")
+            except Exception:
+                # Don't start chunks that are still queued
+                for future in futures:
+                    future.cancel()
+                raise
+        
+        return len(ranges)
+    
+    def _search_source(self, entity_name):
+        """
+        Where the tsvectors of an entity are
+        
+        Returns:
+            tuple: (table that must exist, FROM clause joining entity rows as e,
+                tsvector expression, (table, tsvector column) for id-only searches)
+        """
+        if self.layout == 'generated':
+            tsv = f"e.{GENERATED_COLUMN}"
+            return entity_name, f"{entity_name} e", tsv, (entity_name, GENERATED_COLUMN)
+        
+        fts_table = f"{entity_name}_fts"
+        return fts_table, f"{entity_name} e JOIN {fts_table} f ON e.id = f.id", "f.tsv", (fts_table, 'tsv')
+    
+    def _source_version(self, entity_name):
+        """
+        OID of the relation a rebuild of the entity's FTS replaces, None if not built
+        
+        Every rebuild creates a new <entity>_fts table (or, in the generated
+        layout, a new GIN index), so the OID changes even when the rebuild
+        ran in another process. Looked up at most once per
+        cache_check_interval seconds.
+        """
+        now = time.monotonic()
+        cached = self._source_versions.get(entity_name)
+        if cached is not None and now - cached[1] < self.cache_check_interval:
+            return cached[0]
+        
+        if self.layout == 'generated':
+            relation = f"idx_{entity_name}_generated_tsv"
+        else:
+            relation = f"{entity_name}_fts"
+        result = self.db_client.execute_query("SELECT to_regclass(%s)::oid;", (relation,), fetchall=False)
+        version = result[0] if result else None
+        self._source_versions[entity_name] = (version, now)
+        return version
+    
+    def _cache_key(self, kind, entity_name, query, limit):
+        """
+        Result cache key of a search, None when not caching
+        
+        The key includes the FTS source's version, so results cached before
+        a rebuild are never returned after it. A found version also means
+        the FTS table exists, which saves the table_exists() query.
+        """
+        if self.cache is None:
+            return None
+        try:
+            version = self._source_version(entity_name)
+        except Exception as e:
+            logger.warning(f"Could not check the FTS version of {entity_name}, not caching: {str(e)}")
+            return None
+        if version is None:
+            return None
+        # Case and spacing don't change what to_tsvector()/websearch_to_tsquery() match
+        return (entity_name, version, kind, ' '.join(query.lower().split()), int(limit))
+    
+    def invalidate_cache(self, entity_name=None):
+        """
+        Drop cached search results
+        
+        Called after each rebuild; other processes notice the rebuild
+        within cache_check_interval seconds.
+        
+        Args:
+            entity_name (str, optional): Only this entity's results
+        """
+        if entity_name is None:
+            self._source_versions = {}
+        else:
+            self._source_versions.pop(entity_name, None)
+        
+        if self.cache is not None:
+            if entity_name is None:
+                self.cache.clear()
+            else:
+                dropped = self.cache.invalidate(lambda key: key[0] == entity_name)
+                logger.debug(f"Dropped {dropped} cached FTS results for {entity_name}")
+    
+    def get_cache_stats(self):
+        """
+        Search result cache hits, misses and hit rate
+        
+        Returns:
+            dict: See LRUCache.get_stats(), empty when the cache is disabled
+        """
+        return self.cache.get_stats() if self.cache is not None else {}
     
     def search(self, entity_name, query, limit=10):
         """
@@ -118,33 +546,84 @@ class FTSManager:
         
         Args:
             entity_name (str): Entity name
-            query (str): Search query
+            query (str): Search query (websearch_to_tsquery syntax)
             limit (int): Maximum number of results
             
         Returns:
             list: Search results
         """
-        fts_table = f"{entity_name}_fts"
+        required_table, from_clause, tsv, _ = self._search_source(entity_name)
+        language, _ = self._text_search_settings(entity_name)
         
+        key = self._cache_key('rows', entity_name, query, limit)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return list(cached)
         # Check if FTS table exists
-        if not self.db_client.table_exists(fts_table):
-            logger.error(f"FTS table {fts_table} does not exist")
+        elif not self.db_client.table_exists(required_table):
+            logger.error(f"FTS table {required_table} does not exist")
+            return []
+        
+        try:
+            # Entity columns without the generated tsvector
+            columns = ', '.join(f"e.{col}" for col in self.db_client.get_result_columns(entity_name))
+            
+            # Construct query; websearch syntax accepts "quoted phrases", OR and -exclusions
+            search_query = f"""
+            SELECT {columns}, ts_rank_cd({tsv}, q) AS rank
+            FROM {from_clause}, websearch_to_tsquery('{language}', %s) q
+            WHERE {tsv} @@ q
+            ORDER BY rank DESC
+            LIMIT %s;
+            """
+            
+            results = self.db_client.execute_query(search_query, (query, limit))
+            logger.info(f"Found {len(results)} results for query '{query}'")
+            if key is not None:
+                self.cache.put(key, list(results))
+            return results
+        except Exception as e:
+            logger.error(f"Error in FTS search: {str(e)}")
+            return []
+    
+    def search_ids(self, entity_name, query, limit=10):
+        """
+        Like search(), but only the ids and ranks of the matches
+        
+        Args:
+            entity_name (str): Entity name
+            query (str): Search query
+            limit (int): Maximum number of results
+            
+        Returns:
+            list: (id, rank) tuples, best first
+        """
+        required_table, _, _, (table, tsv) = self._search_source(entity_name)
+        language, _ = self._text_search_settings(entity_name)
+        
+        key = self._cache_key('ids', entity_name, query, limit)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return list(cached)
+        elif not self.db_client.table_exists(required_table):
+            logger.error(f"FTS table {required_table} does not exist")
             return []
         
-        # Construct query
         search_query = f"""
-        SELECT e.*, ts_rank(f.tsv, plainto_tsquery('english', %s)) AS rank
-        FROM {entity_name} e
-        JOIN {fts_table} f ON e.id = f.id
-        WHERE f.tsv @@ plainto_tsquery('english', %s)
+        SELECT t.id, ts_rank_cd(t.{tsv}, q) AS rank
+        FROM {table} t, websearch_to_tsquery('{language}', %s) q
+        WHERE t.{tsv} @@ q
         ORDER BY rank DESC
         LIMIT %s;
         """
         
         try:
-            results = self.db_client.execute_query(search_query, (query, query, limit))
-            logger.info(f"Found {len(results)} results for query '{query}'")
+            results = self.db_client.execute_query(search_query, (query, limit))
+            if key is not None:
+                self.cache.put(key, list(results))
             return results
         except Exception as e:
             logger.error(f"Error in FTS search: {str(e)}")
-            return []
\ No newline at end of file
+            return []
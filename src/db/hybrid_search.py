@@ -0,0 +1,168 @@
+"""
+Hybrid Search Module
+
+This module combines full-text and vector similarity search into one ranking.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# How the two rankings are combined
+FUSION_METHODS = ('rrf', 'weighted')
+
+# Reciprocal rank fusion constant; larger values flatten the head of each list
+DEFAULT_RRF_K = 60
+
+# Matches fetched from each sub-query before fusing (at least offset + limit)
+DEFAULT_CANDIDATES = 100
+
+DEFAULT_FTS_WEIGHT = 0.5
+DEFAULT_VECTOR_WEIGHT = 0.5
+
+def _rrf(rankings, weights, rrf_k):
+    """Reciprocal rank fusion: each list adds weight / (rrf_k + rank) to an id"""
+    scores = {}
+    for matches, weight in zip(rankings, weights):
+        for rank, (id_val, _) in enumerate(matches, start=1):
+            scores[id_val] = scores.get(id_val, 0.0) + weight / (rrf_k + rank)
+    return scores
+
+def _weighted(rankings, weights):
+    """Weighted sum of each list's scores, min-max normalized to [0, 1]"""
+    scores = {}
+    for matches, weight in zip(rankings, weights):
+        if not matches:
+            continue
+        values = [float(score) for _, score in matches]
+        low, high = min(values), max(values)
+        for (id_val, _), value in zip(matches, values):
+            normalized = (value - low) / (high - low) if high > low else 1.0
+            scores[id_val] = scores.get(id_val, 0.0) + weight * normalized
+    return scores
+
+class HybridSearch:
+    """
+    Keyword and semantic search over an entity in one call.
+    
+    The FTS query (against <entity>_fts) and the vector query (against
+    <entity>_embeddings) run concurrently, each returning its top candidates.
+    The two rankings are fused with reciprocal rank fusion or a weighted sum
+    of normalized scores, and the requested page of the fused ranking is
+    returned as entity rows. Latency of each sub-query is recorded.
+    """
+    
+    def __init__(self, fts_manager, embeddings_manager, config=None):
+        """
+        Initialize hybrid search
+        
+        Args:
+            fts_manager (FTSManager): Full-text search manager
+            embeddings_manager (EmbeddingsManager): Embeddings manager
+            config (dict, optional): Search configuration
+        """
+        self.fts_manager = fts_manager
+        self.embeddings_manager = embeddings_manager
+        self.db_client = fts_manager.db_client
+        self.config = config or {}
+        
+        self.fusion = self.config.get('fusion', 'rrf')
+        if self.fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{self.fusion}', expected one of {FUSION_METHODS}")
+        self.rrf_k = int(self.config.get('rrf_k', DEFAULT_RRF_K))
+        self.candidates = int(self.config.get('candidates', DEFAULT_CANDIDATES))
+        self.fts_weight = float(self.config.get('fts_weight', DEFAULT_FTS_WEIGHT))
+        self.vector_weight = float(self.config.get('vector_weight', DEFAULT_VECTOR_WEIGHT))
+        
+        self.latency = LatencyTracker()
+        
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self):
+        """Two threads, one per sub-query, started on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='hybrid-search')
+            return self._executor
+    
+    def _timed(self, name, func, *args):
+        """Run a sub-query and record its latency"""
+        with self.latency.time(name):
+            return func(*args)
+    
+    def search(self, entity_name, query, limit=10, offset=0):
+        """
+        Search an entity by keywords and meaning
+        
+        Args:
+            entity_name (str): Entity name
+            query (str): Search query
+            limit (int): Maximum number of results
+            offset (int): Fused results to skip (for pagination)
+        
+        Returns:
+            list: Entity rows with a trailing fused score, best first
+        """
+        start = time.perf_counter()
+        
+        matches = self.search_ids(entity_name, query, limit, offset)
+        try:
+            results = self.db_client.fetch_scored_rows(entity_name, matches)
+        except Exception as e:
+            logger.error(f"Error fetching hybrid search results: {str(e)}")
+            results = []
+        
+        self.latency.record('total', time.perf_counter() - start)
+        logger.info(f"Found {len(results)} hybrid results for query '{query}' (offset {offset})")
+        return results
+    
+    def search_ids(self, entity_name, query, limit=10, offset=0):
+        """
+        Like search(), but only the ids and fused scores of the page
+        
+        Returns:
+            list: (id, score) tuples, best first
+        """
+        # Deeper pages need deeper candidate lists to stay consistent
+        depth = max(self.candidates, offset + limit)
+        
+        executor = self._get_executor()
+        fts_future = executor.submit(self._timed, 'fts', self.fts_manager.search_ids, entity_name, query, depth)
+        vector_future = executor.submit(self._timed, 'vector', self.embeddings_manager.search_ids, entity_name, query, depth)
+        
+        # Both managers log and return [] on failure, so one side can still carry the search
+        rankings = [fts_future.result(), vector_future.result()]
+        weights = [self.fts_weight, self.vector_weight]
+        
+        with self.latency.time('fusion'):
+            if self.fusion == 'rrf':
+                scores = _rrf(rankings, weights, self.rrf_k)
+            else:
+                scores = _weighted(rankings, weights)
+            
+            # Stable sort: ties keep first-seen order (FTS before vector)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        
+        return ranked[offset:offset + limit]
+    
+    def get_latency_stats(self):
+        """
+        Latency percentiles of the fts and vector sub-queries, fusion and whole searches
+        
+        Returns:
+            dict: See LatencyTracker.get_stats()
+        """
+        return self.latency.get_stats()
+    
+    def close(self):
+        """Stop the sub-query threads"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
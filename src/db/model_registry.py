@@ -0,0 +1,153 @@
+"""
+Model registry module
+
+Process-wide cache of loaded embedding models, model metadata that can be
+read without loading weights, and background pre-warming.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from .backends import create_backend
+
+logger = logging.getLogger(__name__)
+
+# Metadata of common sentence-transformers models, so their dimension and
+# sequence length are known without touching the network or loading weights
+KNOWN_MODELS = {
+    'all-MiniLM-L6-v2': {'dimension': 384, 'max_seq_length': 256},
+    'all-MiniLM-L12-v2': {'dimension': 384, 'max_seq_length': 256},
+    'all-mpnet-base-v2': {'dimension': 768, 'max_seq_length': 384},
+    'all-distilroberta-v1': {'dimension': 768, 'max_seq_length': 512},
+    'multi-qa-MiniLM-L6-cos-v1': {'dimension': 384, 'max_seq_length': 512},
+    'multi-qa-mpnet-base-dot-v1': {'dimension': 768, 'max_seq_length': 512},
+    'paraphrase-MiniLM-L6-v2': {'dimension': 384, 'max_seq_length': 128},
+    'paraphrase-multilingual-MiniLM-L12-v2': {'dimension': 384, 'max_seq_length': 128},
+}
+
+# Loaded backends by (backend, cache key, threads), with a lock per entry so
+# a model being loaded in the background is waited for, not loaded twice
+_models = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+def _reset_after_fork():
+    """Forked children start with an empty registry (locks may have been held)"""
+    global _registry_lock
+    _models.clear()
+    _load_locks.clear()
+    _registry_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_model(model_name, config=None, threads=None):
+    """
+    Loaded backend for a model, loading it on first use in this process
+    
+    Args:
+        model_name (str): Model name or path
+        config (dict, optional): Embedding configuration (selects the backend)
+        threads (int, optional): CPU threads to use for inference
+    
+    Returns:
+        EmbeddingBackend: Loaded backend, shared by every caller in the process
+    """
+    backend = create_backend(model_name, config, threads)
+    key = (backend.name, backend.cache_key, threads)
+    
+    with _registry_lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    
+    with load_lock:
+        model = _models.get(key)
+        if model is None:
+            logger.info(f"Loading embedding model: {model_name} ({backend.name} backend)")
+            start = time.time()
+            backend.load()
+            logger.info(f"Loaded {model_name} in {time.time() - start:.1f}s "
+                        f"(embedding size {backend.dimension})")
+            with _registry_lock:
+                _models[key] = backend
+            model = backend
+    
+    return model
+
+def prewarm_model(model_name, config=None, threads=None):
+    """
+    Start loading a model in a background thread
+    
+    A later get_model() for the same model waits for this load instead of
+    starting its own. Failures are logged; get_model() will try again.
+    
+    Returns:
+        threading.Thread: The loading thread
+    """
+    def load():
+        try:
+            get_model(model_name, config, threads)
+        except Exception as e:
+            logger.warning(f"Background load of {model_name} failed: {str(e)}")
+    
+    thread = threading.Thread(target=load, name=f"prewarm-{model_name}", daemon=True)
+    thread.start()
+    return thread
+
+def _read_model_json(model_name, filename):
+    """A JSON file of a local or already-downloaded model, None if not available"""
+    if os.path.isdir(model_name):
+        path = os.path.join(model_name, filename)
+    else:
+        try:
+            from huggingface_hub import try_to_load_from_cache
+        except ImportError:
+            return None
+        repo_id = model_name if '/' in model_name else f"sentence-transformers/{model_name}"
+        path = try_to_load_from_cache(repo_id, filename)
+    
+    if not isinstance(path, str) or not os.path.isfile(path):
+        return None
+    
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def get_model_metadata(model_name):
+    """
+    Dimension and max sequence length of a model, without loading weights
+    
+    Comes from KNOWN_MODELS, or from the config files of a local or cached
+    model (a Dense layer after pooling changes the output dimension).
+    
+    Args:
+        model_name (str): Model name or path
+    
+    Returns:
+        dict: 'dimension' and 'max_seq_length', either may be None if unknown
+    """
+    short_name = model_name[len('sentence-transformers/'):] if model_name.startswith('sentence-transformers/') else model_name
+    if short_name in KNOWN_MODELS:
+        return dict(KNOWN_MODELS[short_name])
+    
+    metadata = {'dimension': None, 'max_seq_length': None}
+    
+    config = _read_model_json(model_name, 'config.json') or {}
+    metadata['dimension'] = config.get('hidden_size') or config.get('dim') or config.get('d_model')
+    
+    for module in _read_model_json(model_name, 'modules.json') or []:
+        if module.get('type', '').endswith('Dense'):
+            dense = _read_model_json(model_name, f"{module.get('path')}/config.json") or {}
+            metadata['dimension'] = dense.get('out_features', metadata['dimension'])
+    
+    st_config = _read_model_json(model_name, 'sentence_bert_config.json') or {}
+    metadata['max_seq_length'] = st_config.get('max_seq_length')
+    
+    return metadata
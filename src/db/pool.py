@@ -0,0 +1,259 @@
+"""
+Connection pool module
+
+Thread-safe pool of psycopg2 connections with health checks and metrics.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available in time"""
+    pass
+
+class ConnectionPool:
+    """
+    Keeps between min_size and max_size connections open and hands them out
+    to threads. Callers block (up to timeout seconds) when every connection
+    is checked out. Connections that sat idle for longer than
+    health_check_interval are pinged before being handed out again.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=120.0, health_check_interval=30.0):
+        """
+        Initialize the pool
+
+        Args:
+            connect (callable): Returns a new psycopg2 connection
+            min_size (int): Connections opened up front and kept around
+            max_size (int): Upper bound on open connections
+            timeout (float): Max seconds to wait for a connection (None waits forever)
+            health_check_interval (float): Idle seconds after which a connection is pinged
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()  # (connection, returned_at)
+        self._size = 0  # open connections, idle + checked out
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._metrics = {
+            'checkouts': 0,
+            'wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'waits': 0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'health_check_failures': 0,
+        }
+
+    def open(self):
+        """Open min_size connections up front"""
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._size >= self.min_size:
+                    break
+                self._size += 1
+            conn = self._new_connection()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+        logger.debug(f"Connection pool opened with {self.min_size} connections (max {self.max_size})")
+
+    def _new_connection(self):
+        """Create a connection for a slot that has already been reserved"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._metrics['connections_created'] += 1
+        return conn
+
+    def getconn(self):
+        """
+        Check out a connection, waiting if the pool is exhausted
+
+        Returns:
+            psycopg2 connection
+        """
+        start = time.monotonic()
+        deadline = None if self.timeout is None else start + self.timeout
+        waited = False
+
+        while True:
+            conn = None
+            idle_since = None
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        break
+
+                    if self._size < self.max_size:
+                        # Reserve a slot, connect outside the lock
+                        self._size += 1
+                        break
+
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s "
+                                          f"({self.max_size} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                conn = self._new_connection()
+            elif not self._is_healthy(conn, idle_since):
+                self._discard(conn)
+                continue
+
+            wait_time = time.monotonic() - start
+            with self._cond:
+                self._metrics['checkouts'] += 1
+                self._metrics['wait_time'] += wait_time
+                self._metrics['max_wait_time'] = max(self._metrics['max_wait_time'], wait_time)
+                if waited:
+                    self._metrics['waits'] += 1
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Return a connection to the pool
+
+        Args:
+            conn: Connection from getconn()
+            discard (bool): Close it instead of keeping it
+        """
+        if not discard and not conn.closed:
+            try:
+                # Hand back a clean connection: no open transaction, default autocommit
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except Exception as e:
+                logger.warning(f"Could not reset pooled connection, discarding it: {e}")
+                discard = True
+
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _is_healthy(self, conn, idle_since):
+        """Cheap check for a connection coming out of the idle list"""
+        if conn.closed:
+            return False
+
+        if self.health_check_interval is None or time.monotonic() - idle_since < self.health_check_interval:
+            return True
+
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {e}")
+            with self._cond:
+                self._metrics['health_check_failures'] += 1
+            return False
+
+    def _discard(self, conn):
+        """Close a connection and free its slot"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+        with self._cond:
+            self._size -= 1
+            self._metrics['connections_discarded'] += 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with block
+
+        The transaction is rolled back if the block raises; broken
+        connections are discarded instead of going back to the pool.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            raise
+        finally:
+            self.putconn(conn)
+
+    def close(self):
+        """Close idle connections; checked out ones are closed when returned"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._cond.notify_all()
+
+    def get_metrics(self):
+        """
+        Pool usage numbers
+
+        Returns:
+            dict: Checkouts, wait times and connection counts
+        """
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics['size'] = self._size
+            metrics['idle'] = len(self._idle)
+            metrics['in_use'] = self._size - len(self._idle)
+
+        checkouts = metrics['checkouts']
+        metrics['avg_wait_time'] = metrics['wait_time'] / checkouts if checkouts else 0.0
+        return metrics
@@ -76,6 +76,23 @@ class PipelineComponent(ABC):
             
             return result
     
+    def warm_up(self):
+        """
+        Start slow one-off setup (such as loading a model) in the background
+        
+        Called by the pipeline at the start of a run, before any entity is
+        processed, so the setup overlaps with earlier stages. Must not block.
+        """
+        pass
+    
+    def max_connections(self):
+        """
+        Pooled database connections this component holds at once for one entity
+        
+        Used by the pipeline to check the pool is large enough before a run.
+        """
+        return 1
+    
     @abstractmethod
     def process_entity(self, entity_name, entity_data=None, **kwargs):
         """
@@ -5,24 +5,118 @@ This module provides functionality for generating embeddings for entities.
 """
 
 import logging
+import queue
+import threading
+import time
+from ..utils.metrics import timed
 from .base import PipelineComponent
 
 logger = logging.getLogger(__name__)
 
+# Rows pulled per server-side cursor fetch in streaming mode, and rows per
+# encode/store chunk in both modes
+DEFAULT_FETCH_SIZE = 5000
+
+# Encoded chunks allowed to wait for the writer before encoding blocks
+DEFAULT_QUEUE_SIZE = 2
+
+# Tells the writer thread there are no more chunks
+_DONE = object()
+
+# 'fixed' encodes texts in table order, batch_size at a time; 'sorted' groups
+# texts of similar length and sizes each batch to a padded-token budget
+BATCHING_MODES = ('fixed', 'sorted')
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_BATCH_TOKENS = 16384
+DEFAULT_MAX_BATCH_SIZE = 256
+
+# Rough characters per token, for estimating lengths without tokenizing
+CHARS_PER_TOKEN = 4
+
+# Sequence length assumed when the model doesn't say (sentence-transformers default)
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+def _estimate_tokens(texts, max_seq_length):
+    """Approximate token count per text, capped at the model's sequence length"""
+    # +2 for the [CLS]/[SEP] style special tokens
+    return [min(len(text) // CHARS_PER_TOKEN + 2, max_seq_length) for text in texts]
+
+def _plan_batches(lengths, max_batch_tokens, max_batch_size):
+    """
+    Group text positions into batches of similar length
+    
+    Texts are taken shortest first. A batch is closed when adding the next
+    text would push its padded size (rows x longest row) over
+    max_batch_tokens, or when it reaches max_batch_size rows. Short texts
+    therefore end up in large batches and long ones in small batches.
+    
+    Args:
+        lengths (list): Estimated token length per text
+        max_batch_tokens (int): Padded-token budget per batch
+        max_batch_size (int): Upper bound on rows per batch
+    
+    Returns:
+        list: Batches, each a list of positions into lengths
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    
+    batches = []
+    batch = []
+    for position in order:
+        # Sorted ascending, so this text is the longest in the batch so far
+        padded = (len(batch) + 1) * lengths[position]
+        if batch and (padded > max_batch_tokens or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch = []
+        batch.append(position)
+    
+    if batch:
+        batches.append(batch)
+    return batches
+
 class EmbeddingsGenerator(PipelineComponent):
     """Generates embeddings for entities"""
     
-    def __init__(self, db_client, embeddings_manager):
+    def __init__(self, db_client, embeddings_manager, config=None):
         """
         Initialize the embeddings generator
         
         Args:
             db_client (DBClient): Database client
             embeddings_manager (EmbeddingsManager): Embeddings manager
+            config (dict, optional): Embedding configuration
         """
         super().__init__("EmbeddingsGenerator")
         self.db_client = db_client
         self.embeddings_manager = embeddings_manager
+        self.config = config or {}
+        
+        # Streaming reads the source table through a server-side cursor, chunk by chunk
+        self.streaming = bool(self.config.get('streaming', False))
+        self.fetch_size = int(self.config.get('fetch_size', DEFAULT_FETCH_SIZE))
+        
+        # Overlap encodes chunk N+1 while a writer thread stores chunk N
+        self.overlap = bool(self.config.get('overlap', True))
+        self.queue_size = max(1, int(self.config.get('queue_size', DEFAULT_QUEUE_SIZE)))
+        
+        # Incremental keeps the embeddings table and only encodes new or changed rows
+        self.incremental = bool(self.config.get('incremental', False))
+        
+        # How texts are grouped into model.encode calls
+        self.batching = self.config.get('batching', 'sorted')
+        if self.batching not in BATCHING_MODES:
+            raise ValueError(f"Unknown batching mode '{self.batching}', expected one of {BATCHING_MODES}")
+        self.batch_size = int(self.config.get('batch_size', DEFAULT_BATCH_SIZE))
+        self.max_batch_tokens = int(self.config.get('max_batch_tokens', DEFAULT_MAX_BATCH_TOKENS))
+        self.max_batch_size = int(self.config.get('max_batch_size', DEFAULT_MAX_BATCH_SIZE))
+    
+    def warm_up(self):
+        """Load the embedding model in the background while the importer runs"""
+        self.embeddings_manager.prewarm()
+    
+    def max_connections(self):
+        """Streaming keeps its server-side cursor open while chunks are stored on another connection"""
+        return 2 if self.streaming else 1
     
     def process_entity(self, entity_name, entity_data=None, **kwargs):
         """
@@ -32,13 +126,15 @@ class EmbeddingsGenerator(PipelineComponent):
             entity_name (str): Entity name
             entity_data (dict, optional): Entity data from previous steps
             **kwargs: Additional arguments
-            
+        
         Returns:
             dict: Processing results with embeddings configuration
         """
         try:
             # Create embeddings table
-            embeddings_config = self.embeddings_manager.create_embeddings_table(entity_name)
+            embeddings_config = self.embeddings_manager.create_embeddings_table(
+                entity_name, incremental=self.incremental
+            )
             
             # Get text columns
             text_columns = self.db_client.get_text_columns(entity_name)
@@ -49,73 +145,363 @@ class EmbeddingsGenerator(PipelineComponent):
                     'message': f"No text columns found for {entity_name}"
                 }
             
-            # Get the data
-            columns_str = ', '.join(['id'] + text_columns)
-            query = f"""
-            SELECT {columns_str}
-            FROM {entity_name};
-            """
+            wall_start = time.time()
+            fetch_timer = {'seconds': 0.0}
+            
+            deleted = skipped = 0
+            if self.incremental:
+                deleted = self.embeddings_manager.delete_stale_embeddings(entity_name, embeddings_config, text_columns)
+                skipped = self.embeddings_manager.count_unchanged_embeddings(entity_name, embeddings_config, text_columns)
+                logger.info(f"Incremental embeddings for {entity_name}: {skipped} rows unchanged, {deleted} deleted")
             
-            rows = self.db_client.execute_query(query)
+            if self.streaming:
+                logger.info(f"Streaming embeddings for {entity_name} in chunks of {self.fetch_size} rows")
+                chunks = self._iter_text_chunks(entity_name, embeddings_config, text_columns)
+            else:
+                # Get the data
+                fetch_start = time.time()
+                rows = self.db_client.execute_query(
+                    self._source_query(entity_name, embeddings_config, text_columns),
+                    self.embeddings_manager.text_hash_params()
+                )
+                fetch_timer['seconds'] += time.time() - fetch_start
+                
+                if not rows and not self.incremental:
+                    return {
+                        'success': False,
+                        'message': f"No data found in {entity_name}"
+                    }
+                
+                logger.info(f"Generating embeddings for {len(rows)} rows in {entity_name}")
+                
+                # Prepare text data
+                ids, texts, hashes = self._prepare_texts(rows)
+                chunks = (
+                    (ids[i:i+self.fetch_size], texts[i:i+self.fetch_size], hashes[i:i+self.fetch_size])
+                    for i in range(0, len(ids), self.fetch_size)
+                )
             
-            if not rows:
+            chunks = timed(chunks, fetch_timer)
+            encode_stats = {}
+            
+            if self.overlap:
+                total, timings, store_stats = self._embed_overlapped(entity_name, embeddings_config, chunks, encode_stats)
+            else:
+                total, timings, store_stats = self._embed_sequential(entity_name, embeddings_config, chunks, encode_stats)
+            
+            if total == 0 and not self.incremental:
                 return {
                     'success': False,
                     'message': f"No data found in {entity_name}"
                 }
             
-            logger.info(f"Generating embeddings for {len(rows)} rows in {entity_name}")
-            
-            # Prepare text data
-            texts = []
-            ids = []
-            for row in rows:
-                id_val = row[0]
-                # Combine text from all columns
-                text_parts = []
-                for i, col in enumerate(text_columns):
-                    val = row[i+1]
-                    if val is not None:
-                        text_parts.append(str(val))
-                
-                combined_text = ' '.join(text_parts).strip()
-                if combined_text:
-                    texts.append(combined_text)
-                    ids.append(id_val)
-            
-            # Generate embeddings
-            batch_size = 32
-            all_embeddings = []
-            
-            # Process in batches to avoid memory issues
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i+batch_size]
-                batch_embeddings = self.embeddings_manager.generate_embeddings(batch_texts)
-                all_embeddings.extend(batch_embeddings)
-            
-            # Store embeddings
-            success = self.embeddings_manager.store_embeddings(
-                entity_name, 
-                embeddings_config, 
-                ids, 
-                all_embeddings
-            )
+            # Build the index once, after all chunks are in
+            index_start = time.time()
+            index_stats = {}
+            self.embeddings_manager.create_vector_index(embeddings_config, stats=index_stats)
+            timings['index'] = time.time() - index_start
             
-            if success:
-                return {
-                    'success': True,
-                    'message': f"Generated embeddings for {len(ids)} rows in {entity_name}",
-                    'embeddings_config': embeddings_config
-                }
+            timings['fetch'] = fetch_timer['seconds']
+            timings['wall'] = time.time() - wall_start
+            
+            if self.incremental:
+                message = (f"Generated embeddings for {total} new or changed rows in {entity_name} "
+                           f"({skipped} unchanged, {deleted} deleted)")
             else:
-                return {
-                    'success': False,
-                    'message': f"Failed to store embeddings for {entity_name}"
-                }
-                
+                message = f"Generated embeddings for {total} rows in {entity_name}"
+            
+            stats = self._build_stats(total, timings, store_stats, encode_stats)
+            stats.update({'encoded': total, 'skipped': skipped, 'deleted': deleted})
+            if 'index_type' in index_stats:
+                stats['index_type'] = index_stats['index_type']
+                stats['index_options'] = index_stats['index_options']
+            
+            return {
+                'success': True,
+                'message': message,
+                'embeddings_config': embeddings_config,
+                'stats': stats
+            }
+        
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             return {
                 'success': False,
                 'message': f"Error: {str(e)}"
-            }
\ No newline at end of file
+            }
+    
+    def _embed_sequential(self, entity_name, embeddings_config, chunks, encode_stats):
+        """
+        Encode and store chunks one after the other
+        
+        Args:
+            entity_name (str): Entity name
+            embeddings_config (dict): Embeddings table configuration
+            chunks (iterable): (ids, texts, text hashes) chunks
+            encode_stats (dict): Collects embedding cache hits/misses
+        
+        Returns:
+            tuple: (rows stored, phase timings, store stats)
+        """
+        timings = {'encode': 0.0, 'store': 0.0}
+        store_stats = {}
+        total = 0
+        
+        for ids, texts, hashes in chunks:
+            encode_start = time.time()
+            embeddings = self._encode(texts, encode_stats)
+            timings['encode'] += time.time() - encode_start
+            
+            store_start = time.time()
+            self._store_chunk(entity_name, embeddings_config, ids, embeddings, hashes, store_stats, total)
+            timings['store'] += time.time() - store_start
+            
+            total += len(ids)
+            logger.info(f"Embedded {total} rows of {entity_name} so far")
+        
+        return total, timings, store_stats
+    
+    def _embed_overlapped(self, entity_name, embeddings_config, chunks, encode_stats):
+        """
+        Encode chunks on this thread while a writer thread stores them
+        
+        Encoded chunks go through a queue of queue_size entries, so encoding
+        runs at most that far ahead of the database and blocks (backpressure)
+        when writes are the bottleneck. A failed write stops encoding at the
+        next chunk.
+        
+        Args:
+            entity_name (str): Entity name
+            embeddings_config (dict): Embeddings table configuration
+            chunks (iterable): (ids, texts, text hashes) chunks
+            encode_stats (dict): Collects embedding cache hits/misses
+        
+        Returns:
+            tuple: (rows stored, phase timings, store stats)
+        """
+        timings = {'encode': 0.0, 'store': 0.0, 'encode_wait': 0.0, 'store_wait': 0.0}
+        store_stats = {}
+        work = queue.Queue(maxsize=self.queue_size)
+        errors = []
+        stored = [0]
+        
+        def writer():
+            while True:
+                wait_start = time.time()
+                item = work.get()
+                timings['store_wait'] += time.time() - wait_start
+                if item is _DONE:
+                    return
+                if errors:
+                    # Keep draining so the producer never blocks on a dead writer
+                    continue
+                
+                ids, embeddings, hashes = item
+                store_start = time.time()
+                try:
+                    self._store_chunk(entity_name, embeddings_config, ids, embeddings, hashes, store_stats, stored[0])
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                finally:
+                    timings['store'] += time.time() - store_start
+                
+                stored[0] += len(ids)
+                logger.info(f"Embedded {stored[0]} rows of {entity_name} so far")
+        
+        writer_thread = threading.Thread(target=writer, name=f"embeddings-writer-{entity_name}", daemon=True)
+        writer_thread.start()
+        
+        try:
+            for ids, texts, hashes in chunks:
+                if errors:
+                    break
+                
+                encode_start = time.time()
+                embeddings = self._encode(texts, encode_stats)
+                timings['encode'] += time.time() - encode_start
+                
+                wait_start = time.time()
+                work.put((ids, embeddings, hashes))
+                timings['encode_wait'] += time.time() - wait_start
+        finally:
+            work.put(_DONE)
+            writer_thread.join()
+        
+        if errors:
+            raise errors[0]
+        
+        return stored[0], timings, store_stats
+    
+    def _store_chunk(self, entity_name, embeddings_config, ids, embeddings, hashes, store_stats, stored_so_far):
+        """Store one encoded chunk, raising if the write fails"""
+        success = self.embeddings_manager.store_embeddings(
+            entity_name,
+            embeddings_config,
+            ids,
+            embeddings,
+            create_index=False,
+            stats=store_stats,
+            text_hashes=hashes
+        )
+        if not success:
+            raise RuntimeError(f"Failed to store embeddings for {entity_name} after {stored_so_far} rows")
+    
+    def _source_query(self, entity_name, embeddings_config, text_columns):
+        """
+        SELECT for the id, text columns and text hash of an entity
+        
+        In incremental mode only rows without an embedding, or whose text
+        hash changed since it was stored, are selected. The query takes
+        the embeddings manager's text_hash_params().
+        """
+        text_hash = self.embeddings_manager.text_hash_sql(text_columns, 'e')
+        columns_str = ', '.join(['e.id'] + [f"e.{col}" for col in text_columns] + [f"{text_hash} AS text_hash"])
+        
+        if not self.incremental:
+            return f"""
+            SELECT {columns_str}
+            FROM {entity_name} e;
+            """
+        
+        return f"""
+            SELECT {columns_str}
+            FROM {entity_name} e
+            LEFT JOIN {embeddings_config['table']} m ON m.id = e.id
+            WHERE m.id IS NULL OR m.text_hash IS DISTINCT FROM {text_hash};
+            """
+    
+    def _iter_text_chunks(self, entity_name, embeddings_config, text_columns):
+        """
+        Yield (ids, texts, text hashes) chunks read through a server-side cursor
+        
+        Args:
+            entity_name (str): Entity name
+            embeddings_config (dict): Embeddings table configuration
+            text_columns (list): Text columns to combine
+        
+        Yields:
+            tuple: (list of ids, list of combined texts, list of text hashes)
+        """
+        query = self._source_query(entity_name, embeddings_config, text_columns)
+        params = self.embeddings_manager.text_hash_params()
+        for rows in self.db_client.stream_query(query, params, fetch_size=self.fetch_size):
+            ids, texts, hashes = self._prepare_texts(rows)
+            if ids:
+                yield ids, texts, hashes
+    
+    def _prepare_texts(self, rows):
+        """
+        Combine the text columns of each row, dropping rows without text
+        
+        Args:
+            rows (list): Rows of (id, text columns..., text hash)
+        
+        Returns:
+            tuple: (list of ids, list of combined texts, list of text hashes)
+        """
+        texts = []
+        ids = []
+        hashes = []
+        for row in rows:
+            id_val = row[0]
+            # Combine text from all columns
+            text_parts = [str(val) for val in row[1:-1] if val is not None]
+            
+            combined_text = ' '.join(text_parts).strip()
+            if combined_text:
+                texts.append(combined_text)
+                ids.append(id_val)
+                hashes.append(row[-1])
+        
+        return ids, texts, hashes
+    
+    def _encode(self, texts, stats=None):
+        """
+        Encode texts in batches
+        
+        Args:
+            texts (list): Texts to encode
+            stats (dict, optional): Collects embedding cache hits/misses
+        
+        Returns:
+            list: Embeddings, in input order
+        """
+        if self.batching == 'sorted':
+            return self._encode_sorted(texts, stats)
+        
+        batch_size = self.batch_size
+        batches = [texts[i:i+batch_size] for i in range(0, len(texts), batch_size)]
+        
+        # Batches may be encoded in parallel (encode pool); results come back in order
+        all_embeddings = []
+        for batch_embeddings in self.embeddings_manager.generate_embeddings_batches(batches, stats=stats):
+            all_embeddings.extend(batch_embeddings)
+        
+        return all_embeddings
+    
+    def _encode_sorted(self, texts, stats=None):
+        """
+        Encode texts in length-sorted batches sized to max_batch_tokens
+        
+        Every batch is padded to its longest text, so grouping texts of
+        similar length wastes far less work than table order does.
+        Embeddings are put back in input order.
+        
+        Args:
+            texts (list): Texts to encode
+            stats (dict, optional): Collects embedding cache hits/misses
+        
+        Returns:
+            list: Embeddings, in input order
+        """
+        max_seq_length = self.embeddings_manager.get_max_seq_length() or DEFAULT_MAX_SEQ_LENGTH
+        lengths = _estimate_tokens(texts, max_seq_length)
+        plan = _plan_batches(lengths, self.max_batch_tokens, self.max_batch_size)
+        
+        batch_embeddings = self.embeddings_manager.generate_embeddings_batches(
+            [[texts[i] for i in batch] for batch in plan], stats=stats
+        )
+        
+        all_embeddings = [None] * len(texts)
+        for batch, embeddings in zip(plan, batch_embeddings):
+            for position, embedding in zip(batch, embeddings):
+                all_embeddings[position] = embedding
+        
+        return all_embeddings
+    
+    def _build_stats(self, rows, timings, store_stats, encode_stats=None):
+        """
+        Summarize per-phase timing and throughput for the stage result
+        
+        Args:
+            rows (int): Rows embedded
+            timings (dict): Seconds spent per phase (fetch, encode, store, wall,
+                plus encode_wait/store_wait when overlapped)
+            store_stats (dict): Stats filled in by store_embeddings
+            encode_stats (dict, optional): Embedding cache hits/misses
+        
+        Returns:
+            dict: Stage stats
+        """
+        encode_time = timings.get('encode', 0.0)
+        wall_time = timings.get('wall', 0.0)
+        stats = {
+            'rows': rows,
+            'overlap': self.overlap,
+            'batching': self.batching,
+            'encode_rows_per_sec': round(rows / encode_time, 1) if encode_time > 0 else 0.0,
+            'write_rows_per_sec': round(store_stats.get('rows_per_sec', 0.0), 1),
+            'write_method': store_stats.get('write_method'),
+            'rows_per_sec': round(rows / wall_time, 1) if wall_time > 0 else 0.0
+        }
+        for phase, seconds in timings.items():
+            stats[f"{phase}_time"] = f"{seconds:.2f}s"
+        
+        if self.embeddings_manager.cache is not None:
+            hits = (encode_stats or {}).get('cache_hits', 0)
+            misses = (encode_stats or {}).get('cache_misses', 0)
+            stats['cache_hits'] = hits
+            stats['cache_misses'] = misses
+            stats['cache_hit_rate'] = round(hits / (hits + misses), 3) if hits + misses else 0.0
+        return stats
@@ -24,6 +24,10 @@ class FTSGenerator(PipelineComponent):
         self.db_client = db_client
         self.fts_manager = fts_manager
     
+    def max_connections(self):
+        """One connection per tsvector chunk loaded in parallel"""
+        return self.fts_manager.workers if self.fts_manager.chunk_rows > 0 else 1
+    
     def process_entity(self, entity_name, entity_data=None, **kwargs):
         """
         Generate FTS vectors for an entity
@@ -41,13 +45,15 @@ class FTSGenerator(PipelineComponent):
             fts_config = self.fts_manager.create_fts_table(entity_name)
             
             # Generate FTS vectors
-            success = self.fts_manager.generate_fts_vectors(entity_name, fts_config)
+            stats = {}
+            success = self.fts_manager.generate_fts_vectors(entity_name, fts_config, stats=stats)
             
             if success:
                 return {
                     'success': True,
                     'message': f"Generated FTS vectors for {entity_name}",
-                    'fts_config': fts_config
+                    'fts_config': fts_config,
+                    'stats': stats
                 }
             else:
                 return {
@@ -6,27 +6,101 @@ This module provides functionality for importing Parquet files to PostgreSQL.
 
 import logging
 import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
 
+from ..utils.metrics import timed
 from .base import PipelineComponent
 
 logger = logging.getLogger(__name__)
 
+# Supported ways of loading rows into PostgreSQL
+LOAD_METHODS = ('execute_values', 'copy')
+
+# Rows per COPY chunk - keeps the rendered CSV buffer reasonably small
+DEFAULT_COPY_BATCH_ROWS = 50000
+
+# Rows per record batch when streaming a file row group by row group
+DEFAULT_STREAM_BATCH_ROWS = 65536
+
+# Read-ahead per ranged GET when streaming
+DEFAULT_STREAM_BUFFER_BYTES = 8 * 1024 * 1024
+
+# pandas dtypes for Arrow types that plain to_pandas() widens when they hold
+# nulls (ints to float64 with NaN, bools to object); these keep the values
+# ints and bools, so they fit the BIGINT/BOOLEAN columns made from the schema
+NULLABLE_PANDAS_DTYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+    pa.uint32(): pd.UInt32Dtype(),
+    pa.uint64(): pd.UInt64Dtype(),
+    pa.bool_(): pd.BooleanDtype()
+}
+
+class _TableGate:
+    """Lets concurrent file imports wait until the entity table has been created"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self.created = False
+    
+    def open(self, created):
+        """Release waiters, recording whether the table was actually created"""
+        self.created = created
+        self._event.set()
+    
+    def is_open(self):
+        return self._event.is_set()
+    
+    def wait(self):
+        self._event.wait()
+        if not self.created:
+            raise RuntimeError("Entity table was not created, skipping load")
+
 class ParquetImporter(PipelineComponent):
     """Imports Parquet files to PostgreSQL"""
     
-    def __init__(self, s3_client, db_client):
+    def __init__(self, s3_client, db_client, config=None):
         """
         Initialize the Parquet importer
         
         Args:
             s3_client (S3Client): S3 client
             db_client (DBClient): Database client
+            config (dict, optional): Import configuration
         """
         super().__init__("ParquetImporter")
         self.s3_client = s3_client
         self.db_client = db_client
+        self.config = config or {}
+        
+        self.load_method = self.config.get('load_method', 'execute_values')
+        if self.load_method not in LOAD_METHODS:
+            raise ValueError(f"Unknown load method '{self.load_method}', expected one of {LOAD_METHODS}")
+        
+        self.copy_batch_rows = int(self.config.get('copy_batch_rows', DEFAULT_COPY_BATCH_ROWS))
+        
+        # Streaming mode reads files incrementally with ranged GETs instead of downloading them whole
+        self.streaming = bool(self.config.get('streaming', False))
+        self.stream_batch_rows = int(self.config.get('stream_batch_rows', DEFAULT_STREAM_BATCH_ROWS))
+        self.stream_buffer_bytes = int(self.config.get('stream_buffer_bytes', DEFAULT_STREAM_BUFFER_BYTES))
+        
+        # Files of one entity imported concurrently; each load uses its own connection
+        self.workers = max(1, int(self.config.get('workers', 1)))
+    
+    def max_connections(self):
+        """One connection per file loaded in parallel"""
+        return self.workers
     
     def process_entity(self, entity_name, entity_data=None, **kwargs):
         """
@@ -59,45 +133,54 @@ class ParquetImporter(PipelineComponent):
                 
             logger.info(f"Found {len(parquet_files)} parquet files for {entity_name}")
             
-            # Process each parquet file
-            for file_key in parquet_files:
-                logger.info(f"Processing file: {file_key}")
-                
-                # Download parquet file
-                parquet_bytes = self.s3_client.download_file(file_key)
-                
-                # Convert to DataFrame
-                buffer = io.BytesIO(parquet_bytes)
-                table = pq.read_table(buffer)
-                df = table.to_pandas()
-                logger.info(f"DataFrame shape: {df.shape}")
-                
-                # Process DataFrame
-                df = self._preprocess_dataframe(df)
-                
-                # Create table schema
-                create_table_sql = self._generate_create_table_sql(entity_name, df)
+            # The first file (re)creates the table, every other file appends to it
+            gate = _TableGate()
+            order = {file_key: i for i, file_key in enumerate(parquet_files)}
+            file_stats = []
+            errors = []
+            
+            if self.workers <= 1 or len(parquet_files) == 1:
+                for i, file_key in enumerate(parquet_files):
+                    file_stats.append(self._import_file(entity_name, file_key, gate, create_table=(i == 0)))
+            else:
+                workers = min(self.workers, len(parquet_files))
+                logger.info(f"Importing {len(parquet_files)} files for {entity_name} with {workers} workers")
                 
-                # Create table
-                conn = self.db_client.get_connection()
-                cursor = conn.cursor()
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"import-{entity_name}") as executor:
+                    futures = {
+                        executor.submit(self._import_file, entity_name, file_key, gate, i == 0): file_key
+                        for i, file_key in enumerate(parquet_files)
+                    }
+                    for future in as_completed(futures):
+                        try:
+                            file_stats.append(future.result())
+                        except Exception as e:
+                            logger.error(f"Failed to import {futures[future]}: {str(e)}")
+                            errors.append((futures[future], e))
                 
-                try:
-                    cursor.execute(create_table_sql)
-                    conn.commit()
-                    logger.info(f"Table {entity_name} created successfully")
-                    
-                    # Insert data
-                    self._insert_data(entity_name, df)
-                    
-                finally:
-                    cursor.close()
-                    conn.close()
+                # Keep the per-file report in listing order
+                file_stats.sort(key=lambda stats: order[stats['file']])
+            
+            stats = {
+                'files': file_stats,
+                'rows': sum(f['rows'] for f in file_stats),
+                'workers': min(self.workers, len(parquet_files))
+            }
+            
+            if errors:
+                errors.sort(key=lambda item: order[item[0]])
+                failed_file, error = errors[0]
+                return {
+                    'success': False,
+                    'message': f"Failed to import {len(errors)}/{len(parquet_files)} files, first error in {failed_file}: {str(error)}",
+                    'stats': stats
+                }
             
             # Return success
             return {
                 'success': True,
-                'message': f"Imported {len(parquet_files)} parquet files to {entity_name}"
+                'message': f"Imported {len(parquet_files)} parquet files ({stats['rows']} rows) to {entity_name}",
+                'stats': stats
             }
             
         except Exception as e:
@@ -107,6 +190,200 @@ class ParquetImporter(PipelineComponent):
                 'message': f"Error: {str(e)}"
             }
     
+    def _import_file(self, entity_name, file_key, gate, create_table=False):
+        """
+        Import one parquet file into the entity table
+        
+        Args:
+            entity_name (str): Entity name
+            file_key (str): S3 key of the parquet file
+            gate (_TableGate): Coordinates table creation between files
+            create_table (bool): Whether this file creates the table; other
+                files wait on the gate before loading
+            
+        Returns:
+            dict: Per-file stats (rows and timings)
+        """
+        logger.info(f"Processing file: {file_key}")
+        start_time = time.time()
+        
+        try:
+            if self.streaming:
+                stats = self._import_file_streaming(entity_name, file_key, gate, create_table)
+            else:
+                stats = self._import_file_buffered(entity_name, file_key, gate, create_table)
+        finally:
+            # Never leave other files waiting on a table that won't come
+            if create_table and not gate.is_open():
+                gate.open(False)
+        
+        stats['file'] = file_key
+        stats['total_time'] = f"{time.time() - start_time:.2f}s"
+        logger.info(f"Imported {stats['rows']} rows from {file_key} in {stats['total_time']}")
+        return stats
+    
+    def _import_file_buffered(self, entity_name, file_key, gate, create_table):
+        """
+        Download a whole parquet file and load it into the entity table
+        
+        Args:
+            entity_name (str): Entity name
+            file_key (str): S3 key of the parquet file
+            gate (_TableGate): Coordinates table creation between files
+            create_table (bool): Whether this file creates the table
+            
+        Returns:
+            dict: Rows loaded and download/decode/load timings
+        """
+        # Download parquet file
+        start = time.time()
+        parquet_bytes = self.s3_client.download_file(file_key)
+        download_time = time.time() - start
+        
+        start = time.time()
+        buffer = io.BytesIO(parquet_bytes)
+        table = pq.read_table(buffer)
+        del parquet_bytes, buffer
+        
+        if self.load_method == 'copy':
+            # COPY works on the Arrow table directly, no pandas round trip
+            logger.info(f"Arrow table shape: ({table.num_rows}, {table.num_columns})")
+            decode_time = time.time() - start
+            
+            self._ensure_table(entity_name, gate, create_table,
+                               lambda: self._generate_create_table_sql_from_schema(entity_name, table.schema))
+            start = time.time()
+            self._copy_data(entity_name, table)
+            rows = table.num_rows
+        else:
+            # Convert to DataFrame
+            df = self._to_dataframe(table)
+            logger.info(f"DataFrame shape: {df.shape}")
+            
+            # Process DataFrame
+            df = self._preprocess_dataframe(df)
+            decode_time = time.time() - start
+            
+            # Same table definition as COPY and streaming, from the Arrow types
+            self._ensure_table(entity_name, gate, create_table,
+                               lambda: self._generate_create_table_sql_from_schema(entity_name, table.schema))
+            start = time.time()
+            self._insert_data(entity_name, df)
+            rows = len(df)
+        
+        return {
+            'rows': rows,
+            'download_time': f"{download_time:.2f}s",
+            'decode_time': f"{decode_time:.2f}s",
+            'load_time': f"{time.time() - start:.2f}s"
+        }
+    
+    def _import_file_streaming(self, entity_name, file_key, gate, create_table):
+        """
+        Stream a parquet file from S3 into the entity table batch by batch
+        
+        The file is opened with ranged GETs and read one record batch at a
+        time; each batch is loaded before the next is fetched, so peak
+        memory is bounded by the row group size rather than the file size.
+        
+        Args:
+            entity_name (str): Entity name
+            file_key (str): S3 key of the parquet file
+            gate (_TableGate): Coordinates table creation between files
+            create_table (bool): Whether this file creates the table
+            
+        Returns:
+            dict: Rows loaded and read/load timings
+        """
+        start_time = time.time()
+        read_timer = {'seconds': 0.0}
+        
+        with self.s3_client.open_file(file_key, buffer_size=self.stream_buffer_bytes) as source:
+            parquet_file = pq.ParquetFile(source)
+            schema = parquet_file.schema_arrow
+            logger.info(
+                f"Streaming {parquet_file.metadata.num_rows} rows in "
+                f"{parquet_file.num_row_groups} row groups from {file_key}"
+            )
+            
+            # Fetching and decoding happen lazily as batches are pulled, time them separately
+            batches = timed(parquet_file.iter_batches(batch_size=self.stream_batch_rows), read_timer)
+            
+            # Create the table up front, so a file without rows still creates (or empties) it
+            self._ensure_table(entity_name, gate, create_table,
+                               lambda: self._generate_create_table_sql_from_schema(entity_name, schema))
+            
+            if self.load_method == 'copy':
+                count = self.db_client.copy_record_batches(
+                    entity_name,
+                    schema.names,
+                    (self._prepare_batch_for_copy(batch) for batch in batches)
+                )
+            else:
+                # execute_values path: each batch goes through pandas on its own
+                count = 0
+                for batch in batches:
+                    df = self._preprocess_dataframe(self._to_dataframe(batch))
+                    self.db_client.insert_with_execute_values(
+                        entity_name, df.columns.tolist(), self._dataframe_rows(df)
+                    )
+                    count += len(df)
+            
+            logger.info(f"Streamed {count} rows into {entity_name}")
+        
+        total_time = time.time() - start_time
+        return {
+            'rows': count,
+            'read_time': f"{read_timer['seconds']:.2f}s",
+            'load_time': f"{total_time - read_timer['seconds']:.2f}s"
+        }
+    
+    def _ensure_table(self, entity_name, gate, create_table, sql_factory):
+        """
+        Create the entity table, or wait until another file has created it
+        
+        Args:
+            entity_name (str): Entity name
+            gate (_TableGate): Coordinates table creation between files
+            create_table (bool): Whether this file creates the table
+            sql_factory (callable): Returns the CREATE TABLE SQL
+        """
+        if not create_table:
+            gate.wait()
+            return
+        
+        try:
+            self._create_table(entity_name, sql_factory())
+            gate.open(True)
+        except Exception:
+            gate.open(False)
+            raise
+    
+    def _create_table(self, table_name, create_table_sql):
+        """
+        Run the CREATE TABLE statement for an entity
+        
+        Args:
+            table_name (str): Table name
+            create_table_sql (str): SQL from one of the _generate_* helpers
+        """
+        with self.db_client.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(create_table_sql)
+                conn.commit()
+                logger.info(f"Table {table_name} created successfully")
+    
+    @staticmethod
+    def _to_dataframe(data):
+        """Convert an Arrow table or record batch to pandas, keeping nullable ints and bools"""
+        return data.to_pandas(types_mapper=NULLABLE_PANDAS_DTYPES.get)
+    
+    @staticmethod
+    def _dataframe_rows(df):
+        """Row tuples for execute_values, with missing values (NaN, NaT, pd.NA) as None"""
+        values = df.astype(object).where(df.notna(), None)
+        return list(values.itertuples(index=False, name=None))
+    
     def _preprocess_dataframe(self, df):
         """
         Preprocess a DataFrame before importing
@@ -117,45 +394,56 @@ class ParquetImporter(PipelineComponent):
         Returns:
             pandas.DataFrame: Preprocessed DataFrame
         """
-        # Process list columns
+        # Process list columns (Arrow lists arrive from to_pandas() as numpy arrays)
         for col in df.columns:
-            if df[col].apply(lambda x: isinstance(x, list)).any():
-                df[col] = df[col].apply(lambda x: [] if not isinstance(x, list) else x)
+            if df[col].apply(lambda x: isinstance(x, (list, np.ndarray))).any():
+                df[col] = df[col].apply(lambda x: list(x) if isinstance(x, (list, np.ndarray)) else [])
                 
         # Handle large IDs
         if 'id' in df.columns:
             df['id'] = df['id'].astype(str)
             
+        # parent_id is stored as text, missing or empty ones as NULL
         if 'parent_id' in df.columns:
-            df['parent_id'] = df['parent_id'].fillna('').astype(str)
-            df['parent_id'] = df['parent_id'].replace('', None)
+            df['parent_id'] = df['parent_id'].map(lambda v: None if pd.isna(v) or v == '' else str(v))
         
         return df
     
-    def _generate_create_table_sql(self, table_name, df):
+    def _generate_create_table_sql_from_schema(self, table_name, schema):
         """
-        Generate CREATE TABLE SQL for a DataFrame
+        Generate CREATE TABLE SQL from an Arrow schema
+        
+        Used by both load methods, so a file gives the same table whichever
+        one loads it.
         
         Args:
             table_name (str): Table name
-            df (pandas.DataFrame): DataFrame
+            schema (pyarrow.Schema): Arrow schema
             
         Returns:
             str: CREATE TABLE SQL
         """
         columns = []
-        for col, dtype in df.dtypes.items():
+        for field in schema:
+            col = field.name
+            dtype = field.type
+            if pa.types.is_dictionary(dtype):
+                dtype = dtype.value_type
+            
             if col == 'id':
                 columns.append(f"{col} NUMERIC(38,0) PRIMARY KEY")
-            elif 'int' in str(dtype):
+            elif col == 'parent_id':
+                # parent_id is loaded as text whatever its parquet type
+                columns.append(f"{col} VARCHAR(1000)")
+            elif pa.types.is_integer(dtype):
                 columns.append(f"{col} BIGINT")
-            elif 'float' in str(dtype):
+            elif pa.types.is_floating(dtype):
                 columns.append(f"{col} DOUBLE PRECISION")
-            elif dtype == 'bool':
+            elif pa.types.is_boolean(dtype):
                 columns.append(f"{col} BOOLEAN")
-            elif 'datetime' in str(dtype):
+            elif pa.types.is_timestamp(dtype):
                 columns.append(f"{col} TIMESTAMP")
-            elif df[col].apply(lambda x: isinstance(x, list)).any():
+            elif pa.types.is_list(dtype) or pa.types.is_large_list(dtype):
                 columns.append(f"{col} TEXT[]")
             else:
                 columns.append(f"{col} VARCHAR(1000)")
@@ -184,23 +472,138 @@ class ParquetImporter(PipelineComponent):
         
         # Prepare data for insertion
         columns = df.columns.tolist()
-        values = [tuple(row) for row in df.values]
+        values = self._dataframe_rows(df)
         
         # Insert data with execute_values for better performance
         result = self.db_client.insert_with_execute_values(table_name, columns, values)
         
         if result:
             # Verify
-            conn = self.db_client.get_connection()
-            cursor = conn.cursor()
-            
-            try:
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                count = cursor.fetchone()[0]
-                logger.info(f"Inserted {count} rows into {table_name}")
-                return True
-            finally:
-                cursor.close()
-                conn.close()
-        
-        return False
\ No newline at end of file
+            with self.db_client.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                    count = cursor.fetchone()[0]
+                    logger.info(f"Inserted {count} rows into {table_name}")
+                    return True
+        
+        return False
+    
+    def _copy_data(self, table_name, table):
+        """
+        Load an Arrow table into a table with COPY FROM STDIN
+        
+        Args:
+            table_name (str): Table name
+            table (pyarrow.Table): Data to load
+            
+        Returns:
+            bool: Success status
+        """
+        logger.info(f"Copying {table.num_rows} rows into {table_name}...")
+        
+        batches = (
+            self._prepare_batch_for_copy(batch)
+            for batch in table.to_batches(max_chunksize=self.copy_batch_rows)
+        )
+        count = self.db_client.copy_record_batches(table_name, table.column_names, batches)
+        
+        return count > 0
+    
+    def _prepare_batch_for_copy(self, batch):
+        """
+        Make a record batch CSV-writable for COPY
+        
+        The Arrow CSV writer can't render nested types, so list columns are
+        turned into PostgreSQL array literals, other nested columns into row
+        literals, and dictionary columns are decoded. Values end up as the
+        execute_values path stores them: a null list becomes an empty array,
+        an empty parent_id and a float NaN become NULL (pandas treats NaN as
+        missing). Everything runs column-at-a-time in pyarrow.compute, no
+        values go through Python.
+        
+        Args:
+            batch (pyarrow.RecordBatch): Batch to convert
+            
+        Returns:
+            pyarrow.RecordBatch: Batch with CSV-compatible columns
+        """
+        arrays = []
+        changed = False
+        for field, column in zip(batch.schema, batch.columns):
+            if pa.types.is_dictionary(field.type):
+                column = column.cast(field.type.value_type)
+                changed = True
+            elif pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+                column = pc.fill_null(self._to_pg_text(column), '{}')
+                changed = True
+            elif pa.types.is_nested(field.type):
+                column = self._to_pg_text(column)
+                changed = True
+            elif field.name == 'parent_id' and (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+                column = pc.if_else(pc.equal(column, ''), pa.scalar(None, field.type), column)
+                changed = True
+            elif pa.types.is_floating(field.type):
+                column = pc.if_else(pc.is_nan(column), pa.scalar(None, field.type), column)
+                changed = True
+            arrays.append(column)
+        
+        if not changed:
+            return batch
+        return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+    
+    @classmethod
+    def _to_pg_text(cls, array):
+        """
+        Render an Arrow array as PostgreSQL text, keeping nulls null
+        
+        Lists (and maps) become array literals, e.g. {"a","b"}; structs
+        become row literals, e.g. (1,a); anything else is cast to string.
+        
+        Args:
+            array (pyarrow.Array): Values to render
+            
+        Returns:
+            pyarrow.StringArray: Rendered values
+        """
+        if pa.types.is_dictionary(array.type):
+            array = array.dictionary_decode()
+        
+        if pa.types.is_list(array.type) or pa.types.is_large_list(array.type) or pa.types.is_map(array.type):
+            return cls._to_pg_array_literals(array)
+        
+        if pa.types.is_struct(array.type):
+            if array.type.num_fields == 0:
+                fields_text = pa.array([''] * len(array), type=pa.string())
+            else:
+                fields = [pc.fill_null(cls._to_pg_text(array.field(i)), '') for i in range(array.type.num_fields)]
+                fields_text = pc.binary_join_element_wise(*fields, ',')
+            rows = pc.binary_join_element_wise('(', fields_text, ')', '')
+            # The child arrays don't carry the struct's own nulls
+            return pc.if_else(array.is_null(), pa.scalar(None, pa.string()), rows)
+        
+        return pc.cast(array, pa.string())
+    
+    @classmethod
+    def _to_pg_array_literals(cls, array):
+        """
+        Render a list (or map) array as PostgreSQL array literals, e.g. {"a","b"}
+        
+        Items are rendered and quoted in one pass over the flattened values,
+        then joined per list. Null items become NULL, null lists stay null.
+        
+        Args:
+            array (pyarrow.ListArray): Lists to render
+            
+        Returns:
+            pyarrow.StringArray: One array literal per list
+        """
+        # .values is the whole child array; .offsets index into it, also for slices
+        items = cls._to_pg_text(array.values)
+        items = pc.replace_substring(items, '\\', '\\\\')
+        items = pc.replace_substring(items, '"', '\\"')
+        items = pc.fill_null(pc.binary_join_element_wise('"', items, '"', ''), 'NULL')
+        
+        list_type = pa.LargeListArray if pa.types.is_large_list(array.type) else pa.ListArray
+        joined = pc.binary_join(list_type.from_arrays(array.offsets, items), ',')
+        literals = pc.binary_join_element_wise('{', joined, '}', '')
+        return pc.if_else(array.is_null(), pa.scalar(None, pa.string()), literals)
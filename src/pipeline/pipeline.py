@@ -5,20 +5,40 @@ Main pipeline orchestration module
 import logging
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
 import os
 
 logger = logging.getLogger(__name__)
 
+# How entities are spread over workers
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
 class Pipeline:
     """
     Main pipeline that runs all the processing steps
     """
     
-    def __init__(self, s3_client, components=None):
+    def __init__(self, s3_client, components=None, workers=1, executor='thread'):
+        """
+        Args:
+            s3_client: S3 client used for discovery
+            components: Pipeline components, run in order for each entity
+            workers: Number of entities processed concurrently
+            executor: 'thread' or 'process' worker pool
+        """
         self.s3_client = s3_client
         self.components = components or []
         
+        # Entity-level parallelism (components still run in order per entity)
+        self.workers = max(1, int(workers))
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}', expected one of {list(EXECUTORS)}")
+        self.executor = executor
+        
         # Keep track of runs
         self.run_count = 0
         
@@ -33,6 +53,41 @@ class Pipeline:
         self.components.append(component)
         logger.debug(f"Added component: {component.name}")
     
+    def max_connections(self):
+        """
+        Pooled database connections a run can hold at once
+        
+        Components run one after another per entity, so an entity needs as
+        many as its hungriest component. Thread workers share one pool;
+        process workers each have their own.
+        """
+        per_entity = max((component.max_connections() for component in self.components), default=0)
+        return per_entity * (self.workers if self.executor == 'thread' else 1)
+    
+    def check_pool_size(self, pool_max_size):
+        """
+        Fail fast if the connection pool can't serve a run's concurrency
+        
+        Stages hold a connection while waiting for another (parallel files,
+        streaming cursor plus writer, FTS chunks), so a pool that is too
+        small stalls until the pool timeout instead of erroring.
+        
+        Args:
+            pool_max_size (int): database.pool_max_size
+            
+        Raises:
+            ValueError: If the pool is smaller than max_connections()
+        """
+        required = self.max_connections()
+        if required > int(pool_max_size):
+            needs = ', '.join(f"{component.name}={component.max_connections()}" for component in self.components)
+            workers = f" x {self.workers} pipeline workers" if self.executor == 'thread' else ""
+            raise ValueError(
+                f"database.pool_max_size is {pool_max_size} but the pipeline can hold {required} connections "
+                f"at once ({needs} per entity{workers}). Raise database.pool_max_size to at least {required} "
+                f"or lower pipeline.workers / import.workers / fts.workers."
+            )
+    
     def run(self, date_folder=None, entity_filter=None):
         """
         Run the pipeline
@@ -55,6 +110,12 @@ class Pipeline:
         }
         
         try:
+            # Listings are cached for the duration of a run only
+            self.s3_client.clear_listing_cache()
+            
+            # Let components start slow setup (model loading) while discovery and imports run
+            self._warm_up_components()
+            
             # Get latest date folder if none provided
             if date_folder is None:
                 logger.info("No date folder specified, looking for latest")
@@ -88,15 +149,17 @@ class Pipeline:
             all_success = True
             entities_processed = 0
             
-            # Process each entity
+            # Pick the entities to process
+            selected = []
             for entity_name, entity_folder in entity_folders:
                 # Filter if requested
                 if entity_filter and entity_name != entity_filter:
                     logger.info(f"Skipping {entity_name} (filter active for {entity_filter})")
                     continue
-
-                # Actually process the entity
-                entity_result = self.process_entity(entity_name, entity_folder)
+                selected.append((entity_name, entity_folder))
+            
+            # Actually process the entities - results come back in listing order
+            for entity_result in self._process_entities(selected):
                 entities_processed += 1
                 
                 # Add to results
@@ -105,7 +168,7 @@ class Pipeline:
                 # Update overall success flag
                 if not entity_result.get('success', False):
                     all_success = False
-                    logger.warning(f"Entity {entity_name} had errors")
+                    logger.warning(f"Entity {entity_result['entity']} had errors")
 
             # Check that we actually processed something
             if entities_processed == 0:
@@ -155,6 +218,54 @@ class Pipeline:
             
             return results
     
+    def _warm_up_components(self):
+        """Ask every component to start its background setup"""
+        if self.executor == 'process':
+            # Entities run in child processes that load their own models; a
+            # background load in this process would only race the fork
+            return
+        
+        for component in self.components:
+            try:
+                component.warm_up()
+            except Exception as e:
+                logger.warning(f"Warm-up of component '{component.name}' failed: {str(e)}")
+    
+    def _process_entities(self, entities):
+        """
+        Process (entity_name, entity_folder) pairs, concurrently if configured
+        
+        Returns the entity results in the same order as the input.
+        """
+        workers = min(self.workers, len(entities))
+        if workers <= 1:
+            return [self.process_entity(name, folder) for name, folder in entities]
+        
+        logger.info(f"Processing {len(entities)} entities with {workers} {self.executor} workers")
+        
+        results = []
+        with EXECUTORS[self.executor](max_workers=workers) as executor:
+            futures = [executor.submit(self.process_entity, name, folder) for name, folder in entities]
+            
+            for (entity_name, entity_folder), future in zip(entities, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # process_entity handles component errors itself, so this is the
+                    # worker dying (or failing to pickle the pipeline for processes)
+                    logger.error(f"Worker failed for entity {entity_name}: {str(e)}")
+                    logger.debug(traceback.format_exc())
+                    results.append({
+                        'entity': entity_name,
+                        'folder': entity_folder,
+                        'stages': {},
+                        'success': False,
+                        'error': str(e),
+                        'total_time': '0.00s'
+                    })
+        
+        return results
+    
     def process_entity(self, entity_name, entity_folder):
         """
         Process a single entity through all components
@@ -201,6 +312,10 @@ class Pipeline:
                     'message': component_result.get('message', '')
                 }
                 
+                # Components can report extra numbers (timings, row counts...)
+                if 'stats' in component_result:
+                    result['stages'][component.name]['stats'] = component_result['stats']
+                
                 # Update entity data for next component
                 entity_data.update(component_result)
                 
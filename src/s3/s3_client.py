@@ -2,8 +2,11 @@
 S3 Client module for AWS operations
 """
 import boto3
+import io
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 import time  # For retry backoff
 
@@ -12,6 +15,100 @@ logger = logging.getLogger(__name__)
 # Max retries for S3 operations
 MAX_RETRIES = 3
 
+# Read-ahead buffer for ranged reads - each buffer refill is one GET
+DEFAULT_STREAM_BUFFER_BYTES = 8 * 1024 * 1024
+
+# Threads used to list sub-prefixes in parallel
+DEFAULT_LISTING_WORKERS = 8
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable, read-only file object over an S3 object
+    
+    Every read is served by a ranged GET, so readers like pyarrow only
+    fetch the footer and the row groups they actually need instead of
+    downloading the whole object.
+    """
+    
+    def __init__(self, client, bucket, key, size=None):
+        """
+        Args:
+            client: boto3 S3 client
+            bucket (str): Bucket name
+            key (str): Object key
+            size (int, optional): Object size, looked up with HEAD if not given
+        """
+        super().__init__()
+        self._client = client
+        self.bucket = bucket
+        self.key = key
+        if size is None:
+            size = client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.size = size
+        self._pos = 0
+        
+        # Simple counters, handy for checking how much we really fetched
+        self.requests = 0
+        self.bytes_fetched = 0
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def tell(self):
+        return self._pos
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        
+        if pos < 0:
+            raise ValueError(f"Negative seek position {pos}")
+        self._pos = pos
+        return pos
+    
+    def readinto(self, b):
+        if self._pos >= self.size:
+            return 0
+        
+        end = min(self._pos + len(b), self.size) - 1
+        data = self._get_range(self._pos, end)
+        
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        return n
+    
+    def _get_range(self, start, end):
+        """Fetch bytes [start, end] (inclusive) with retries"""
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = self._client.get_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    Range=f"bytes={start}-{end}"
+                )
+                data = response['Body'].read()
+                self.requests += 1
+                self.bytes_fetched += len(data)
+                return data
+            except Exception as e:
+                if attempt < MAX_RETRIES - 1:
+                    sleep_time = 2 ** attempt
+                    logger.warning(f"S3 range read error (attempt {attempt+1}/{MAX_RETRIES}): {e}. Retrying in {sleep_time}s...")
+                    time.sleep(sleep_time)
+                else:
+                    logger.error(f"Failed to read {self.key} bytes {start}-{end} after {MAX_RETRIES} attempts: {e}")
+                    raise
+
 class S3Client:
     """AWS S3 operations wrapper"""
     
@@ -21,6 +118,23 @@ class S3Client:
         self._client = None  # Lazy initialization
         self.bucket = config.get('bucket', 'hg-dpi-prod-ch-dataload1')
         
+        # Listing results keyed by (bucket, prefix, delimiter), cleared at the start of each run
+        self.listing_workers = max(1, int(config.get('listing_workers', DEFAULT_LISTING_WORKERS)))
+        self.use_listing_cache = config.get('listing_cache', True)
+        self._listing_cache = {}
+        self._listing_lock = threading.Lock()
+    
+    def __getstate__(self):
+        """Drop the boto3 client when pickled (e.g. for process workers) - it's recreated lazily"""
+        state = self.__dict__.copy()
+        state['_client'] = None
+        state['_listing_lock'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._listing_lock = threading.Lock()
+        
     @property
     def client(self):
         """Get the boto3 client - lazy loaded on first use"""
@@ -70,6 +184,97 @@ class S3Client:
         """Get the configured bucket name"""
         return self.bucket
     
+    def clear_listing_cache(self):
+        """Forget cached listings (called at the start of each pipeline run)"""
+        with self._listing_lock:
+            self._listing_cache.clear()
+    
+    def list_prefix(self, prefix='', delimiter=None, bucket_name=None):
+        """
+        List a prefix completely, following continuation tokens
+        
+        list_objects_v2 returns at most 1000 entries per call, so this
+        pages through IsTruncated/NextContinuationToken until done.
+        Results are cached per (bucket, prefix, delimiter).
+        
+        Args:
+            prefix (str): Key prefix
+            delimiter (str, optional): Delimiter, e.g. '/' to get "folders"
+            bucket_name (str, optional): Bucket, defaults to the configured one
+            
+        Returns:
+            tuple: (list of object keys, list of common prefixes)
+        """
+        bucket = bucket_name or self.bucket
+        cache_key = (bucket, prefix, delimiter)
+        
+        if self.use_listing_cache:
+            with self._listing_lock:
+                cached = self._listing_cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Listing cache hit for s3://{bucket}/{prefix}")
+                return list(cached[0]), list(cached[1])
+        
+        kwargs = {'Bucket': bucket, 'Prefix': prefix}
+        if delimiter:
+            kwargs['Delimiter'] = delimiter
+        
+        keys = []
+        prefixes = []
+        pages = 0
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            pages += 1
+            keys.extend(item['Key'] for item in response.get('Contents', []))
+            prefixes.extend(p['Prefix'] for p in response.get('CommonPrefixes', []))
+            
+            if not response.get('IsTruncated'):
+                break
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+        
+        if pages > 1:
+            logger.debug(f"Listed s3://{bucket}/{prefix} in {pages} pages ({len(keys)} keys, {len(prefixes)} prefixes)")
+        
+        if self.use_listing_cache:
+            with self._listing_lock:
+                self._listing_cache[cache_key] = (tuple(keys), tuple(prefixes))
+        
+        return keys, prefixes
+    
+    def list_keys(self, prefix, bucket_name=None):
+        """
+        List every key under a prefix, recursively
+        
+        With more than one listing worker the keyspace is sharded on '/'
+        sub-prefixes and each shard is listed in its own thread, which
+        is much faster for deep or wide prefixes than one serial listing.
+        
+        Args:
+            prefix (str): Key prefix
+            bucket_name (str, optional): Bucket, defaults to the configured one
+            
+        Returns:
+            list: Sorted object keys
+        """
+        bucket = bucket_name or self.bucket
+        
+        if self.listing_workers <= 1:
+            keys, _ = self.list_prefix(prefix, bucket_name=bucket)
+            return sorted(keys)
+        
+        keys = []
+        with ThreadPoolExecutor(max_workers=self.listing_workers, thread_name_prefix='s3-list') as executor:
+            pending = {executor.submit(self.list_prefix, prefix, '/', bucket)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard_keys, sub_prefixes = future.result()
+                    keys.extend(shard_keys)
+                    for sub_prefix in sub_prefixes:
+                        pending.add(executor.submit(self.list_prefix, sub_prefix, '/', bucket))
+        
+        return sorted(keys)
+    
     def get_latest_date_folder(self, bucket_name=None):
         """
         Find the most recent date folder
@@ -82,13 +287,10 @@ class S3Client:
         for attempt in range(MAX_RETRIES):
             try:
                 # List with delimiter to get "directories"
-                response = self.client.list_objects_v2(
-                    Bucket=bucket,
-                    Delimiter='/'
-                )
+                _, folders = self.list_prefix('', delimiter='/', bucket_name=bucket)
                 
                 # No folders found
-                if 'CommonPrefixes' not in response:
+                if not folders:
                     logger.warning(f"No folders found in bucket {bucket}")
                     return None
                 
@@ -96,8 +298,7 @@ class S3Client:
                 date_folders = []
                 date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}-\d{2}/$')
                 
-                for prefix in response['CommonPrefixes']:
-                    folder = prefix['Prefix']
+                for folder in folders:
                     if date_pattern.match(folder):
                         # Parse the date (remove trailing slash)
                         date_str = folder.rstrip('/')
@@ -157,20 +358,15 @@ class S3Client:
         
         for attempt in range(MAX_RETRIES):
             try:
-                response = self.client.list_objects_v2(
-                    Bucket=bucket,
-                    Prefix=date_folder,
-                    Delimiter='/'
-                )
+                _, folders = self.list_prefix(date_folder, delimiter='/', bucket_name=bucket)
                 
-                if 'CommonPrefixes' not in response:
+                if not folders:
                     logger.warning(f"No entity folders found in {date_folder}")
                     return []
                 
                 # Process each folder
                 entity_folders = []
-                for prefix in response['CommonPrefixes']:
-                    folder_path = prefix['Prefix']  # e.g. 2025-04-14-09/products/
+                for folder_path in folders:  # e.g. 2025-04-14-09/products/
                     
                     # Extract entity name from path
                     # e.g. 2025-04-14-09/products/ -> products
@@ -205,19 +401,15 @@ class S3Client:
         
         for attempt in range(MAX_RETRIES):
             try:
-                response = self.client.list_objects_v2(
-                    Bucket=bucket,
-                    Prefix=entity_folder
-                )
+                keys = self.list_keys(entity_folder, bucket_name=bucket)
                 
-                if 'Contents' not in response:
+                if not keys:
                     logger.warning(f"No files found in {entity_folder}")
                     return []
                 
                 # Filter for parquet files
                 parquet_files = []
-                for item in response['Contents']:
-                    key = item['Key']
+                for key in keys:
                     # Typical extensions: .parquet or .snappy.parquet
                     if key.endswith(('.parquet', '.snappy.parquet')):
                         parquet_files.append(key)
@@ -265,6 +457,26 @@ class S3Client:
                     logger.error(f"Failed to download file after {MAX_RETRIES} attempts: {e}")
                     raise
     
+    def open_file(self, file_key, bucket_name=None, buffer_size=DEFAULT_STREAM_BUFFER_BYTES):
+        """
+        Open an S3 object as a buffered, seekable file
+        
+        Data is fetched lazily with ranged GETs of roughly buffer_size
+        bytes, so memory use doesn't depend on the object size.
+        
+        Args:
+            file_key (str): Object key
+            bucket_name (str, optional): Bucket, defaults to the configured one
+            buffer_size (int): Read-ahead buffer size in bytes
+            
+        Returns:
+            io.BufferedReader: File object over the S3 object
+        """
+        bucket = bucket_name or self.bucket
+        raw = S3RangeReader(self.client, bucket, file_key)
+        logger.debug(f"Opened {file_key} for streaming ({raw.size / (1024 * 1024):.2f} MB)")
+        return io.BufferedReader(raw, buffer_size=buffer_size)
+    
     def file_exists(self, file_key, bucket_name=None):
         """Check if a file exists in S3"""
         bucket = bucket_name or self.bucket
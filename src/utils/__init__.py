@@ -4,4 +4,6 @@ Utilities module
 Provides utility functions and classes used throughout the application.
 """
 
-from .logging import LoggingManager
\ No newline at end of file
+from .logging import LoggingManager
+from .metrics import LatencyTracker, timed
+from .cache import LRUCache
\ No newline at end of file
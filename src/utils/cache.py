@@ -0,0 +1,139 @@
+"""
+Cache Utilities Module
+
+This module provides a small in-process LRU cache with expiry.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Entries kept before the least recently used is evicted
+DEFAULT_MAX_SIZE = 1024
+
+# Seconds an entry stays valid (0 = until evicted or invalidated)
+DEFAULT_TTL = 300
+
+class LRUCache:
+    """
+    Least-recently-used cache whose entries also expire after `ttl` seconds.
+    
+    Counts hits, misses, evictions and expirations for get_stats(). Safe to
+    use from several threads. Pickles empty, so process workers start with
+    their own cache.
+    """
+    
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+        """
+        Initialize the cache
+        
+        Args:
+            max_size (int): Entries kept
+            ttl (float): Seconds an entry stays valid, 0 for no expiry
+        """
+        self.max_size = max(1, int(max_size))
+        self.ttl = float(ttl or 0)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._reset_counters()
+    
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __getstate__(self):
+        """Pickle the settings only"""
+        state = self.__dict__.copy()
+        state['_entries'] = OrderedDict()
+        state['_lock'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._reset_counters()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key, default=None):
+        """
+        Look up a key, marking it recently used
+        
+        Args:
+            key: Cache key (hashable)
+            default: Returned when the key is missing or expired
+        
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+    
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entry when full
+        
+        Args:
+            key: Cache key (hashable)
+            value: Value to cache
+        """
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, predicate):
+        """
+        Drop every entry whose key matches
+        
+        Args:
+            predicate (callable): Called with each key, True to drop it
+        
+        Returns:
+            int: Number of entries dropped
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+    
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self):
+        """
+        Cache effectiveness since creation
+        
+        Returns:
+            dict: size, max_size, hits, misses, hit_rate, evictions and expirations
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
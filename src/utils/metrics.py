@@ -0,0 +1,115 @@
+"""
+Metrics Utilities Module
+
+This module provides lightweight in-process latency tracking and timing helpers.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Samples kept per operation; percentiles describe the most recent ones
+DEFAULT_WINDOW = 1000
+
+class LatencyTracker:
+    """
+    Records operation latencies and reports percentiles per operation.
+    
+    Only the last `window` samples of each operation are kept, so the
+    numbers follow current behaviour and memory stays bounded. Safe to use
+    from several threads.
+    """
+    
+    def __init__(self, window=DEFAULT_WINDOW):
+        """
+        Initialize the tracker
+        
+        Args:
+            window (int): Samples kept per operation
+        """
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+    
+    def record(self, name, seconds):
+        """
+        Record one latency sample
+        
+        Args:
+            name (str): Operation name
+            seconds (float): Duration in seconds
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+    
+    @contextmanager
+    def time(self, name):
+        """Context manager recording how long its block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+    
+    @staticmethod
+    def _percentile(ordered, fraction):
+        """Nearest-rank percentile of a sorted list"""
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+    
+    def get_stats(self):
+        """
+        Latency percentiles per operation
+        
+        Returns:
+            dict: Operation name -> count (all time), mean, p50, p95, p99 and
+                max in seconds (over the recent window)
+        """
+        with self._lock:
+            snapshot = {name: (sorted(samples), self._counts[name]) for name, samples in self._samples.items()}
+        
+        stats = {}
+        for name, (ordered, count) in snapshot.items():
+            stats[name] = {
+                'count': count,
+                'mean': sum(ordered) / len(ordered),
+                'p50': self._percentile(ordered, 0.50),
+                'p95': self._percentile(ordered, 0.95),
+                'p99': self._percentile(ordered, 0.99),
+                'max': ordered[-1]
+            }
+        return stats
+    
+    def reset(self):
+        """Forget all samples"""
+        with self._lock:
+            self._samples = {}
+            self._counts = {}
+
+def timed(iterable, timer):
+    """
+    Yield from an iterable, adding the time spent producing items to timer['seconds']
+    
+    Args:
+        iterable: Source of items (e.g. a generator reading from disk or a database)
+        timer (dict): Accumulator with a 'seconds' key
+    
+    Yields:
+        The items of the iterable, unchanged
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.time()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timer['seconds'] += time.time() - start
+            return
+        timer['seconds'] += time.time() - start
+        yield item
@@ -0,0 +1,68 @@
+"""
+Parity of the ONNX embedding backend with the sentence-transformers reference
+
+Encodes a fixed set of sentences with SentenceTransformerBackend and with
+ONNXBackend (fp32 and int8) and checks every row's cosine similarity to the
+reference. Skipped when onnxruntime, transformers or sentence-transformers
+is not installed, or when the model can't be downloaded.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('sentence_transformers')
+pytest.importorskip('onnxruntime')
+pytest.importorskip('transformers')
+
+from src.db.backends import ONNXBackend, SentenceTransformerBackend
+
+MODEL_NAME = os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+
+MIN_COSINE = 0.99
+
+SENTENCES = [
+    "Stainless steel hex bolt, M8 x 40 mm, pack of 100",
+    "Copper wire 2.5 mm² for domestic installations",
+    "Ergonomic office chair with adjustable lumbar support",
+    "Refurbished 14-inch laptop, 16 GB RAM, 512 GB SSD",
+    "Annual maintenance service for industrial pumps",
+    "Replacement valve assembly kit",
+    "cable",
+    "The quick brown fox jumps over the lazy dog.",
+    "Ventilateur industriel à haute pression",
+    "A much longer description that goes on about materials, dimensions, compliance "
+    "certificates, delivery times and warranty terms, so that the tokenizer has to "
+    "handle a sequence that is considerably longer than a typical product title. " * 3,
+]
+
+def _cosine(a, b):
+    """Row-wise cosine similarity"""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+@pytest.fixture(scope='module')
+def reference():
+    backend = SentenceTransformerBackend(MODEL_NAME)
+    try:
+        backend.load()
+    except Exception as e:
+        pytest.skip(f"Could not load {MODEL_NAME}: {e}")
+    return backend.encode(SENTENCES)
+
+@pytest.mark.parametrize('quantize', [False, True], ids=['fp32', 'int8'])
+def test_onnx_matches_reference(reference, quantize, tmp_path_factory):
+    onnx_dir = str(tmp_path_factory.getbasetemp() / 'onnx')
+    backend = ONNXBackend(MODEL_NAME, {'quantize': quantize, 'onnx_dir': onnx_dir})
+    backend.load()
+
+    embeddings = backend.encode(SENTENCES)
+
+    assert embeddings.shape == reference.shape
+    similarity = _cosine(reference, embeddings)
+    assert similarity.min() >= MIN_COSINE, (
+        f"Rows below {MIN_COSINE}: "
+        + ", ".join(f"{i}={similarity[i]:.4f}" for i in np.flatnonzero(similarity < MIN_COSINE))
+    )
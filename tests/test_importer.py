@@ -0,0 +1,145 @@
+"""
+Type and null handling of the parquet importer's load methods
+
+Streams a small parquet file with nullable int, bool, string, list and
+timestamp columns through both load methods. The stub tests check the rows
+handed to the database client; the PostgreSQL tests load the file with each
+method, buffered and streaming, and compare the tables row for row. The PostgreSQL tests are skipped unless
+TEST_DB_HOST is set (TEST_DB_NAME, TEST_DB_USER, TEST_DB_PASSWORD and
+TEST_DB_PORT default to the usual local values).
+"""
+
+import io
+import os
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip('pandas')
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+pytest.importorskip('psycopg2')
+
+from src.pipeline.importer import ParquetImporter, _TableGate
+
+ENTITY = 'test_importer_items'
+
+def _parquet_bytes():
+    table = pa.table({
+        'id': pa.array([1, 2, 3, 4], pa.int64()),
+        'qty': pa.array([5, None, 7, None], pa.int64()),
+        'flag': pa.array([True, None, False, True], pa.bool_()),
+        'name': pa.array(['a', None, 'c', ''], pa.string()),
+        'parent_id': pa.array(['10', '', None, '11'], pa.string()),
+        'tags': pa.array([['x', 'y'], None, [], ['q"z', None]], pa.list_(pa.string())),
+        'price': pa.array([1.5, None, float('nan'), 3.25], pa.float64()),
+        'seen': pa.array([1700000000000000, None, 0, 5], pa.timestamp('us'))
+    })
+    buffer = io.BytesIO()
+    # Two rows per row group, so streaming sees more than one batch
+    pq.write_table(table, buffer, row_group_size=2)
+    return buffer.getvalue()
+
+class _StubS3:
+    """Serves one parquet file from memory"""
+    
+    def __init__(self, data):
+        self.data = data
+    
+    def get_parquet_files(self, folder):
+        return [f"{folder}/part-0.parquet"]
+    
+    def download_file(self, key):
+        return self.data
+    
+    @contextmanager
+    def open_file(self, key, buffer_size=None):
+        yield io.BytesIO(self.data)
+
+class _RecordingDB:
+    """Collects what the importer hands to the database client"""
+    
+    def __init__(self):
+        self.rows = []
+        self.batches = []
+    
+    def insert_with_execute_values(self, table_name, columns, values):
+        self.rows.extend(values)
+        return True
+    
+    def copy_record_batches(self, table_name, columns, batches):
+        self.batches.extend(batches)
+        return sum(batch.num_rows for batch in self.batches)
+
+def _load_into_stub(load_method):
+    db = _RecordingDB()
+    importer = ParquetImporter(_StubS3(_parquet_bytes()), db, {'load_method': load_method, 'streaming': True})
+    gate = _TableGate()
+    gate.open(True)
+    stats = importer._import_file(ENTITY, 'items/part-0.parquet', gate, create_table=False)
+    assert stats['rows'] == 4
+    return db
+
+def test_streaming_execute_values_keeps_nullable_ints():
+    rows = _load_into_stub('execute_values').rows
+    
+    assert [row[1] for row in rows] == [5, None, 7, None]
+    assert all(type(row[1]) is int for row in rows if row[1] is not None)
+    assert [row[2] for row in rows] == [True, None, False, True]
+    assert [row[6] for row in rows] == [1.5, None, None, 3.25]
+    assert [row[4] for row in rows] == ['10', None, None, '11']
+
+def test_streaming_copy_keeps_nullable_ints():
+    batches = _load_into_stub('copy').batches
+    table = pa.Table.from_batches(batches)
+    
+    assert table.schema.field('qty').type == pa.int64()
+    assert table.column('qty').to_pylist() == [5, None, 7, None]
+    assert table.column('parent_id').to_pylist() == ['10', None, None, '11']
+    assert table.column('price').to_pylist() == [1.5, None, None, 3.25]
+    assert table.column('tags').to_pylist() == ['{"x","y"}', '{}', '{}', '{"q\\"z",NULL}']
+
+@pytest.fixture(scope='module')
+def db_client():
+    if not os.environ.get('TEST_DB_HOST'):
+        pytest.skip("TEST_DB_HOST is not set")
+    from src.db.db_client import DBClient
+    client = DBClient({
+        'host': os.environ['TEST_DB_HOST'],
+        'database': os.environ.get('TEST_DB_NAME', 'postgres'),
+        'user': os.environ.get('TEST_DB_USER', 'postgres'),
+        'password': os.environ.get('TEST_DB_PASSWORD', ''),
+        'port': os.environ.get('TEST_DB_PORT', '5432')
+    })
+    yield client
+    client.execute_query(f"DROP TABLE IF EXISTS {ENTITY}")
+    client.close()
+
+def _load_into_postgres(db_client, load_method, streaming):
+    importer = ParquetImporter(
+        _StubS3(_parquet_bytes()), db_client, {'load_method': load_method, 'streaming': streaming}
+    )
+    result = importer.process_entity(ENTITY, entity_folder='items')
+    assert result['success'], result['message']
+    
+    columns = db_client.execute_query(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_name = %s ORDER BY ordinal_position",
+        (ENTITY,)
+    )
+    rows = db_client.execute_query(f"SELECT * FROM {ENTITY} ORDER BY id")
+    return columns, rows
+
+@pytest.mark.parametrize('streaming', [False, True], ids=['buffered', 'streaming'])
+def test_load_methods_store_the_same_rows(db_client, streaming):
+    columns, rows = _load_into_postgres(db_client, 'execute_values', streaming)
+    
+    assert dict(columns)['qty'] == 'bigint'
+    assert dict(columns)['flag'] == 'boolean'
+    assert [row[1] for row in rows] == [5, None, 7, None]
+    assert [row[4] for row in rows] == ['10', None, None, '11']
+    
+    copy_columns, copy_rows = _load_into_postgres(db_client, 'copy', streaming)
+    assert copy_columns == columns
+    for row, copy_row in zip(rows, copy_rows, strict=True):
+        assert row == copy_row